@@ -4,14 +4,31 @@ Script de administración del Fondo de Inversión
 Permite actualizar datos desde la consola sin interfaz web
 """
 
+import csv
 import json
 import os
+import re
+import time
 from datetime import datetime, date
 from typing import Dict, List, Optional
 import argparse
 import getpass
+import sys
 
+import almacenamiento
+from fondo import registrar_tamano
+from indice_nombres import IndiceNombres, autocompletado, normalizar
+from metricas import REGISTRO
+from ordenes import aplicar_liquidacion, calcular_liquidacion, ordenes_pendientes, registrar_orden
+from pool_fondos import cargar_catalogo, consolidar
 from security import generate_salt, hash_password
+
+DURACION_CARGA = REGISTRO.histograma(
+    'fci_carga_datos_segundos', 'Duración de la carga inicial del archivo de datos', ('archivo',))
+DURACION_GUARDADO = REGISTRO.histograma(
+    'fci_guardado_datos_segundos', 'Duración de cada guardado del archivo de datos', ('origen',))
+ERRORES_GUARDADO = REGISTRO.contador(
+    'fci_guardado_errores_total', 'Guardados del archivo de datos que fallaron', ('origen',))
 
 class FondoAdminConsole:
     def __init__(self, archivo_datos='fondo_datos.json'):
@@ -19,26 +36,66 @@ class FondoAdminConsole:
             base_dir = os.path.dirname(os.path.abspath(__file__))
             archivo_datos = os.path.join(base_dir, archivo_datos)
         self.archivo_datos = archivo_datos
-        self.datos = self.cargar_datos()
+        with DURACION_CARGA.medir(archivo=os.path.basename(archivo_datos)):
+            self.datos = self.cargar_datos()
+        registrar_tamano(archivo_datos)
+        self.reconstruir_indices()
     
-    def cargar_datos(self):
-        """Carga los datos desde el archivo JSON"""
+    def cargar_datos(self, estricto: bool = False):
+        """Carga los datos desde el archivo JSON
+
+        Con ``estricto`` los errores de lectura (o la falta del archivo) se
+        propagan en lugar de devolver una estructura vacía.
+        """
         if os.path.exists(self.archivo_datos):
             try:
-                with open(self.archivo_datos, 'r', encoding='utf-8') as f:
-                    datos = json.load(f)
+                datos = almacenamiento.cargar_diferido(self.archivo_datos, self.estructura_inicial())
                 estructura = self.estructura_inicial()
                 for clave, valor_default in estructura.items():
                     if clave not in datos:
                         datos[clave] = valor_default
                 return datos
             except Exception as e:
+                if estricto:
+                    raise
                 print(f"❌ Error cargando datos: {e}")
                 return self.estructura_inicial()
+        elif estricto:
+            raise FileNotFoundError(f"No existe el archivo de datos {self.archivo_datos}")
         else:
             print("⚠️  Archivo de datos no encontrado, creando estructura inicial")
             return self.estructura_inicial()
     
+    def convertir_formato(self, formato: str) -> bool:
+        """Reescribe el archivo de datos en otro formato (json, min, gzip, lzma)"""
+        if formato not in almacenamiento.FORMATOS:
+            print(f"❌ Formato inválido. Opciones: {', '.join(almacenamiento.FORMATOS)}")
+            return False
+        if not os.path.exists(self.archivo_datos):
+            print("❌ Archivo de datos no encontrado")
+            return False
+        anterior = almacenamiento.detectar_formato(self.archivo_datos)
+        tamanos = almacenamiento.convertir(self.archivo_datos, formato)
+        print(f"✅ Formato {anterior} → {formato}: "
+              f"{tamanos['bytes_antes']:,} → {tamanos['bytes_despues']:,} bytes")
+        return True
+
+    def comparar_formatos(self, repeticiones: int = 3) -> List[Dict]:
+        """Compara tamaño y tiempos de guardado y carga de cada formato"""
+        resultados = almacenamiento.comparar_formatos(self.archivo_datos, repeticiones)
+        actual = almacenamiento.detectar_formato(self.archivo_datos)
+        print(f"\n{'Formato':<8} {'Tamaño':>14} {'Relativo':>9} {'Guardar':>11} {'Cargar':>11}")
+        for r in resultados:
+            marca = ' (actual)' if r['formato'] == actual else ''
+            print(f"{r['formato']:<8} {r['bytes']:>14,} {r['relativo']:>8.0%} "
+                  f"{r['guardar_ms']:>8.1f} ms {r['cargar_ms']:>8.1f} ms{marca}")
+        return resultados
+
+    def reconstruir_indices(self):
+        """Arma los índices de búsqueda de clientes y usuarios"""
+        self.indice_clientes = IndiceNombres(self.datos['clientes'])
+        self.indice_usuarios = IndiceNombres(self.datos['usuarios'])
+
     def estructura_inicial(self):
         """Estructura inicial de datos"""
         return {
@@ -50,48 +107,158 @@ class FondoAdminConsole:
             'composicion_fondo': {},
             'distribucion_activos': {},
             'usuarios': {},
-            'tipo_cambio': 0.0
+            'tipo_cambio': 0.0,
+            'historial_composicion': [],
+            'tipos_cambio': {},
+            'comisiones': {},
+            'ordenes_pendientes': []
         }
     
     def guardar_datos(self):
-        """Guarda los datos en el archivo JSON"""
+        """Guarda los datos conservando el formato del archivo (ver almacenamiento)"""
         try:
-            with open(self.archivo_datos, 'w', encoding='utf-8') as f:
-                json.dump(self.datos, f, indent=2, ensure_ascii=False)
+            with DURACION_GUARDADO.medir(origen='consola'):
+                almacenamiento.guardar(self.archivo_datos, self.datos)
+            registrar_tamano(self.archivo_datos)
             print("✅ Datos guardados correctamente")
             return True
         except Exception as e:
+            ERRORES_GUARDADO.incrementar(origen='consola')
             print(f"❌ Error guardando datos: {e}")
             return False
     
-    def mostrar_estado(self):
+    ORDENES_CLIENTES = ('valor', 'cuotapartes', 'nombre')
+
+    def estado_resumen(self, top: Optional[int] = None, ordenar: Optional[str] = None,
+                       pagina: int = 1) -> Dict:
+        """Datos del estado del fondo.
+
+        Con ``top`` se incluye solo la página ``pagina`` de clientes e
+        instrumentos (de ``top`` elementos), elegida con un heap sin ordenar
+        la lista completa.
+        """
+        from listados import cantidad_paginas, pagina as pagina_de
+
+        valor_cuotaparte = self.datos['valor_cuotaparte']
+        clientes = self.datos['clientes']
+        composicion = self.datos['composicion_fondo']
+
+        ordenar = ordenar or ('valor' if top else None)
+        if ordenar == 'nombre':
+            clave, descendente = (lambda item: normalizar(item[0])), False
+        else:
+            # El valor es proporcional a las cuotapartes (mismo valor de cuotaparte).
+            clave, descendente = (lambda item: item[1]['cuotapartes']), True
+
+        if top:
+            seleccion = pagina_de(clientes.items(), top, pagina, clave, descendente)
+            instrumentos = pagina_de(composicion.items(), top, pagina,
+                                     lambda item: item[1].get('monto', 0.0))
+        else:
+            seleccion = list(clientes.items())
+            if ordenar:
+                seleccion.sort(key=clave, reverse=descendente)
+            instrumentos = list(composicion.items())
+
+        from comisiones import pendiente
+
+        pendientes = ordenes_pendientes(self.datos)
+        tipos_cambio = {
+            moneda: serie[-1]
+            for moneda, serie in self.datos.get('tipos_cambio', {}).items() if serie
+        }
+        return {
+            'balance_total': self.get_balance_total(),
+            'total_clientes': len(clientes),
+            'total_cuotapartes': self.datos['total_cuotapartes'],
+            'valor_cuotaparte': valor_cuotaparte,
+            'tipo_cambio': self.datos.get('tipo_cambio', 0.0),
+            'tipos_cambio': tipos_cambio,
+            'ordenes_pendientes': {
+                'cantidad': len(pendientes),
+                'suscripciones': sum(o['monto'] for o in pendientes if o['tipo'] == 'suscripcion'),
+                'rescates': sum(o['monto'] for o in pendientes if o['tipo'] == 'rescate'),
+            },
+            'comisiones_pendientes': pendiente(self.datos),
+            'ordenar': ordenar,
+            'pagina': pagina if top else 1,
+            'paginas': cantidad_paginas(len(clientes), top) if top else 1,
+            'por_pagina': top,
+            'clientes': [
+                {
+                    'nombre': nombre,
+                    'cuotapartes': datos['cuotapartes'],
+                    'valor': datos['cuotapartes'] * valor_cuotaparte,
+                }
+                for nombre, datos in seleccion
+            ],
+            'total_instrumentos': len(composicion),
+            'composicion': [
+                {
+                    'instrumento': instrumento,
+                    'monto': datos['monto'],
+                    'porcentaje': datos['porcentaje'],
+                }
+                for instrumento, datos in instrumentos
+            ],
+        }
+
+    def mostrar_estado(self, top: Optional[int] = None, ordenar: Optional[str] = None,
+                       pagina: int = 1, como_json: bool = False):
         """Muestra el estado actual del fondo"""
+        from listados import rango_pagina
+
+        estado = self.estado_resumen(top, ordenar, pagina)
+        if como_json:
+            print(json.dumps(estado, indent=2, ensure_ascii=False))
+            return estado
+
         print("\n" + "="*50)
         print("📊 ESTADO ACTUAL DEL FONDO")
         print("="*50)
         
-        balance_total = self.get_balance_total()
-        print(f"💰 Balance Total: ${balance_total:,.2f}")
-        print(f"👥 Total Clientes: {len(self.datos['clientes'])}")
-        print(f"📋 Total Cuotapartes: {self.datos['total_cuotapartes']:,.2f}")
-        print(f"💵 Valor Cuotaparte: ${self.datos['valor_cuotaparte']:,.2f}")
-        if self.datos.get('tipo_cambio', 0):
-            print(f"💱 Tipo de cambio USD/ARS: ${self.datos['tipo_cambio']:,.2f}")
+        print(f"💰 Balance Total: ${estado['balance_total']:,.2f}")
+        print(f"👥 Total Clientes: {estado['total_clientes']}")
+        print(f"📋 Total Cuotapartes: {estado['total_cuotapartes']:,.2f}")
+        print(f"💵 Valor Cuotaparte: ${estado['valor_cuotaparte']:,.2f}")
+        if estado['tipo_cambio']:
+            print(f"💱 Tipo de cambio USD/ARS: ${estado['tipo_cambio']:,.2f}")
         else:
             print("💱 Tipo de cambio USD/ARS: no definido")
+        for moneda, cotizacion in estado['tipos_cambio'].items():
+            if moneda != 'USD':
+                print(f"💱 Tipo de cambio {moneda}/ARS: ${cotizacion['valor']:,.2f} ({cotizacion['fecha']})")
+        pendientes = estado['ordenes_pendientes']
+        if pendientes['cantidad']:
+            print(f"⏳ Órdenes pendientes: {pendientes['cantidad']} "
+                  f"(suscripciones ${pendientes['suscripciones']:,.2f} | "
+                  f"rescates ${pendientes['rescates']:,.2f})")
+        if estado['comisiones_pendientes']:
+            print(f"💸 Comisiones pendientes de pago: ${estado['comisiones_pendientes']:,.2f}")
         
-        if self.datos['clientes']:
-            print(f"\n👥 CLIENTES:")
-            for nombre, datos in self.datos['clientes'].items():
-                valor_actual = datos['cuotapartes'] * self.datos['valor_cuotaparte']
-                print(f"  • {nombre}: {datos['cuotapartes']:,.2f} cuotapartes (${valor_actual:,.2f})")
+        if estado['clientes']:
+            if top:
+                desde, hasta = rango_pagina(estado['total_clientes'], top, estado['pagina'])
+                print(f"\n👥 CLIENTES ({desde}-{hasta} de {estado['total_clientes']}, "
+                      f"página {estado['pagina']}/{estado['paginas']}, por {estado['ordenar']}):")
+            else:
+                print(f"\n👥 CLIENTES:")
+            for cliente in estado['clientes']:
+                print(f"  • {cliente['nombre']}: {cliente['cuotapartes']:,.2f} cuotapartes (${cliente['valor']:,.2f})")
+        elif top and estado['total_clientes']:
+            print(f"\n👥 Página {estado['pagina']} fuera de rango ({estado['paginas']} páginas)")
         
-        if self.datos['composicion_fondo']:
-            print(f"\n📈 COMPOSICIÓN DEL FONDO:")
-            for instrumento, datos in self.datos['composicion_fondo'].items():
-                print(f"  • {instrumento}: ${datos['monto']:,.2f} ({datos['porcentaje']:.1f}%)")
+        if estado['composicion']:
+            if top and estado['total_instrumentos'] > len(estado['composicion']):
+                print(f"\n📈 COMPOSICIÓN DEL FONDO ({len(estado['composicion'])} de "
+                      f"{estado['total_instrumentos']} instrumentos):")
+            else:
+                print(f"\n📈 COMPOSICIÓN DEL FONDO:")
+            for instrumento in estado['composicion']:
+                print(f"  • {instrumento['instrumento']}: ${instrumento['monto']:,.2f} ({instrumento['porcentaje']:.1f}%)")
         
         print("="*50)
+        return estado
     
     def get_balance_total(self):
         """Obtiene el balance total actual"""
@@ -100,9 +267,43 @@ class FondoAdminConsole:
         return 0
     
     def actualizar_balance(self, nuevo_balance: float):
-        """Actualiza el balance diario"""
+        """Fija el balance del día y liquida en lote las órdenes pendientes.
+
+        ``nuevo_balance`` es la valuación de la cartera sin los movimientos
+        del día. Se le restan las comisiones devengadas y no pagadas (ver
+        ``comisiones``); el valor de cuotaparte sale de dividir ese neto por
+        las cuotapartes en circulación antes del lote, y el balance registrado
+        suma el neto de las órdenes liquidadas (ver ``ordenes``).
+        """
+        from comisiones import pendiente
+
         fecha_hoy = date.today().isoformat()
-        
+        comisiones_pendientes = pendiente(self.datos)
+        nuevo_balance -= comisiones_pendientes
+        if comisiones_pendientes and self.datos['total_cuotapartes'] > 0 and nuevo_balance <= 0:
+            print(f"❌ El balance no cubre las comisiones pendientes de pago "
+                  f"(${comisiones_pendientes:,.2f})")
+            return False
+
+        # Recalcular valor de cuotaparte
+        valor_cuotaparte = self.datos['valor_cuotaparte']
+        if self.datos['total_cuotapartes'] > 0:
+            valor_cuotaparte = nuevo_balance / self.datos['total_cuotapartes']
+
+        liquidacion = None
+        if ordenes_pendientes(self.datos):
+            try:
+                liquidacion = calcular_liquidacion(self.datos, valor_cuotaparte)
+            except ValueError as e:
+                print(f"❌ No se pueden liquidar las órdenes pendientes: {e}")
+                return False
+        self.datos['valor_cuotaparte'] = valor_cuotaparte
+
+        resultado = None
+        if liquidacion is not None:
+            resultado = aplicar_liquidacion(self.datos, liquidacion)
+            nuevo_balance += liquidacion['suscripciones'] - liquidacion['rescates']
+
         # Remover entrada del mismo día si existe
         self.datos['balance_diario'] = [
             b for b in self.datos['balance_diario'] 
@@ -114,111 +315,292 @@ class FondoAdminConsole:
             'fecha': fecha_hoy,
             'balance': nuevo_balance
         }
+        if comisiones_pendientes:
+            balance_entry['comisiones_pendientes'] = comisiones_pendientes
         self.datos['balance_diario'].append(balance_entry)
         
-        # Recalcular valor de cuotaparte
-        if self.datos['total_cuotapartes'] > 0:
-            self.datos['valor_cuotaparte'] = nuevo_balance / self.datos['total_cuotapartes']
-        
         # Mantener solo los últimos 365 días
         self.datos['balance_diario'] = self.datos['balance_diario'][-365:]
         
         print(f"✅ Balance actualizado a ${nuevo_balance:,.2f}")
+        if comisiones_pendientes:
+            print(f"   (descontadas comisiones pendientes de pago por ${comisiones_pendientes:,.2f})")
         print(f"📊 Nuevo valor cuotaparte: ${self.datos['valor_cuotaparte']:,.2f}")
-    
+        if resultado is not None:
+            self.mostrar_liquidacion(resultado)
+        return True
+
+    def mostrar_liquidacion(self, resultado: Dict):
+        """Resume las órdenes liquidadas y rechazadas de un lote"""
+        liquidadas = resultado['liquidadas']
+        suscripto = sum(t['monto'] for t in liquidadas if t['tipo'] == 'suscripcion')
+        rescatado = -sum(t['monto'] for t in liquidadas if t['tipo'] == 'rescate')
+        print(f"📥 Órdenes liquidadas: {len(liquidadas)} "
+              f"(suscripciones ${suscripto:,.2f} | rescates ${rescatado:,.2f})")
+        for orden in resultado['rechazadas']:
+            print(f"   ❌ {orden['tipo'].capitalize()} rechazado: {orden['cliente']} - "
+                  f"${orden['monto']:,.2f} ({orden['motivo']})")
+
+    def corregir_balances(self, ruta_csv: str, simular: bool = False) -> bool:
+        """Corrige balances de fechas pasadas desde un CSV con columnas fecha,balance.
+
+        Recalcula el valor de cuotaparte desde la primera fecha corregida y
+        reprecia las órdenes liquidadas en ese tramo (ver ``correccion_balances``).
+        Muestra las diferencias antes de registrarlas.
+        """
+        from conciliacion import invalidar_checkpoint
+        from correccion_balances import aplicar_correccion, calcular_correccion
+        from listados import primeros
+
+        balances: Dict[str, float] = {}
+        try:
+            with open(ruta_csv, 'r', encoding='utf-8-sig', newline='') as f:
+                lector = csv.DictReader(f)
+                columnas = {c.strip().lower(): c for c in (lector.fieldnames or [])}
+                if not {'fecha', 'balance'} <= set(columnas):
+                    print("❌ El CSV debe tener las columnas 'fecha' y 'balance'")
+                    return False
+                for numero, fila in enumerate(lector, start=2):
+                    fecha = (fila.get(columnas['fecha']) or '').strip()[:10]
+                    try:
+                        date.fromisoformat(fecha)
+                        balance = float(fila.get(columnas['balance']) or '')
+                    except ValueError:
+                        print(f"❌ Fila inválida en la línea {numero}: {dict(fila)}")
+                        return False
+                    if fecha in balances:
+                        print(f"❌ Fecha repetida en la línea {numero}: {fecha}")
+                        return False
+                    balances[fecha] = balance
+        except OSError as e:
+            print(f"❌ No se pudo leer {ruta_csv}: {e}")
+            return False
+
+        try:
+            correccion = calcular_correccion(self.datos, balances)
+        except ValueError as e:
+            print(f"❌ {e}")
+            return False
+
+        fechas = correccion['fechas']
+        desde = int(fechas.searchsorted(correccion['desde']))
+        corregidas = set(correccion['corregidas'])
+        print(f"\n📅 CORRECCIÓN DE BALANCES ({len(corregidas)} fecha(s), recálculo desde {correccion['desde']}):")
+        print(f"   {'Fecha':<10} {'Balance anterior':>18} {'Balance nuevo':>18} "
+              f"{'Cuotaparte ant.':>16} {'Cuotaparte nueva':>16} {'Var.':>8}")
+        for k in range(desde, len(fechas)):
+            anterior, nuevo = correccion['nav_anterior'][k], correccion['nav_nuevo'][k]
+            if fechas[k] not in corregidas and abs(nuevo - anterior) <= 1e-9 * abs(anterior):
+                continue
+            balance_anterior = correccion['balances_anteriores'][k]
+            texto_anterior = f"${balance_anterior:,.2f}" if balance_anterior == balance_anterior else "—"
+            texto_nav = f"${anterior:,.6f}" if anterior == anterior else "—"
+            variacion = f"{nuevo / anterior - 1:+.4%}" if anterior == anterior and anterior else ""
+            texto_nuevo = f"${correccion['balances_nuevos'][k]:,.2f}"
+            print(f"   {fechas[k]:<10} {texto_anterior:>18} {texto_nuevo:>18} "
+                  f"{texto_nav:>16} {f'${nuevo:,.6f}':>16} {variacion:>8}")
+
+        total = len(self.datos['transacciones'])
+        print(f"🔁 Transacciones repreciadas: {correccion['modificadas']:,} de {total:,}")
+        mayores = primeros(zip(correccion['clientes'], correccion['diferencias']), 10,
+                           lambda item: abs(item[1]))
+        for nombre, diferencia in mayores:
+            if abs(diferencia) > 1e-9:
+                actuales = self.datos['clientes'].get(nombre, {}).get('cuotapartes', 0.0)
+                print(f"   • {nombre:<20} {actuales:>16,.4f} -> {actuales + diferencia:>16,.4f} "
+                      f"({diferencia:+,.4f})")
+        if len(correccion['clientes']) > len(mayores):
+            print(f"   … y {len(correccion['clientes']) - len(mayores)} clientes más")
+        total_cuotapartes = self.datos['total_cuotapartes']
+        print(f"📊 Cuotapartes en circulación: {total_cuotapartes:,.4f} -> "
+              f"{total_cuotapartes + correccion['diferencia_total']:,.4f}")
+        print(f"   Valor cuotaparte vigente: ${correccion['valor_cuotaparte_anterior']:,.6f} -> "
+              f"${correccion['valor_cuotaparte_nuevo']:,.6f}")
+
+        if correccion['sin_cuotapartes']:
+            print("❌ Con los nuevos valores no alcanzan las cuotapartes para los rescates de: "
+                  f"{', '.join(correccion['sin_cuotapartes'])}")
+            return False
+        if simular:
+            print("   (simulación: no se registró nada)")
+            return False
+
+        aplicar_correccion(self.datos, correccion)
+        invalidar_checkpoint(self.archivo_datos)
+        print(f"✅ Balances corregidos: {len(corregidas)} fecha(s), "
+              f"{correccion['modificadas']:,} transacciones repreciadas")
+        return True
+
     def agregar_cliente(self, nombre: str, saldo_inicial: float = 0):
-        """Agrega un nuevo cliente"""
+        """Agrega un nuevo cliente; el saldo inicial queda como suscripción pendiente"""
         if nombre in self.datos['clientes']:
             print(f"❌ El cliente {nombre} ya existe")
             return False
         
-        cuotapartes = 0
-        if saldo_inicial > 0 and self.datos['valor_cuotaparte'] > 0:
-            cuotapartes = saldo_inicial / self.datos['valor_cuotaparte']
-            self.datos['total_cuotapartes'] += cuotapartes
-            
-            # Registrar transacción inicial
-            transaccion = {
-                'fecha': datetime.now().isoformat(),
-                'cliente': nombre,
-                'tipo': 'suscripcion',
-                'monto': saldo_inicial,
-                'cuotapartes': cuotapartes,
-                'valor_cuotaparte': self.datos['valor_cuotaparte']
-            }
-            self.datos['transacciones'].append(transaccion)
-        
         self.datos['clientes'][nombre] = {
-            'cuotapartes': cuotapartes,
+            'cuotapartes': 0,
             'fecha_ingreso': datetime.now().isoformat()
         }
+        self.indice_clientes.agregar(nombre)
         
-        print(f"✅ Cliente {nombre} agregado con {cuotapartes:.2f} cuotapartes")
+        print(f"✅ Cliente {nombre} agregado")
+        if saldo_inicial > 0:
+            registrar_orden(self.datos, nombre, 'suscripcion', saldo_inicial)
+            print(f"⏳ Suscripción inicial pendiente: ${saldo_inicial:,.2f} "
+                  "(se liquida al actualizar el balance)")
         return True
     
     def suscripcion(self, cliente: str, monto: float):
-        """Registra una suscripción"""
+        """Registra una orden de suscripción (se liquida con el próximo balance)"""
         if cliente not in self.datos['clientes']:
             print(f"❌ Cliente {cliente} no existe")
+            self.sugerir_nombres(cliente, self.indice_clientes)
             return False
         
         if monto <= 0:
             print("❌ El monto debe ser mayor a 0")
             return False
         
-        cuotapartes_nuevas = monto / self.datos['valor_cuotaparte']
-        self.datos['clientes'][cliente]['cuotapartes'] += cuotapartes_nuevas
-        self.datos['total_cuotapartes'] += cuotapartes_nuevas
-        
-        transaccion = {
-            'fecha': datetime.now().isoformat(),
-            'cliente': cliente,
-            'tipo': 'suscripcion',
-            'monto': monto,
-            'cuotapartes': cuotapartes_nuevas,
-            'valor_cuotaparte': self.datos['valor_cuotaparte']
-        }
-        self.datos['transacciones'].append(transaccion)
-        
-        print(f"✅ Suscripción registrada: {cliente} - ${monto:,.2f} ({cuotapartes_nuevas:.4f} cuotapartes)")
+        registrar_orden(self.datos, cliente, 'suscripcion', monto)
+        print(f"⏳ Suscripción pendiente: {cliente} - ${monto:,.2f} "
+              "(se liquida al actualizar el balance)")
         return True
     
     def rescate(self, cliente: str, monto: float):
-        """Registra un rescate"""
+        """Registra una orden de rescate (se liquida con el próximo balance)"""
         if cliente not in self.datos['clientes']:
             print(f"❌ Cliente {cliente} no existe")
+            self.sugerir_nombres(cliente, self.indice_clientes)
             return False
         
         if monto <= 0:
             print("❌ El monto debe ser mayor a 0")
             return False
         
-        cuotapartes_a_retirar = monto / self.datos['valor_cuotaparte']
-        
-        if self.datos['clientes'][cliente]['cuotapartes'] < cuotapartes_a_retirar:
-            print(f"❌ Fondos insuficientes. Cliente tiene {self.datos['clientes'][cliente]['cuotapartes']:.4f} cuotapartes")
+        registrar_orden(self.datos, cliente, 'rescate', monto)
+        print(f"⏳ Rescate pendiente: {cliente} - ${monto:,.2f} "
+              "(se liquida al actualizar el balance)")
+        # Control orientativo: el definitivo se hace en lote al valor del día.
+        valor_actual = self.datos['clientes'][cliente]['cuotapartes'] * self.datos['valor_cuotaparte']
+        if monto > valor_actual:
+            print(f"⚠️  Supera la tenencia actual (${valor_actual:,.2f}); "
+                  "se rechazará si no alcanza al liquidar")
+        return True
+
+    def mostrar_ordenes(self, como_json: bool = False):
+        """Muestra las órdenes pendientes de liquidación"""
+        pendientes = ordenes_pendientes(self.datos)
+        if como_json:
+            print(json.dumps(pendientes, indent=2, ensure_ascii=False))
+            return
+        if not pendientes:
+            print("✅ No hay órdenes pendientes")
+            return
+        print(f"\n⏳ ÓRDENES PENDIENTES ({len(pendientes)}):")
+        for orden in pendientes:
+            print(f"  • {orden['fecha'][:16]} {orden['tipo']}: {orden['cliente']} - ${orden['monto']:,.2f}")
+
+    def devengar_comisiones(self, tasa_administracion: Optional[float] = None,
+                            tasa_exito: Optional[float] = None,
+                            simular: bool = False) -> bool:
+        """Devenga las comisiones de todos los clientes en un solo lote.
+
+        Las tasas se indican en porcentaje anual (administración) y porcentaje
+        sobre la ganancia (éxito); sin tasas se usan las configuradas.
+        """
+        from comisiones import aplicar_devengamiento, calcular_devengamiento
+        from listados import primeros
+
+        try:
+            calculo = calcular_devengamiento(
+                self.datos,
+                tasa_administracion=None if tasa_administracion is None else tasa_administracion / 100,
+                tasa_exito=None if tasa_exito is None else tasa_exito / 100,
+            )
+        except ValueError as e:
+            print(f"❌ {e}")
             return False
-        
-        self.datos['clientes'][cliente]['cuotapartes'] -= cuotapartes_a_retirar
-        self.datos['total_cuotapartes'] -= cuotapartes_a_retirar
-        
-        transaccion = {
-            'fecha': datetime.now().isoformat(),
-            'cliente': cliente,
-            'tipo': 'rescate',
-            'monto': -monto,
-            'cuotapartes': -cuotapartes_a_retirar,
-            'valor_cuotaparte': self.datos['valor_cuotaparte']
-        }
-        self.datos['transacciones'].append(transaccion)
-        
-        print(f"✅ Rescate registrado: {cliente} - ${monto:,.2f} ({cuotapartes_a_retirar:.4f} cuotapartes)")
+        if calculo is None:
+            print("ℹ️  No hay comisiones por devengar (ya se devengó hoy o no hay cuotapartes)")
+            return False
+
+        print(f"💸 Comisiones al {calculo['fecha']} ({calculo['dias']} día(s))")
+        print(f"   Administración: {calculo['tasa_administracion']:.2%} anual -> "
+              f"${calculo['total_administracion']:,.2f}")
+        print(f"   Éxito: {calculo['tasa_exito']:.2%} -> ${calculo['total_exito']:,.2f}")
+        print(f"   Total: ${calculo['total']:,.2f} en {len(calculo['clientes'])} clientes")
+        print(f"   Valor cuotaparte: ${calculo['valor_cuotaparte_anterior']:,.6f} -> "
+              f"${calculo['valor_cuotaparte_nuevo']:,.6f}")
+        mayores = primeros(zip(calculo['clientes'], calculo['importes']), 10, lambda item: item[1])
+        for nombre, importe in mayores:
+            print(f"   • {nombre:<20} ${importe:>14,.2f}")
+        if len(calculo['clientes']) > len(mayores):
+            print(f"   … y {len(calculo['clientes']) - len(mayores)} clientes más")
+
+        if simular:
+            print("   (simulación: no se registró nada)")
+            return False
+
+        lote = aplicar_devengamiento(self.datos, calculo)
+        print(f"✅ Comisiones registradas: {len(lote)} movimientos")
+        print(f"   Pendientes de pago: ${self.datos['comisiones']['devengado_pendiente']:,.2f}")
+        return True
+
+    def pagar_comisiones(self, monto: float) -> bool:
+        """Registra el cobro de comisiones devengadas desde la cartera"""
+        from comisiones import registrar_pago
+
+        try:
+            restante = registrar_pago(self.datos, monto)
+        except ValueError as e:
+            print(f"❌ {e}")
+            return False
+        print(f"✅ Pago de comisiones registrado: ${monto:,.2f}")
+        print(f"   Pendientes de pago: ${restante:,.2f}")
         return True
 
     # -------------------------------------------------------------
     # Gestión de usuarios para acceso web
     # -------------------------------------------------------------
 
+    def consola_usuarios(self) -> 'FondoAdminConsole':
+        """Consola del archivo del que el panel lee los usuarios
+
+        El panel solo lee usuarios del fondo principal del catálogo: si el
+        archivo actual es otro fondo del catálogo, los usuarios se administran
+        en el principal. Un archivo fuera del catálogo conserva los suyos.
+        """
+        catalogo = cargar_catalogo()
+        actual = os.path.abspath(self.archivo_datos)
+        principal = catalogo['fondos'][catalogo['principal']]['archivo']
+        archivos = {os.path.abspath(info['archivo']) for info in catalogo['fondos'].values()}
+        if actual == os.path.abspath(principal) or actual not in archivos:
+            return self
+        print(f"⚠️  Los usuarios del panel se guardan en el fondo principal "
+              f"'{catalogo['principal']}': se administran en {principal}", file=sys.stderr)
+        return FondoAdminConsole(principal)
+
+    def indice_clientes_fondos(self, fondos: Optional[List[str]] = None) -> IndiceNombres:
+        """Clientes de los fondos que verá un usuario (sin 'fondos', solo el principal)"""
+        from fondo import FondoInversion
+
+        catalogo = cargar_catalogo()
+        actual = os.path.abspath(self.archivo_datos)
+        archivos = {os.path.abspath(info['archivo']) for info in catalogo['fondos'].values()}
+        if actual not in archivos:
+            return self.indice_clientes
+
+        nombres = set()
+        for fondo_id in fondos or [catalogo['principal']]:
+            info = catalogo['fondos'].get(fondo_id)
+            if info is None:
+                continue
+            if os.path.abspath(info['archivo']) == actual:
+                nombres.update(self.datos['clientes'])
+            else:
+                nombres.update(FondoInversion(info['archivo']).datos.get('clientes', {}))
+        return IndiceNombres(nombres)
+
     def crear_usuario(self, username: str, password: str, rol: str = 'cliente',
                       clientes: Optional[List[str]] = None) -> bool:
         """Crea un nuevo usuario de acceso web."""
@@ -237,10 +619,13 @@ class FondoAdminConsole:
             if not clientes:
                 print("❌ Debe asociar al menos un cliente al usuario")
                 return False
-            clientes_validos = [c for c in clientes if c in self.datos['clientes']]
+            indice = self.indice_clientes_fondos()
+            clientes_validos = [c for c in clientes if c in indice]
             if len(clientes_validos) != len(clientes):
-                print("❌ Algunos clientes no existen en el fondo")
-                print(f"   Clientes válidos: {', '.join(self.datos['clientes'].keys())}")
+                print("❌ Algunos clientes no existen en el fondo principal")
+                for cliente in clientes:
+                    if cliente not in indice:
+                        self.sugerir_nombres(cliente, indice)
                 return False
         else:
             clientes_validos = []
@@ -254,6 +639,7 @@ class FondoAdminConsole:
             'password_hash': password_hash,
             'clientes': clientes_validos,
         }
+        self.indice_usuarios.agregar(username)
 
         print(f"✅ Usuario {username} creado correctamente")
         if rol == 'admin':
@@ -262,15 +648,181 @@ class FondoAdminConsole:
             print(f"   • Clientes asociados: {', '.join(clientes_validos)}")
         return True
 
-    def listar_usuarios(self):
+    USUARIO_VALIDO = re.compile(r'^[A-Za-z0-9][A-Za-z0-9._@-]{2,63}$')
+
+    def validar_fila_usuario(self, fila: Dict, vistos: set, fondos_catalogo,
+                             indices: Optional[Dict] = None) -> Dict:
+        """Valida una fila del CSV de usuarios; devuelve el usuario a crear o el error
+
+        Los clientes se buscan en los fondos que verá el usuario; ``indices``
+        guarda el índice de cada combinación de fondos entre filas.
+        """
+        username = (fila.get('usuario') or '').strip()
+        password = fila.get('password') or ''
+        rol = (fila.get('rol') or 'cliente').strip().lower()
+        nombres = [c.strip() for c in (fila.get('clientes') or '').split('|') if c.strip()]
+        fondos = [f.strip() for f in (fila.get('fondos') or '').split('|') if f.strip()]
+
+        if not self.USUARIO_VALIDO.match(username):
+            return {'error': 'usuario inválido (3-64 letras, números o ._@-)'}
+        if normalizar(username) in vistos:
+            return {'error': 'usuario repetido en el archivo'}
+        existente = self.indice_usuarios.resolver(username)
+        if existente:
+            return {'error': f'el usuario ya existe ({existente})'}
+        if not password:
+            return {'error': 'falta la contraseña'}
+        if rol not in {'admin', 'cliente'}:
+            return {'error': f"rol inválido '{rol}' (admin o cliente)"}
+
+        clientes = []
+        if rol == 'cliente':
+            if not nombres:
+                return {'error': 'un usuario cliente necesita al menos un cliente asociado'}
+            desconocidos = [f for f in fondos if f not in fondos_catalogo]
+            if desconocidos:
+                return {'error': f"fondos inexistentes: {', '.join(desconocidos)}"}
+            indices = {} if indices is None else indices
+            if tuple(fondos) not in indices:
+                indices[tuple(fondos)] = self.indice_clientes_fondos(fondos)
+            indice = indices[tuple(fondos)]
+            for nombre in nombres:
+                cliente = indice.resolver(nombre)
+                if cliente is None:
+                    sugerencias = indice.sugerencias(nombre, 3)
+                    detalle = f" (¿quiso decir: {', '.join(sugerencias)}?)" if sugerencias else ''
+                    return {'error': f"cliente inexistente '{nombre}'{detalle}"}
+                if cliente not in clientes:
+                    clientes.append(cliente)
+
+        usuario = {'rol': rol, 'clientes': clientes}
+        if rol == 'cliente' and fondos:
+            usuario['fondos'] = fondos
+        return {'usuario': username, 'password': password, 'datos': usuario}
+
+    def importar_usuarios(self, ruta_csv: str, procesos: Optional[int] = None,
+                          simular: bool = False, como_json: bool = False) -> bool:
+        """Crea usuarios en lote desde un CSV con columnas usuario,password[,rol,clientes,fondos]
+
+        Las filas se validan contra los índices de clientes y usuarios; las
+        contraseñas de las válidas se derivan en paralelo (hashlib libera el
+        GIL durante PBKDF2) y todas se agregan de una vez, para un solo guardado.
+        Los clientes y fondos de cada fila se separan con '|'.
+        """
+        from concurrent.futures import ThreadPoolExecutor
+
+        try:
+            with open(ruta_csv, 'r', encoding='utf-8-sig', newline='') as f:
+                muestra = f.read(4096)
+                f.seek(0)
+                delimitador = ';' if muestra.count(';') > muestra.count(',') else ','
+                lector = csv.DictReader(f, delimiter=delimitador)
+                columnas = {c.strip().lower(): c for c in (lector.fieldnames or [])}
+                if not {'usuario', 'password'} <= set(columnas):
+                    print("❌ El CSV debe tener las columnas 'usuario' y 'password' "
+                          "(y opcionalmente 'rol', 'clientes' y 'fondos')")
+                    return False
+                filas = [
+                    (numero, {clave: fila.get(original) for clave, original in columnas.items()})
+                    for numero, fila in enumerate(lector, start=2)
+                    if any((valor or '').strip() for valor in fila.values() if isinstance(valor, str))
+                ]
+        except OSError as e:
+            print(f"❌ No se pudo leer {ruta_csv}: {e}")
+            return False
+
+        fondos_catalogo = cargar_catalogo()['fondos'] if any(f.get('fondos') for _, f in filas) else {}
+        resultados = []
+        validas = []
+        vistos = set()
+        indices = {}
+        for numero, fila in filas:
+            validacion = self.validar_fila_usuario(fila, vistos, fondos_catalogo, indices)
+            resultado = {'linea': numero, 'usuario': (fila.get('usuario') or '').strip()}
+            if 'error' in validacion:
+                resultado.update(estado='error', detalle=validacion['error'])
+            else:
+                vistos.add(normalizar(validacion['usuario']))
+                validas.append((resultado, validacion))
+                resultado.update(estado='simulado' if simular else 'creado',
+                                 detalle=validacion['datos']['rol'])
+            resultados.append(resultado)
+
+        inicio = time.perf_counter()
+        if validas and not simular:
+            sales = [generate_salt() for _ in validas]
+            with ThreadPoolExecutor(max_workers=procesos or os.cpu_count() or 1) as ejecutor:
+                hashes = list(ejecutor.map(
+                    hash_password, [v['password'] for _, v in validas], sales))
+            for (_, validacion), salt, password_hash in zip(validas, sales, hashes):
+                self.datos['usuarios'][validacion['usuario']] = {
+                    **validacion['datos'], 'salt': salt, 'password_hash': password_hash}
+                self.indice_usuarios.agregar(validacion['usuario'])
+        segundos = time.perf_counter() - inicio
+
+        errores = len(resultados) - len(validas)
+        if como_json:
+            print(json.dumps({
+                'archivo': ruta_csv,
+                'filas': len(resultados),
+                'creados': 0 if simular else len(validas),
+                'errores': errores,
+                'simulado': simular,
+                'resultados': resultados,
+            }, indent=2, ensure_ascii=False))
+        else:
+            print(f"\n👥 IMPORTACIÓN DE USUARIOS ({ruta_csv}):")
+            for r in resultados:
+                icono = '❌' if r['estado'] == 'error' else ('🔎' if simular else '✅')
+                print(f"  {icono} línea {r['linea']}: {r['usuario'] or '(sin usuario)'} - {r['detalle']}")
+            if simular:
+                print(f"🔎 Simulación: {len(validas)} usuarios válidos, {errores} con errores "
+                      "(no se guardaron cambios)")
+            else:
+                print(f"✅ {len(validas)} usuarios creados, {errores} con errores ({segundos:.2f}s)")
+        return bool(validas) and not simular
+
+    def listar_usuarios(self, top: Optional[int] = None, pagina: int = 1,
+                        como_json: bool = False):
         """Muestra la lista de usuarios configurados"""
+        from listados import cantidad_paginas, pagina as pagina_de, rango_pagina
+
         usuarios = self.datos.get('usuarios', {})
+        if top:
+            seleccion = pagina_de(usuarios.items(), top, pagina,
+                                  lambda item: normalizar(item[0]), descendente=False)
+        else:
+            seleccion = list(usuarios.items())
+
+        if como_json:
+            listado = {
+                'total_usuarios': len(usuarios),
+                'pagina': pagina if top else 1,
+                'paginas': cantidad_paginas(len(usuarios), top) if top else 1,
+                'usuarios': [
+                    {
+                        'usuario': username,
+                        'rol': info.get('rol', 'cliente'),
+                        'clientes': info.get('clientes', []),
+                        'fondos': info.get('fondos', []),
+                    }
+                    for username, info in seleccion
+                ],
+            }
+            print(json.dumps(listado, indent=2, ensure_ascii=False))
+            return
+
         if not usuarios:
             print("⚠️  No hay usuarios configurados")
             return
 
-        print("\n👥 USUARIOS REGISTRADOS:")
-        for username, info in usuarios.items():
+        if top:
+            desde, hasta = rango_pagina(len(usuarios), top, pagina)
+            print(f"\n👥 USUARIOS REGISTRADOS ({desde}-{hasta} de {len(usuarios)}, "
+                  f"página {max(pagina, 1)}/{cantidad_paginas(len(usuarios), top)}):")
+        else:
+            print("\n👥 USUARIOS REGISTRADOS:")
+        for username, info in seleccion:
             rol = info.get('rol', 'cliente')
             if rol == 'admin':
                 print(f"  • {username} (admin)")
@@ -284,6 +836,7 @@ class FondoAdminConsole:
         usuario = self.datos['usuarios'].get(username)
         if not usuario:
             print(f"❌ Usuario {username} no existe")
+            self.sugerir_nombres(username, self.indice_usuarios)
             return False
 
         salt = generate_salt()
@@ -297,24 +850,188 @@ class FondoAdminConsole:
         usuario = self.datos['usuarios'].get(username)
         if not usuario:
             print(f"❌ Usuario {username} no existe")
+            self.sugerir_nombres(username, self.indice_usuarios)
             return False
 
         if usuario.get('rol') == 'admin':
             print("⚠️  El usuario es administrador y ya tiene acceso total")
             return False
 
-        clientes_validos = [c for c in clientes if c in self.datos['clientes']]
+        indice = self.indice_clientes_fondos(usuario.get('fondos'))
+        clientes_validos = [c for c in clientes if c in indice]
         if len(clientes_validos) != len(clientes):
-            print("❌ Algunos clientes no existen. No se realizaron cambios")
-            print(f"   Clientes válidos: {', '.join(self.datos['clientes'].keys())}")
+            print("❌ Algunos clientes no existen en los fondos del usuario. No se realizaron cambios")
+            for cliente in clientes:
+                if cliente not in indice:
+                    self.sugerir_nombres(cliente, indice)
             return False
 
         usuario['clientes'] = clientes_validos
         print(f"✅ Clientes actualizados para {username}: {', '.join(clientes_validos)}")
         return True
 
+    def asignar_fondos_usuario(self, username: str, fondos: List[str]) -> bool:
+        """Define los fondos del catálogo que puede consultar un usuario"""
+        usuario = self.datos['usuarios'].get(username)
+        if not usuario:
+            print(f"❌ Usuario {username} no existe")
+            self.sugerir_nombres(username, self.indice_usuarios)
+            return False
+
+        if usuario.get('rol') == 'admin':
+            print("⚠️  El usuario es administrador y ya ve todos los fondos")
+            return False
+
+        catalogo = cargar_catalogo()
+        desconocidos = [f for f in fondos if f not in catalogo['fondos']]
+        if desconocidos or not fondos:
+            print(f"❌ Fondos inexistentes: {', '.join(desconocidos) or '(ninguno indicado)'}")
+            print(f"   Fondos disponibles: {', '.join(catalogo['fondos'].keys())}")
+            return False
+
+        usuario['fondos'] = fondos
+        print(f"✅ Fondos visibles para {username}: {', '.join(fondos)}")
+        indice = self.indice_clientes_fondos(fondos)
+        ausentes = [c for c in usuario.get('clientes', []) if c not in indice]
+        if ausentes:
+            print(f"⚠️  Clientes asociados que no están en esos fondos: {', '.join(ausentes)}")
+        return True
+
+    # -------------------------------------------------------------
+    # Varios fondos
+    # -------------------------------------------------------------
+
+    def listar_fondos(self):
+        """Muestra los fondos declarados en el catálogo"""
+        catalogo = cargar_catalogo()
+        print("\n🏦 FONDOS DISPONIBLES:")
+        for fondo_id, info in catalogo['fondos'].items():
+            marcas = []
+            if fondo_id == catalogo['principal']:
+                marcas.append('principal')
+            if os.path.abspath(info['archivo']) == os.path.abspath(self.archivo_datos):
+                marcas.append('actual')
+            sufijo = f" [{', '.join(marcas)}]" if marcas else ''
+            print(f"  • {fondo_id}: {info['nombre']} ({info['archivo']}){sufijo}")
+
+    def cambiar_fondo(self, fondo_id: str) -> bool:
+        """Pasa a administrar otro fondo del catálogo"""
+        catalogo = cargar_catalogo()
+        info = catalogo['fondos'].get(fondo_id)
+        if not info:
+            print(f"❌ Fondo {fondo_id} no existe en el catálogo")
+            return False
+        self.archivo_datos = info['archivo']
+        self.datos = self.cargar_datos()
+        self.reconstruir_indices()
+        print(f"✅ Administrando {info['nombre']} ({self.archivo_datos})")
+        return True
+
+    def mostrar_consolidado(self):
+        """Muestra el patrimonio agregado de todos los fondos del catálogo"""
+        from fondo import FondoInversion
+
+        catalogo = cargar_catalogo()
+        fondos = {
+            fondo_id: FondoInversion(info['archivo'])
+            for fondo_id, info in catalogo['fondos'].items()
+        }
+        nombres = {fondo_id: info['nombre'] for fondo_id, info in catalogo['fondos'].items()}
+        consolidado = consolidar(fondos, nombres)
+
+        print("\n" + "="*50)
+        print("🏦 VISTA CONSOLIDADA")
+        print("="*50)
+        for item in consolidado['por_fondo']:
+            print(f"  • {item['nombre']}: ${item['valor_actual']:,.2f} "
+                  f"({item['clientes']} clientes, cuotaparte ${item['valor_cuotaparte']:,.2f})")
+        print(f"💰 Patrimonio total: ${consolidado['total_ars']:,.2f}")
+        if consolidado['total_usd'] is not None:
+            print(f"💵 Equivalente: US$ {consolidado['total_usd']:,.2f}")
+        print(f"👥 Clientes distintos: {len(consolidado['por_cliente'])}")
+        print("="*50)
+
+    # -------------------------------------------------------------
+    # Búsqueda de nombres en los menús
+    # -------------------------------------------------------------
+
+    MAX_NOMBRES_LISTADOS = 20
+
+    def sugerir_nombres(self, nombre: str, indice: IndiceNombres):
+        """Muestra nombres parecidos a uno inexistente"""
+        sugerencias = indice.sugerencias(nombre)
+        if sugerencias:
+            print(f"   ¿Quiso decir: {', '.join(sugerencias)}?")
+
+    def mostrar_disponibles(self, etiqueta: str, indice: IndiceNombres):
+        """Lista los nombres disponibles, o solo la cantidad si son muchos"""
+        if len(indice) <= self.MAX_NOMBRES_LISTADOS:
+            print(f"{etiqueta} disponibles:", ', '.join(indice))
+        else:
+            print(f"{etiqueta} disponibles: {len(indice)} "
+                  "(Tab autocompleta; '?prefijo' lista coincidencias)")
+
+    def pedir_nombres(self, mensaje: str, indice: IndiceNombres,
+                      multiple: bool = False) -> Optional[List[str]]:
+        """Pide uno o varios nombres (separados por coma) con autocompletado.
+
+        Acepta el nombre sin distinguir mayúsculas ni acentos. Si alguno no
+        existe muestra sugerencias y devuelve None.
+        """
+        while True:
+            with autocompletado(indice):
+                texto = input(mensaje).strip()
+            if not texto.startswith('?'):
+                break
+            coincidencias = indice.con_prefijo(texto[1:], self.MAX_NOMBRES_LISTADOS + 1)
+            if not coincidencias:
+                print("   Sin coincidencias")
+            else:
+                sufijo = ', ...' if len(coincidencias) > self.MAX_NOMBRES_LISTADOS else ''
+                print(f"   {', '.join(coincidencias[:self.MAX_NOMBRES_LISTADOS])}{sufijo}")
+
+        partes = [p.strip() for p in texto.split(',')] if multiple else [texto]
+        nombres = []
+        for parte in partes:
+            if not parte:
+                continue
+            nombre = indice.resolver(parte)
+            if nombre is None:
+                print(f"❌ {parte} no existe")
+                self.sugerir_nombres(parte, indice)
+                return None
+            nombres.append(nombre)
+        return nombres
+
+    def paginar_interactivo(self, total: int, mostrar):
+        """Muestra un listado largo de a páginas en el menú interactivo"""
+        from listados import cantidad_paginas
+
+        if total <= self.MAX_NOMBRES_LISTADOS:
+            mostrar(None, 1)
+            return
+        paginas = cantidad_paginas(total, self.MAX_NOMBRES_LISTADOS)
+        numero = 1
+        while True:
+            mostrar(self.MAX_NOMBRES_LISTADOS, numero)
+            if numero >= paginas:
+                break
+            respuesta = input("Enter: página siguiente | número: ir a la página | q: volver ").strip().lower()
+            if respuesta == 'q':
+                break
+            numero = int(respuesta) if respuesta.isdigit() else numero + 1
+
+    def pedir_cliente(self, mensaje: str = "Cliente: ") -> Optional[str]:
+        nombres = self.pedir_nombres(mensaje, self.indice_clientes)
+        return nombres[0] if nombres else None
+
+    def pedir_usuario(self, mensaje: str = "Usuario: ") -> Optional[str]:
+        nombres = self.pedir_nombres(mensaje, self.indice_usuarios)
+        return nombres[0] if nombres else None
+
     def menu_usuarios(self):
         """Menú interactivo para administrar usuarios"""
+        consola = self.consola_usuarios()
         while True:
             print("\n" + "-"*40)
             print("👤 ADMINISTRACIÓN DE USUARIOS")
@@ -323,7 +1040,8 @@ class FondoAdminConsole:
             print("2. Listar usuarios")
             print("3. Actualizar contraseña")
             print("4. Actualizar clientes asociados")
-            print("5. Volver")
+            print("5. Asignar fondos visibles")
+            print("6. Volver")
 
             opcion = input("Seleccione una opción: ").strip()
 
@@ -332,51 +1050,68 @@ class FondoAdminConsole:
                 rol = input("Rol (admin/cliente) [cliente]: ").strip() or 'cliente'
                 clientes = []
                 if rol.lower() != 'admin':
-                    if not self.datos['clientes']:
+                    indice = consola.indice_clientes_fondos()
+                    if not len(indice):
                         print("❌ No hay clientes cargados. Cree el cliente antes de asignarlo")
                         continue
-                    print("Clientes disponibles:", ', '.join(self.datos['clientes'].keys()))
-                    clientes_input = input("Clientes asociados (separados por coma): ").strip()
-                    clientes = [c.strip() for c in clientes_input.split(',') if c.strip()]
+                    consola.mostrar_disponibles("Clientes", indice)
+                    clientes = consola.pedir_nombres("Clientes asociados (separados por coma): ",
+                                                     indice, multiple=True)
+                    if clientes is None:
+                        continue
                 password = getpass.getpass("Contraseña: ")
                 confirmacion = getpass.getpass("Confirmar contraseña: ")
                 if password != confirmacion:
                     print("❌ Las contraseñas no coinciden")
                     continue
-                if self.crear_usuario(username, password, rol, clientes):
-                    self.guardar_datos()
+                if consola.crear_usuario(username, password, rol, clientes):
+                    consola.guardar_datos()
 
             elif opcion == '2':
-                self.listar_usuarios()
+                consola.paginar_interactivo(len(consola.datos['usuarios']), consola.listar_usuarios)
 
             elif opcion == '3':
-                username = input("Usuario: ").strip()
+                username = consola.pedir_usuario()
+                if username is None:
+                    continue
                 nuevo_password = getpass.getpass("Nueva contraseña: ")
                 confirmacion = getpass.getpass("Confirmar contraseña: ")
                 if nuevo_password != confirmacion:
                     print("❌ Las contraseñas no coinciden")
                     continue
-                if self.actualizar_password(username, nuevo_password):
-                    self.guardar_datos()
+                if consola.actualizar_password(username, nuevo_password):
+                    consola.guardar_datos()
 
             elif opcion == '4':
-                username = input("Usuario: ").strip()
-                if username not in self.datos['usuarios']:
-                    print("❌ Usuario no encontrado")
+                username = consola.pedir_usuario()
+                if username is None:
                     continue
-                if self.datos['usuarios'][username].get('rol') == 'admin':
+                if consola.datos['usuarios'][username].get('rol') == 'admin':
                     print("⚠️  El usuario es admin y no necesita clientes asociados")
                     continue
-                if not self.datos['clientes']:
+                indice = consola.indice_clientes_fondos(consola.datos['usuarios'][username].get('fondos'))
+                if not len(indice):
                     print("❌ No hay clientes cargados")
                     continue
-                print("Clientes disponibles:", ', '.join(self.datos['clientes'].keys()))
-                clientes_input = input("Clientes asociados (separados por coma): ").strip()
-                clientes = [c.strip() for c in clientes_input.split(',') if c.strip()]
-                if self.actualizar_clientes_usuario(username, clientes):
-                    self.guardar_datos()
+                consola.mostrar_disponibles("Clientes", indice)
+                clientes = consola.pedir_nombres("Clientes asociados (separados por coma): ",
+                                                 indice, multiple=True)
+                if clientes is None:
+                    continue
+                if consola.actualizar_clientes_usuario(username, clientes):
+                    consola.guardar_datos()
 
             elif opcion == '5':
+                username = consola.pedir_usuario()
+                if username is None:
+                    continue
+                print("Fondos disponibles:", ', '.join(cargar_catalogo()['fondos'].keys()))
+                fondos_input = input("Fondos visibles (separados por coma): ").strip()
+                fondos = [f.strip() for f in fondos_input.split(',') if f.strip()]
+                if consola.asignar_fondos_usuario(username, fondos):
+                    consola.guardar_datos()
+
+            elif opcion == '6':
                 break
             else:
                 print("❌ Opción inválida")
@@ -400,77 +1135,150 @@ class FondoAdminConsole:
 
                 instrumento = partes[0]
                 monto = float(partes[1])
-                moneda = partes[2].upper() if len(partes) == 3 and partes[2] else 'ARS'
+                moneda = partes[2] if len(partes) == 3 else ''
+                composicion_procesada.append((instrumento, monto, moneda))
 
-                if monto <= 0:
-                    continue
+            return self.aplicar_composicion(composicion_procesada)
 
-                if moneda not in {'ARS', 'USD'}:
-                    print(f"⚠️  Moneda '{moneda}' no reconocida. Se asumirá en pesos (ARS).")
-                    moneda = 'ARS'
+        except ValueError as e:
+            print(f"❌ Error en formato de montos: {e}")
+            return False
+        except Exception as e:
+            print(f"❌ Error actualizando composición: {e}")
+            return False
 
-                composicion_procesada.append((instrumento, monto, moneda))
+    def cargar_composicion_csv(self, ruta_csv: str):
+        """Actualiza la composición desde un CSV con columnas instrumento,monto[,moneda]"""
+        try:
+            with open(ruta_csv, 'r', encoding='utf-8-sig', newline='') as f:
+                muestra = f.read(4096)
+                f.seek(0)
+                delimitador = ';' if muestra.count(';') > muestra.count(',') else ','
+                lector = csv.DictReader(f, delimiter=delimitador)
+                columnas = {c.strip().lower(): c for c in (lector.fieldnames or [])}
+                if 'instrumento' not in columnas or 'monto' not in columnas:
+                    print("❌ El CSV debe tener las columnas 'instrumento' y 'monto' (y opcionalmente 'moneda')")
+                    return False
 
-            if not composicion_procesada:
-                print("❌ No se encontraron instrumentos válidos")
-                return False
+                composicion_procesada = []
+                for numero, fila in enumerate(lector, start=2):
+                    instrumento = (fila.get(columnas['instrumento']) or '').strip()
+                    monto_txt = (fila.get(columnas['monto']) or '').strip()
+                    if not instrumento and not monto_txt:
+                        continue
+                    try:
+                        monto = float(monto_txt)
+                    except ValueError:
+                        print(f"❌ Monto inválido en la línea {numero}: '{monto_txt}'")
+                        return False
+                    moneda = (fila.get(columnas['moneda']) or '').strip() if 'moneda' in columnas else ''
+                    composicion_procesada.append((instrumento, monto, moneda))
+        except OSError as e:
+            print(f"❌ No se pudo leer {ruta_csv}: {e}")
+            return False
 
-            tipo_cambio = self.datos.get('tipo_cambio', 0.0) or 0.0
-            composicion_completa = {}
-            total_en_pesos = 0.0
-            composicion_intermedia = []
+        print(f"📄 {len(composicion_procesada)} instrumentos leídos de {ruta_csv}")
+        return self.aplicar_composicion(composicion_procesada)
 
-            for instrumento, monto, moneda in composicion_procesada:
-                if moneda == 'USD':
-                    if tipo_cambio <= 0:
-                        print("❌ Debe configurar el tipo de cambio (💱) antes de cargar montos en USD.")
-                        return False
-                    monto_en_pesos = monto * tipo_cambio
-                    composicion_intermedia.append((instrumento, monto_en_pesos, moneda, monto))
-                else:
-                    monto_en_pesos = monto
-                    composicion_intermedia.append((instrumento, monto_en_pesos, moneda, None))
-                total_en_pesos += monto_en_pesos
+    def aplicar_composicion(self, instrumentos: List[tuple]):
+        """Valúa la lista de (instrumento, monto, moneda), la guarda como
+        composición vigente y agrega un snapshot fechado al historial.
 
-            if total_en_pesos <= 0:
-                print("❌ El total de la composición debe ser mayor a 0")
-                return False
+        La valuación en pesos y los porcentajes se calculan vectorizados
+        sobre todos los instrumentos.
+        """
+        import numpy as np
 
-            for instrumento, monto_en_pesos, moneda, monto_moneda in composicion_intermedia:
-                porcentaje = (monto_en_pesos / total_en_pesos * 100) if total_en_pesos else 0
-                registro = {
-                    'monto': monto_en_pesos,
-                    'porcentaje': porcentaje,
-                    'moneda': moneda
-                }
-                if moneda == 'USD' and monto_moneda is not None:
-                    registro['monto_moneda'] = monto_moneda
-                composicion_completa[instrumento] = registro
-
-            self.datos['composicion_fondo'] = composicion_completa
-
-            print("✅ Composición actualizada:")
-            for instrumento, datos in composicion_completa.items():
-                moneda = datos.get('moneda', 'ARS')
-                porcentaje = datos.get('porcentaje', 0.0)
-                monto_pesos = datos.get('monto', 0.0)
-                if moneda == 'USD' and 'monto_moneda' in datos:
-                    monto_moneda = datos['monto_moneda']
-                    print(f"  • {instrumento}: US$ {monto_moneda:,.2f} (=${monto_pesos:,.2f}) ({porcentaje:.1f}%)")
-                else:
-                    print(f"  • {instrumento}: ${monto_pesos:,.2f} ({porcentaje:.1f}%)")
+        from composicion import porcentajes, tasas_por_moneda
 
-            return True
+        cotizaciones = self.tabla_tipos_cambio().vigentes()
+        composicion_procesada = []
+        for instrumento, monto, moneda in instrumentos:
+            moneda = (moneda or 'ARS').upper()
+            if monto <= 0:
+                continue
+            if moneda not in cotizaciones and moneda != 'USD':
+                print(f"⚠️  Moneda '{moneda}' no reconocida. Se asumirá en pesos (ARS).")
+                moneda = 'ARS'
+            composicion_procesada.append((instrumento, monto, moneda))
 
-        except ValueError as e:
-            print(f"❌ Error en formato de montos: {e}")
+        if not composicion_procesada:
+            print("❌ No se encontraron instrumentos válidos")
             return False
-        except Exception as e:
-            print(f"❌ Error actualizando composición: {e}")
+
+        nombres = [i for i, _, _ in composicion_procesada]
+        montos = np.array([m for _, m, _ in composicion_procesada], dtype=float)
+        monedas = [moneda for _, _, moneda in composicion_procesada]
+        tasas = tasas_por_moneda(monedas, cotizaciones)
+
+        sin_cotizacion = sorted({monedas[j] for j in np.flatnonzero(np.isnan(tasas))})
+        if sin_cotizacion:
+            print(f"❌ Debe configurar el tipo de cambio (💱) de {', '.join(sin_cotizacion)} antes de cargar montos en esa moneda.")
+            return False
+
+        montos_en_pesos = montos * tasas
+        if montos_en_pesos.sum() <= 0:
+            print("❌ El total de la composición debe ser mayor a 0")
             return False
+        participacion = porcentajes(montos_en_pesos)
+
+        composicion_completa = {}
+        for j, instrumento in enumerate(nombres):
+            registro = {
+                'monto': float(montos_en_pesos[j]),
+                'porcentaje': float(participacion[j]),
+                'moneda': monedas[j]
+            }
+            if monedas[j] != 'ARS':
+                registro['monto_moneda'] = float(montos[j])
+            composicion_completa[instrumento] = registro
+
+        self.datos['composicion_fondo'] = composicion_completa
+        self.registrar_snapshot_composicion()
+
+        print("✅ Composición actualizada:")
+        for instrumento, datos in composicion_completa.items():
+            moneda = datos.get('moneda', 'ARS')
+            porcentaje = datos.get('porcentaje', 0.0)
+            monto_pesos = datos.get('monto', 0.0)
+            if moneda != 'ARS' and 'monto_moneda' in datos:
+                monto_moneda = datos['monto_moneda']
+                simbolo = 'US$' if moneda == 'USD' else moneda
+                print(f"  • {instrumento}: {simbolo} {monto_moneda:,.2f} (=${monto_pesos:,.2f}) ({porcentaje:.1f}%)")
+            else:
+                print(f"  • {instrumento}: ${monto_pesos:,.2f} ({porcentaje:.1f}%)")
 
-    def actualizar_tipo_cambio(self, tipo_cambio: float):
-        """Actualiza el valor del tipo de cambio USD/ARS"""
+        return True
+
+    def registrar_snapshot_composicion(self, fecha: Optional[str] = None):
+        """Guarda la composición vigente en el historial (una entrada por día)"""
+        fecha = fecha or date.today().isoformat()
+        snapshot = {
+            'fecha': fecha,
+            'tipo_cambio': self.datos.get('tipo_cambio', 0.0) or 0.0,
+            'tipos_cambio': self.tabla_tipos_cambio().vigentes(fecha),
+            'instrumentos': {
+                nombre: dict(registro)
+                for nombre, registro in self.datos['composicion_fondo'].items()
+            }
+        }
+        historial = [
+            s for s in self.datos.setdefault('historial_composicion', [])
+            if s.get('fecha') != fecha
+        ]
+        historial.append(snapshot)
+        historial.sort(key=lambda s: s.get('fecha', ''))
+        self.datos['historial_composicion'] = historial
+
+    def tabla_tipos_cambio(self):
+        """Tabla fechada de cotizaciones del fondo"""
+        from tipos_cambio import TablaTiposCambio
+
+        return TablaTiposCambio.desde_datos(self.datos)
+
+    def actualizar_tipo_cambio(self, tipo_cambio: float, moneda: str = 'USD',
+                               fecha: Optional[str] = None):
+        """Registra la cotización de una moneda (pesos por unidad) en una fecha"""
         try:
             tipo_cambio = float(tipo_cambio)
         except (TypeError, ValueError):
@@ -481,10 +1289,222 @@ class FondoAdminConsole:
             print("❌ El tipo de cambio debe ser mayor a 0")
             return False
 
-        self.datos['tipo_cambio'] = tipo_cambio
-        print(f"✅ Tipo de cambio actualizado a ${tipo_cambio:,.2f} (ARS por USD)")
+        moneda = (moneda or 'USD').strip().upper()
+        if not moneda or moneda == 'ARS':
+            print("❌ Indique una moneda distinta del peso (ARS)")
+            return False
+
+        fecha = fecha or date.today().isoformat()
+        try:
+            date.fromisoformat(fecha)
+        except ValueError:
+            print(f"❌ Fecha inválida: {fecha}. Use el formato AAAA-MM-DD")
+            return False
+
+        tabla = self.tabla_tipos_cambio()
+        tabla.agregar(moneda, fecha, tipo_cambio)
+        self._guardar_tabla_tipos_cambio(tabla)
+        print(f"✅ Tipo de cambio {moneda} del {fecha} actualizado a ${tipo_cambio:,.2f} (ARS por {moneda})")
+        return True
+
+    def cargar_tipos_cambio_csv(self, ruta_csv: str):
+        """Carga cotizaciones históricas desde un CSV con columnas fecha,moneda,valor"""
+        tabla = self.tabla_tipos_cambio()
+        cargadas = 0
+        try:
+            with open(ruta_csv, 'r', encoding='utf-8-sig', newline='') as f:
+                lector = csv.DictReader(f)
+                columnas = {c.strip().lower(): c for c in (lector.fieldnames or [])}
+                if not {'fecha', 'moneda', 'valor'} <= set(columnas):
+                    print("❌ El CSV debe tener las columnas 'fecha', 'moneda' y 'valor'")
+                    return False
+                for numero, fila in enumerate(lector, start=2):
+                    fecha = (fila.get(columnas['fecha']) or '').strip()
+                    moneda = (fila.get(columnas['moneda']) or '').strip().upper()
+                    try:
+                        date.fromisoformat(fecha[:10])
+                        valor = float(fila.get(columnas['valor']) or '')
+                    except ValueError:
+                        print(f"❌ Fila inválida en la línea {numero}: {dict(fila)}")
+                        return False
+                    if valor <= 0 or not moneda or moneda == 'ARS':
+                        print(f"❌ Fila inválida en la línea {numero}: {dict(fila)}")
+                        return False
+                    tabla.agregar(moneda, fecha, valor)
+                    cargadas += 1
+        except OSError as e:
+            print(f"❌ No se pudo leer {ruta_csv}: {e}")
+            return False
+
+        self._guardar_tabla_tipos_cambio(tabla)
+        print(f"✅ {cargadas} cotizaciones cargadas ({', '.join(tabla.monedas())})")
         return True
 
+    def _guardar_tabla_tipos_cambio(self, tabla):
+        self.datos['tipos_cambio'] = tabla.a_datos()
+        # Compatibilidad: el escalar sigue reflejando la última cotización del dólar.
+        if tabla.fechas('USD'):
+            self.datos['tipo_cambio'] = tabla.cotizacion('USD')
+
+    def verificar_invariantes(self, completo: bool = False) -> Dict:
+        """Concilia cuotapartes de clientes, total del fondo y transacciones.
+
+        Después de la primera corrida solo se procesan las transacciones
+        agregadas desde el último checkpoint (salvo que se pida ``completo``).
+        """
+        from conciliacion import conciliar
+
+        reporte = conciliar(self.datos, self.archivo_datos, completo=completo)
+        if completo and self.datos.get('saldos_arrastrados'):
+            from archivo_historico import verificar_archivo
+
+            archivo = verificar_archivo(self.datos, self.archivo_datos)
+            reporte['invariantes']['archivo_historico'] = archivo
+            reporte['ok'] = reporte['ok'] and archivo['ok']
+        return reporte
+
+    def archivar_transacciones(self, meses: int) -> bool:
+        """Mueve a segmentos mensuales las transacciones de más de ``meses`` meses"""
+        from archivo_historico import archivar, directorio_archivo, limite_archivo
+        from conciliacion import invalidar_checkpoint
+
+        antes_de = limite_archivo(meses)
+        try:
+            resumen = archivar(self.datos, self.archivo_datos, antes_de)
+        except (OSError, ValueError) as e:
+            print(f"❌ Error archivando transacciones: {e}")
+            return False
+        if not resumen['transacciones']:
+            print(f"✅ No hay transacciones anteriores a {antes_de} para archivar")
+            return False
+
+        invalidar_checkpoint(self.archivo_datos)
+        print(f"✅ {resumen['transacciones']:,} transacciones anteriores a {antes_de} archivadas "
+              f"en {len(resumen['segmentos'])} segmentos")
+        print(f"   Quedan {resumen['restantes']:,} en el archivo de datos")
+        print(f"   Directorio: {directorio_archivo(self.archivo_datos)}")
+        return True
+
+    def generar_estados_cuenta(self, periodo: str, directorio: Optional[str] = None,
+                               formatos: Optional[List[str]] = None,
+                               procesos: Optional[int] = None) -> Optional[Dict]:
+        """Genera los estados de cuenta de todos los clientes para un período"""
+        from estados_cuenta import FORMATOS, generar_estados_cuenta
+
+        if not self.datos['clientes']:
+            print("❌ No hay clientes registrados")
+            return None
+
+        directorio = directorio or os.path.join(
+            os.path.dirname(os.path.abspath(self.archivo_datos)),
+            'estados_cuenta',
+            periodo.replace(':', '_'),
+        )
+        try:
+            resumen = generar_estados_cuenta(
+                self.datos,
+                periodo,
+                directorio,
+                formatos=formatos or FORMATOS,
+                procesos=procesos,
+                archivo_datos=self.archivo_datos,
+            )
+        except ValueError as e:
+            print(f"❌ {e}")
+            return None
+
+        print(f"✅ Estados de cuenta del período {resumen['periodo']}")
+        print(f"   Clientes: {resumen['clientes']} | Archivos: {resumen['archivos']}")
+        print(f"   Procesos: {resumen['procesos']} | Tiempo: {resumen['segundos']:.2f}s "
+              f"({resumen['clientes_por_segundo']:,.1f} clientes/s)")
+        print(f"   Directorio: {resumen['directorio']}")
+        return resumen
+
+    def cierre_diario(self, tareas: Optional[List[str]] = None,
+                      fecha: Optional[date] = None) -> bool:
+        """Ejecuta las tareas de cierre del día y materializa sus resultados"""
+        from cierre_diario import TAREAS, ejecutar_cierre, ruta_cierre
+
+        try:
+            resultado = ejecutar_cierre(
+                self.datos,
+                self.archivo_datos,
+                self.guardar_datos,
+                tareas or TAREAS,
+                fecha,
+            )
+        except ValueError as e:
+            print(f"❌ {e}")
+            return False
+
+        print(f"🌙 Cierre del {resultado['fecha']}")
+        for nombre, tarea in resultado['tareas'].items():
+            estado = '✅' if tarea['ok'] else f"❌ {tarea.get('error', '')}"
+            print(f"   {estado} {nombre:<17} {tarea['segundos'] * 1000:>8.1f} ms")
+        ordenes = resultado.get('ordenes')
+        if ordenes and (ordenes['liquidadas'] or ordenes['rechazadas']):
+            print(f"   📥 Órdenes liquidadas: {ordenes['liquidadas']}")
+            for orden in ordenes['rechazadas']:
+                print(f"   ❌ {orden['tipo'].capitalize()} rechazado: {orden['cliente']} - "
+                      f"${orden['monto']:,.2f} ({orden['motivo']})")
+        verificacion = resultado.get('verificacion')
+        if verificacion is not None and not verificacion['ok']:
+            print("   ⚠️  La verificación de invariantes encontró diferencias")
+        print(f"   Resultados: {ruta_cierre(self.archivo_datos)}")
+        return resultado['ok']
+
+    def daemon_cierre(self, hora: str, tareas: Optional[List[str]] = None,
+                      archivo_metricas: Optional[str] = None) -> bool:
+        """Ejecuta el cierre diario todos los días hábiles a la hora indicada"""
+        from cierre_diario import (TAREAS, ejecutar_daemon, leer_cierre,
+                                   parsear_hora, validar_tareas)
+
+        try:
+            hora_cierre = parsear_hora(hora)
+            tareas = validar_tareas(tareas or TAREAS)
+        except ValueError as e:
+            print(f"❌ {e}")
+            return False
+
+        ultimo = (leer_cierre(self.archivo_datos) or {}).get('fecha')
+
+        def cerrar(fecha: date):
+            # Un error en una corrida no detiene el daemon: se informa y se
+            # espera al próximo día hábil.
+            try:
+                # Otra consola pudo modificar el archivo desde el último cierre.
+                # Se lee en modo estricto para no cerrar (ni guardar) sobre una
+                # estructura vacía si el archivo no se pudo leer.
+                self.datos = self.cargar_datos(estricto=True)
+                self.reconstruir_indices()
+                self.cierre_diario(tareas, fecha)
+            except Exception as e:
+                print(f"❌ Cierre del {fecha.isoformat()} no ejecutado: {e}")
+            if archivo_metricas:
+                self.exportar_metricas(archivo_metricas)
+
+        print(f"🕒 Cierre diario programado a las {hora_cierre:%H:%M} "
+              f"(lunes a viernes): {', '.join(tareas)}")
+        print("   Ctrl+C para detener")
+        try:
+            ejecutar_daemon(
+                cerrar,
+                hora_cierre,
+                date.fromisoformat(ultimo) if ultimo else None,
+            )
+        except KeyboardInterrupt:
+            print("\n👋 Cierre diario detenido")
+        return True
+
+    def exportar_metricas(self, ruta: str) -> bool:
+        """Escribe las métricas del proceso en formato Prometheus"""
+        try:
+            REGISTRO.escribir(ruta)
+            return True
+        except OSError as e:
+            print(f"❌ Error escribiendo métricas: {e}")
+            return False
+
     def menu_interactivo(self):
         """Menu interactivo para operaciones"""
         while True:
@@ -500,14 +1520,18 @@ class FondoAdminConsole:
             print("7. 👤 Administrar usuarios")
             print("8. 💱 Actualizar tipo de cambio")
             print("9. 💾 Guardar datos")
-            print("10. 🚪 Salir")
+            print("10. 🏦 Cambiar de fondo")
+            print("11. 🚪 Salir")
             print("="*40)
             
             try:
                 opcion = input("Seleccione una opción: ").strip()
                 
                 if opcion == '1':
-                    self.mostrar_estado()
+                    self.paginar_interactivo(
+                        len(self.datos['clientes']),
+                        lambda top, pagina: self.mostrar_estado(top, pagina=pagina),
+                    )
                 
                 elif opcion == '2':
                     balance_actual = self.get_balance_total()
@@ -517,7 +1541,7 @@ class FondoAdminConsole:
                 
                 elif opcion == '3':
                     nombre = input("Nombre del cliente: ").strip()
-                    saldo_str = input("Saldo inicial (0 si no tiene): $").strip()
+                    saldo_str = input("Saldo inicial, se liquida con el próximo balance (0 si no tiene): $").strip()
                     saldo = float(saldo_str) if saldo_str else 0
                     self.agregar_cliente(nombre, saldo)
                 
@@ -525,8 +1549,10 @@ class FondoAdminConsole:
                     if not self.datos['clientes']:
                         print("❌ No hay clientes registrados")
                         continue
-                    print("Clientes disponibles:", ", ".join(self.datos['clientes'].keys()))
-                    cliente = input("Cliente: ").strip()
+                    self.mostrar_disponibles("Clientes", self.indice_clientes)
+                    cliente = self.pedir_cliente()
+                    if cliente is None:
+                        continue
                     monto = float(input("Monto de suscripción: $"))
                     self.suscripcion(cliente, monto)
                 
@@ -534,8 +1560,10 @@ class FondoAdminConsole:
                     if not self.datos['clientes']:
                         print("❌ No hay clientes registrados")
                         continue
-                    print("Clientes disponibles:", ", ".join(self.datos['clientes'].keys()))
-                    cliente = input("Cliente: ").strip()
+                    self.mostrar_disponibles("Clientes", self.indice_clientes)
+                    cliente = self.pedir_cliente()
+                    if cliente is None:
+                        continue
                     monto = float(input("Monto de rescate: $"))
                     self.rescate(cliente, monto)
                 
@@ -543,21 +1571,35 @@ class FondoAdminConsole:
                     print("Formato: 'Instrumento1:monto1[:moneda1],Instrumento2:monto2[:moneda2],...'")
                     print("Ejemplo: 'Bonos:10000,Acciones:15000,USD Liquidez:10:USD'")
                     print("Si no se indica moneda se asume pesos (ARS).")
+                    print("También puede indicar la ruta de un CSV (instrumento,monto[,moneda]).")
                     composicion = input("Composición: ").strip()
-                    if composicion:
+                    if composicion.lower().endswith('.csv'):
+                        self.cargar_composicion_csv(composicion)
+                    elif composicion:
                         self.actualizar_composicion(composicion)
 
                 elif opcion == '7':
                     self.menu_usuarios()
 
                 elif opcion == '8':
-                    valor = float(input("Nuevo tipo de cambio (ARS por USD): "))
-                    self.actualizar_tipo_cambio(valor)
+                    moneda = input("Moneda [USD]: ").strip().upper() or 'USD'
+                    valor = float(input(f"Nuevo tipo de cambio (ARS por {moneda}): "))
+                    fecha = input("Fecha (AAAA-MM-DD) [hoy]: ").strip() or None
+                    self.actualizar_tipo_cambio(valor, moneda, fecha)
 
                 elif opcion == '9':
                     self.guardar_datos()
 
                 elif opcion == '10':
+                    self.listar_fondos()
+                    fondo_id = input("Fondo: ").strip()
+                    if fondo_id:
+                        guardar = input("¿Guardar los cambios del fondo actual? (s/n) [s]: ").strip().lower()
+                        if guardar in ('', 's', 'si', 'sí'):
+                            self.guardar_datos()
+                        self.cambiar_fondo(fondo_id)
+
+                elif opcion == '11':
                     print("👋 ¡Hasta luego!")
                     break
 
@@ -577,20 +1619,62 @@ def main():
     parser = argparse.ArgumentParser(description='Administrador del Fondo de Inversión')
     parser.add_argument('--archivo', '-f', default='fondo_datos.json', 
                        help='Archivo de datos JSON (default: fondo_datos.json)')
+    parser.add_argument('--fondo',
+                        help='Fondo del catálogo (fondos.json) a administrar; reemplaza a --archivo')
+    parser.add_argument('--listar-fondos', action='store_true',
+                        help='Mostrar los fondos del catálogo')
+    parser.add_argument('--consolidado', action='store_true',
+                        help='Mostrar el patrimonio agregado de todos los fondos')
+    parser.add_argument('--fondos-usuario', nargs=2, metavar=('USUARIO', 'FONDOS'),
+                        help='Asignar fondos visibles a un usuario: --fondos-usuario juan "andes,renta"')
     parser.add_argument('--balance', '-b', type=float,
                        help='Actualizar balance directamente')
+    parser.add_argument('--balances-csv', metavar='ARCHIVO',
+                        help='Corregir balances de fechas pasadas desde un CSV con columnas fecha,balance '
+                             '(recalcula el valor de cuotaparte y reprecia las órdenes del tramo)')
     parser.add_argument('--cliente', '-c', 
                        help='Agregar cliente (usar con --saldo)')
     parser.add_argument('--saldo', '-s', type=float, default=0,
-                       help='Saldo inicial para nuevo cliente')
+                       help='Saldo inicial para nuevo cliente: queda como suscripción pendiente '
+                            'y se liquida con el próximo --balance (o el cierre diario); con '
+                            '--balance en el mismo comando se liquida enseguida')
     parser.add_argument('--suscripcion', nargs=2, metavar=('CLIENTE', 'MONTO'),
-                       help='Registrar suscripción: --suscripcion "Juan Perez" 5000')
+                       help='Registrar orden de suscripción: --suscripcion "Juan Perez" 5000')
     parser.add_argument('--rescate', nargs=2, metavar=('CLIENTE', 'MONTO'),
-                       help='Registrar rescate: --rescate "Juan Perez" 2000')
+                       help='Registrar orden de rescate: --rescate "Juan Perez" 2000')
+    parser.add_argument('--ordenes', action='store_true',
+                        help='Listar las órdenes pendientes de liquidación')
+    parser.add_argument('--devengar-comisiones', action='store_true',
+                        help='Devengar comisiones de administración y éxito de todos los clientes')
+    parser.add_argument('--tasa-administracion', type=float, metavar='PCT',
+                        help='Comisión de administración en %% anual (se guarda para los próximos cierres)')
+    parser.add_argument('--tasa-exito', type=float, metavar='PCT',
+                        help='Comisión de éxito en %% sobre la ganancia por encima del máximo')
+    parser.add_argument('--pagar-comisiones', type=float, metavar='MONTO',
+                        help='Registrar el cobro de comisiones devengadas desde la cartera del fondo')
+    parser.add_argument('--simular', action='store_true',
+                        help='Con --devengar-comisiones, --importar-usuarios o --balances-csv, '
+                             'solo mostrar el resultado sin registrarlo')
     parser.add_argument('--composicion',
                        help="Actualizar composición (formato 'Instrumento:monto[:moneda]'). Ej: --composicion \"Bonos:10000,USD Liquidez:10:USD\"")
+    parser.add_argument('--composicion-csv', metavar='ARCHIVO',
+                        help='Actualizar composición desde un CSV con columnas instrumento,monto[,moneda]')
     parser.add_argument('--tipo-cambio', type=float,
-                       help='Actualizar tipo de cambio (ARS por USD)')
+                       help='Actualizar tipo de cambio (ARS por unidad de --moneda, USD por defecto)')
+    parser.add_argument('--moneda', default='USD',
+                        help='Moneda del tipo de cambio indicado con --tipo-cambio (default: USD)')
+    parser.add_argument('--fecha-cambio', metavar='AAAA-MM-DD',
+                        help='Fecha de la cotización indicada con --tipo-cambio (default: hoy)')
+    parser.add_argument('--tipos-cambio-csv', metavar='ARCHIVO',
+                        help='Cargar cotizaciones históricas desde un CSV con columnas fecha,moneda,valor')
+    parser.add_argument('--top', type=int, metavar='N',
+                        help='Con --estado o --listar-usuarios, mostrar solo N elementos por página')
+    parser.add_argument('--ordenar', choices=FondoAdminConsole.ORDENES_CLIENTES,
+                        help='Orden de los clientes en --estado (por defecto valor si se usa --top)')
+    parser.add_argument('--pagina', type=int, default=1,
+                        help='Página a mostrar con --top (desde 1)')
+    parser.add_argument('--json', action='store_true',
+                        help='Salida en JSON para --estado y --listar-usuarios')
     parser.add_argument('--estado', action='store_true',
                        help='Mostrar estado actual del fondo')
     parser.add_argument('--crear-usuario', metavar='USUARIO',
@@ -601,23 +1685,64 @@ def main():
                         help='Clientes asociados al usuario (separados por comas)')
     parser.add_argument('--password',
                         help='Contraseña para crear o actualizar usuarios (si no se proporciona se solicitará)')
+    parser.add_argument('--importar-usuarios', metavar='ARCHIVO',
+                        help='Crear usuarios en lote desde un CSV (usuario,password[,rol,clientes,fondos])')
     parser.add_argument('--reset-password', metavar='USUARIO',
                         help='Restablecer la contraseña de un usuario existente')
     parser.add_argument('--listar-usuarios', action='store_true',
                         help='Mostrar usuarios registrados')
+    parser.add_argument('--verificar', action='store_true',
+                        help='Verificar invariantes del fondo y mostrar el reporte en JSON')
+    parser.add_argument('--completo', action='store_true',
+                        help='Con --verificar, recorrer todas las transacciones ignorando el checkpoint')
+    parser.add_argument('--archivar', action='store_true',
+                        help='Mover las transacciones antiguas a segmentos mensuales')
+    parser.add_argument('--meses-archivo', type=int, metavar='N',
+                        default=int(os.environ.get('FCI_ARCHIVO_MESES', '12')),
+                        help='Meses completos que quedan en el archivo de datos con --archivar (por defecto 12)')
+    parser.add_argument('--convertir-formato', choices=almacenamiento.FORMATOS,
+                        help='Reescribir el archivo de datos en otro formato (json, min, gzip, lzma)')
+    parser.add_argument('--benchmark-formatos', action='store_true',
+                        help='Comparar tamaño y tiempos de guardado/carga de cada formato')
+    parser.add_argument('--estados-cuenta', metavar='PERIODO',
+                        help='Generar estados de cuenta de todos los clientes (AAAA-MM o AAAA-MM-DD:AAAA-MM-DD)')
+    parser.add_argument('--salida', metavar='DIRECTORIO',
+                        help='Directorio de salida para --estados-cuenta')
+    parser.add_argument('--formatos', default='csv,html,pdf',
+                        help='Formatos de los estados de cuenta, separados por comas (csv,html,pdf)')
+    parser.add_argument('--procesos', type=int,
+                        help='Procesos para estados de cuenta o hilos para --importar-usuarios '
+                             '(por defecto, uno por CPU)')
+    parser.add_argument('--cierre', action='store_true',
+                        help='Ejecutar ahora las tareas de cierre del día')
+    parser.add_argument('--daemon', action='store_true',
+                        help='Ejecutar el cierre diario en forma programada (no termina)')
+    parser.add_argument('--hora-cierre', metavar='HH:MM',
+                        default=os.environ.get('FCI_HORA_CIERRE', '18:00'),
+                        help='Hora del cierre diario para --daemon (por defecto 18:00)')
+    parser.add_argument('--tareas-cierre', metavar='TAREAS',
+                        help='Tareas de cierre separadas por coma '
+                             '(comisiones,balance,valor_cuotaparte,rollups,agregados,verificar)')
+    parser.add_argument('--metricas', metavar='ARCHIVO',
+                        default=os.environ.get('FCI_METRICAS_ARCHIVO'),
+                        help='Escribir métricas en formato Prometheus al terminar')
     
     args = parser.parse_args()
     
+    archivo = args.archivo
+    if args.fondo:
+        catalogo = cargar_catalogo()
+        if args.fondo not in catalogo['fondos']:
+            print(f"❌ Fondo {args.fondo} no existe en el catálogo")
+            sys.exit(1)
+        archivo = catalogo['fondos'][args.fondo]['archivo']
+
     # Inicializar administrador
-    admin = FondoAdminConsole(args.archivo)
+    admin = FondoAdminConsole(archivo)
     
     # Procesar argumentos
     cambios_realizados = False
     
-    if args.balance is not None:
-        admin.actualizar_balance(args.balance)
-        cambios_realizados = True
-    
     if args.cliente:
         admin.agregar_cliente(args.cliente, args.saldo)
         cambios_realizados = True
@@ -632,14 +1757,49 @@ def main():
         admin.rescate(cliente, float(monto))
         cambios_realizados = True
 
+    # Antes del balance: la valuación del custodio ya no incluye lo cobrado.
+    if args.pagar_comisiones is not None:
+        if admin.pagar_comisiones(args.pagar_comisiones):
+            cambios_realizados = True
+
+    # Primero las fechas pasadas, así el balance de hoy parte de la serie corregida.
+    if args.balances_csv:
+        if admin.corregir_balances(args.balances_csv, args.simular):
+            cambios_realizados = True
+
+    # Después de registrar órdenes, para liquidarlas en el mismo lote.
+    if args.balance is not None:
+        if admin.actualizar_balance(args.balance):
+            cambios_realizados = True
+
+    if args.devengar_comisiones:
+        if admin.devengar_comisiones(args.tasa_administracion, args.tasa_exito, args.simular):
+            cambios_realizados = True
+
     if args.composicion:
         admin.actualizar_composicion(args.composicion)
         cambios_realizados = True
 
+    if args.composicion_csv:
+        if admin.cargar_composicion_csv(args.composicion_csv):
+            cambios_realizados = True
+
     if args.tipo_cambio is not None:
-        if admin.actualizar_tipo_cambio(args.tipo_cambio):
+        if admin.actualizar_tipo_cambio(args.tipo_cambio, args.moneda, args.fecha_cambio):
             cambios_realizados = True
 
+    if args.tipos_cambio_csv:
+        if admin.cargar_tipos_cambio_csv(args.tipos_cambio_csv):
+            cambios_realizados = True
+
+    # Los usuarios del panel viven en el fondo principal, aunque se haya
+    # elegido otro fondo con --fondo.
+    usuarios = admin
+    cambios_usuarios = False
+    if any([args.crear_usuario, args.importar_usuarios, args.reset_password,
+            args.fondos_usuario, args.listar_usuarios]):
+        usuarios = admin.consola_usuarios()
+
     if args.crear_usuario:
         password = args.password
         if not password:
@@ -654,11 +1814,15 @@ def main():
                 if not clientes_usuario:
                     print("❌ Debe indicar clientes asociados con --clientes-usuario")
                 else:
-                    if admin.crear_usuario(args.crear_usuario, password, args.rol, clientes_usuario):
-                        cambios_realizados = True
+                    if usuarios.crear_usuario(args.crear_usuario, password, args.rol, clientes_usuario):
+                        cambios_usuarios = True
             else:
-                if admin.crear_usuario(args.crear_usuario, password, args.rol, []):
-                    cambios_realizados = True
+                if usuarios.crear_usuario(args.crear_usuario, password, args.rol, []):
+                    cambios_usuarios = True
+
+    if args.importar_usuarios:
+        if usuarios.importar_usuarios(args.importar_usuarios, args.procesos, args.simular, args.json):
+            cambios_usuarios = True
 
     if args.reset_password:
         nuevo_password = args.password
@@ -667,32 +1831,111 @@ def main():
         if not nuevo_password:
             print("❌ Debe proporcionar una contraseña para actualizar")
         else:
-            if admin.actualizar_password(args.reset_password, nuevo_password):
-                cambios_realizados = True
+            if usuarios.actualizar_password(args.reset_password, nuevo_password):
+                cambios_usuarios = True
+
+    if args.fondos_usuario:
+        username, fondos = args.fondos_usuario
+        fondos = [f.strip() for f in fondos.split(',') if f.strip()]
+        if usuarios.asignar_fondos_usuario(username, fondos):
+            cambios_usuarios = True
+
+    if cambios_usuarios:
+        if usuarios is admin:
+            cambios_realizados = True
+        else:
+            usuarios.guardar_datos()
+
+    top = args.top or (20 if args.pagina > 1 else None)
+
+    if args.ordenes:
+        admin.mostrar_ordenes(args.json)
 
     if args.listar_usuarios:
-        admin.listar_usuarios()
+        usuarios.listar_usuarios(top, args.pagina, args.json)
+
+    if args.listar_fondos:
+        admin.listar_fondos()
+
+    if args.consolidado:
+        admin.mostrar_consolidado()
+
+    if args.archivar:
+        if admin.archivar_transacciones(args.meses_archivo):
+            cambios_realizados = True
+
+    reporte_verificacion = None
+    if args.verificar:
+        reporte_verificacion = admin.verificar_invariantes(completo=args.completo)
+        print(json.dumps(reporte_verificacion, indent=2, ensure_ascii=False))
+
+    if args.estados_cuenta:
+        formatos = [f.strip().lower() for f in args.formatos.split(',') if f.strip()]
+        admin.generar_estados_cuenta(args.estados_cuenta, args.salida, formatos, args.procesos)
 
     if cambios_realizados:
         admin.guardar_datos()
 
+    if args.convertir_formato:
+        admin.convertir_formato(args.convertir_formato)
+
+    if args.benchmark_formatos:
+        admin.comparar_formatos()
+
+    tareas_cierre = None
+    if args.tareas_cierre:
+        tareas_cierre = [t.strip() for t in args.tareas_cierre.split(',') if t.strip()]
+
+    cierre_ok = True
+    if args.cierre:
+        cierre_ok = admin.cierre_diario(tareas_cierre)
+
     if args.estado or not any(vars(args).values()):
-        admin.mostrar_estado()
+        admin.mostrar_estado(top, args.ordenar, args.pagina, args.json)
     
     # Si no se pasaron argumentos específicos, abrir menú interactivo
     if not any([
         args.balance is not None,
+        args.balances_csv,
         args.cliente,
         args.suscripcion,
         args.rescate,
+        args.ordenes,
+        args.devengar_comisiones,
+        args.pagar_comisiones is not None,
         args.composicion,
+        args.composicion_csv,
         args.tipo_cambio is not None,
+        args.tipos_cambio_csv,
         args.estado,
         args.crear_usuario,
+        args.importar_usuarios,
         args.reset_password,
         args.listar_usuarios,
+        args.verificar,
+        args.fondos_usuario,
+        args.listar_fondos,
+        args.consolidado,
+        args.estados_cuenta,
+        args.archivar,
+        args.convertir_formato,
+        args.benchmark_formatos,
+        args.cierre,
+        args.daemon,
     ]):
         admin.menu_interactivo()
 
+    if args.daemon:
+        admin.daemon_cierre(args.hora_cierre, tareas_cierre, args.metricas)
+
+    if args.metricas:
+        admin.exportar_metricas(args.metricas)
+
+    if reporte_verificacion is not None and not reporte_verificacion['ok']:
+        sys.exit(1)
+
+    if not cierre_ok:
+        sys.exit(1)
+
 if __name__ == "__main__":
-    main()
\ No newline at end of file
+    main()
@@ -0,0 +1,341 @@
+"""Lectura y escritura del archivo de datos en distintos formatos.
+
+Formatos disponibles:
+
+* ``json``: JSON indentado (formato histórico, cómodo para leer a mano).
+* ``min``: JSON sin espacios, aproximadamente la mitad de tamaño.
+* ``gzip`` y ``lzma``: JSON sin espacios comprimido.
+
+El formato se detecta al leer por los primeros bytes del archivo (no por la
+extensión), así que la consola y el panel cargan cualquiera de ellos sin
+configuración. Al guardar se conserva el formato que ya tenía el archivo; para
+cambiarlo se usa :func:`convertir`.
+
+Las secciones que crecen con el tiempo (``SECCIONES_DIFERIDAS``) se escriben
+al final del objeto. :func:`cargar_diferido` parsea de entrada solo las
+secciones chicas (clientes, usuarios, valor de cuotaparte, composición, tipos
+de cambio) y deja el resto del texto sin parsear hasta que alguien accede a una
+sección grande; entonces avanza con un parser incremental hasta esa sección.
+Los archivos escritos con el orden anterior se leen igual, pero recién quedan
+ordenados al volver a guardarlos (o con ``--convertir-formato``).
+
+No se ofrece un formato binario propio (``pickle``/``marshal``): cargarlo
+automáticamente permitiría ejecutar código desde el archivo de datos o
+dependería de la versión de Python.
+"""
+
+from __future__ import annotations
+
+import gzip
+import json
+import lzma
+import os
+import re
+import tempfile
+import threading
+import time
+from typing import Any, Dict, Iterator, List, Optional, Tuple
+
+FORMATOS = ("json", "min", "gzip", "lzma")
+FORMATO_POR_DEFECTO = "json"
+
+# En el orden en que se escriben al final del archivo: el balance diario se
+# necesita antes que las transacciones.
+SECCIONES_DIFERIDAS = ("balance_diario", "historial_composicion", "transacciones")
+
+_MAGIA_GZIP = b"\x1f\x8b"
+_ESPACIOS = re.compile(r"[ \t\n\r]*")
+_MAGIA_LZMA = b"\xfd7zXZ\x00"
+
+
+def detectar_formato(ruta: str) -> Optional[str]:
+    """Formato del archivo en ``ruta`` o ``None`` si no existe."""
+    try:
+        with open(ruta, "rb") as f:
+            cabecera = f.read(8)
+    except OSError:
+        return None
+    if cabecera.startswith(_MAGIA_GZIP):
+        return "gzip"
+    if cabecera.startswith(_MAGIA_LZMA):
+        return "lzma"
+    cabecera = cabecera.lstrip(b"\xef\xbb\xbf")
+    # El JSON indentado empieza con "{" y un salto de línea.
+    if cabecera[1:2] in (b"\n", b"\r"):
+        return "json"
+    return "min"
+
+
+def descomprimir(contenido: bytes) -> bytes:
+    """Devuelve el JSON en bytes, descomprimiéndolo si hace falta."""
+    if contenido.startswith(_MAGIA_GZIP):
+        return gzip.decompress(contenido)
+    if contenido.startswith(_MAGIA_LZMA):
+        return lzma.decompress(contenido)
+    return contenido
+
+
+def cargar(ruta: str) -> Dict:
+    """Lee el archivo de datos en cualquiera de los formatos soportados."""
+    with open(ruta, "rb") as f:
+        contenido = f.read()
+    return json.loads(descomprimir(contenido))
+
+
+class DatosDiferidos(dict):
+    """Datos del fondo con las secciones grandes parseadas al primer acceso.
+
+    Se comporta como el ``dict`` que devolvería ``json.load`` (con los valores
+    de ``por_defecto`` para las claves ausentes). Consultar una clave todavía
+    no leída avanza el parser hasta ella; recorrer todas las claves, copiar o
+    serializar lee el archivo completo. El parseo diferido está protegido por
+    un lock: el panel comparte el mismo fondo entre sesiones.
+    """
+
+    def __init__(self, texto: str, por_defecto: Optional[Dict] = None) -> None:
+        super().__init__()
+        self._texto: Optional[str] = texto
+        self._por_defecto = dict(por_defecto or {})
+        self._decodificador = json.JSONDecoder()
+        self._lock = threading.RLock()
+        self._posicion = _ESPACIOS.match(texto, 0).end()
+        if texto[self._posicion:self._posicion + 1] != "{":
+            raise ValueError("El archivo de datos no contiene un objeto JSON")
+        self._posicion += 1
+        while True:
+            siguiente = self._proxima_clave()
+            if siguiente is None or siguiente[0] in SECCIONES_DIFERIDAS:
+                break
+            self._consumir(*siguiente)
+
+    @property
+    def pendiente(self) -> bool:
+        """``True`` mientras quede texto sin parsear."""
+        return self._texto is not None
+
+    def _proxima_clave(self) -> Optional[Tuple[str, int]]:
+        """Clave siguiente y posición de su valor, sin parsear el valor."""
+        if self._texto is None:
+            return None
+        texto = self._texto
+        posicion = _ESPACIOS.match(texto, self._posicion).end()
+        if texto[posicion:posicion + 1] == "}":
+            self._finalizar()
+            return None
+        clave, posicion = self._decodificador.raw_decode(texto, posicion)
+        posicion = _ESPACIOS.match(texto, posicion).end()
+        if texto[posicion:posicion + 1] != ":":
+            raise ValueError(f"JSON inválido cerca de la posición {posicion}")
+        return clave, _ESPACIOS.match(texto, posicion + 1).end()
+
+    def _consumir(self, clave: str, posicion: int) -> None:
+        texto = self._texto
+        valor, posicion = self._decodificador.raw_decode(texto, posicion)
+        dict.__setitem__(self, clave, valor)
+        posicion = _ESPACIOS.match(texto, posicion).end()
+        if texto[posicion:posicion + 1] == ",":
+            posicion += 1
+        self._posicion = posicion
+        if texto.startswith("}", _ESPACIOS.match(texto, posicion).end()):
+            self._finalizar()
+
+    def _finalizar(self) -> None:
+        self._texto = None
+        for clave, valor in self._por_defecto.items():
+            dict.setdefault(self, clave, valor)
+
+    def _cargar(self, clave: Optional[str] = None) -> None:
+        """Parsea hasta ``clave`` inclusive (todo el resto si es ``None``)."""
+        if self._texto is None:
+            return
+        with self._lock:
+            while self._texto is not None:
+                if clave is not None and dict.__contains__(self, clave):
+                    return
+                siguiente = self._proxima_clave()
+                if siguiente is None:
+                    return
+                self._consumir(*siguiente)
+
+    def materializar(self) -> "DatosDiferidos":
+        self._cargar()
+        return self
+
+    def __missing__(self, clave: Any) -> Any:
+        if self._texto is not None:
+            self._cargar(clave)
+            if dict.__contains__(self, clave):
+                return dict.__getitem__(self, clave)
+        raise KeyError(clave)
+
+    def __contains__(self, clave: object) -> bool:
+        if dict.__contains__(self, clave) or clave in self._por_defecto:
+            return True
+        self._cargar(clave)
+        return dict.__contains__(self, clave)
+
+    def get(self, clave: Any, defecto: Any = None) -> Any:
+        try:
+            return self[clave]
+        except KeyError:
+            return defecto
+
+    def __setitem__(self, clave: Any, valor: Any) -> None:
+        # Se parsea antes para que el valor leído después no pise al nuevo.
+        self._cargar(clave)
+        dict.__setitem__(self, clave, valor)
+
+    def __delitem__(self, clave: Any) -> None:
+        self._cargar(clave)
+        dict.__delitem__(self, clave)
+
+    def setdefault(self, clave: Any, defecto: Any = None) -> Any:
+        self._cargar(clave)
+        return dict.setdefault(self, clave, defecto)
+
+    def pop(self, clave: Any, *defecto: Any) -> Any:
+        self._cargar(clave)
+        return dict.pop(self, clave, *defecto)
+
+    def __iter__(self) -> Iterator:
+        return dict.__iter__(self.materializar())
+
+    def __len__(self) -> int:
+        return dict.__len__(self.materializar())
+
+    def keys(self):
+        return dict.keys(self.materializar())
+
+    def values(self):
+        return dict.values(self.materializar())
+
+    def items(self):
+        return dict.items(self.materializar())
+
+    def copy(self) -> Dict:
+        return dict(dict.items(self.materializar()))
+
+    def __eq__(self, otro: object) -> bool:
+        return dict.__eq__(self.materializar(), otro)
+
+    __hash__ = None  # type: ignore[assignment]
+
+    def __repr__(self) -> str:
+        return dict.__repr__(self.materializar())
+
+    def __reduce__(self):
+        return (dict, (self.copy(),))
+
+
+def cargar_diferido(ruta: str, por_defecto: Optional[Dict] = None) -> DatosDiferidos:
+    """Lee el archivo parseando solo las secciones chicas (ver :class:`DatosDiferidos`)."""
+    with open(ruta, "rb") as f:
+        contenido = f.read()
+    return DatosDiferidos(descomprimir(contenido).decode("utf-8-sig"), por_defecto)
+
+
+def _ordenar_secciones(datos: Dict) -> Dict:
+    """Mismo contenido con las secciones diferidas al final."""
+    if isinstance(datos, DatosDiferidos):
+        datos.materializar()
+    ordenado = {clave: valor for clave, valor in datos.items() if clave not in SECCIONES_DIFERIDAS}
+    for clave in SECCIONES_DIFERIDAS:
+        if clave in datos:
+            ordenado[clave] = datos[clave]
+    return ordenado
+
+
+def serializar(datos: Dict, formato: str) -> bytes:
+    if formato not in FORMATOS:
+        raise ValueError(f"Formato desconocido: {formato}. Opciones: {', '.join(FORMATOS)}")
+    datos = _ordenar_secciones(datos)
+    if formato == "json":
+        return json.dumps(datos, indent=2, ensure_ascii=False).encode("utf-8")
+    compacto = json.dumps(datos, separators=(",", ":"), ensure_ascii=False).encode("utf-8")
+    if formato == "gzip":
+        return gzip.compress(compacto, compresslevel=6, mtime=0)
+    if formato == "lzma":
+        return lzma.compress(compacto)
+    return compacto
+
+
+def guardar(ruta: str, datos: Dict, formato: Optional[str] = None) -> str:
+    """Escribe ``datos`` en ``ruta`` y devuelve el formato usado.
+
+    Sin ``formato`` se conserva el del archivo existente. La escritura es
+    atómica: se escribe un temporal en el mismo directorio y se reemplaza.
+    """
+    formato = formato or detectar_formato(ruta) or FORMATO_POR_DEFECTO
+    contenido = serializar(datos, formato)
+    directorio = os.path.dirname(os.path.abspath(ruta))
+    descriptor, temporal = tempfile.mkstemp(
+        prefix=".", suffix=".tmp", dir=directorio
+    )
+    try:
+        with os.fdopen(descriptor, "wb") as f:
+            f.write(contenido)
+        modo = os.stat(ruta).st_mode & 0o777 if os.path.exists(ruta) else 0o644
+        os.chmod(temporal, modo)
+        os.replace(temporal, ruta)
+    except BaseException:
+        if os.path.exists(temporal):
+            os.remove(temporal)
+        raise
+    return formato
+
+
+def convertir(ruta: str, formato: str, destino: Optional[str] = None) -> Dict[str, int]:
+    """Reescribe el archivo de datos en ``formato`` (o lo copia a ``destino``)."""
+    tamano_anterior = os.path.getsize(ruta)
+    datos = cargar(ruta)
+    destino = destino or ruta
+    guardar(destino, datos, formato)
+    return {"bytes_antes": tamano_anterior, "bytes_despues": os.path.getsize(destino)}
+
+
+def comparar_formatos(ruta: str, repeticiones: int = 3) -> List[Dict]:
+    """Mide tamaño, tiempo de guardado y de carga de cada formato.
+
+    Usa los datos de ``ruta`` y archivos temporales; no modifica el original.
+    Los tiempos son la mejor de ``repeticiones`` corridas, en milisegundos.
+    """
+    datos = cargar(ruta)
+    resultados: List[Dict] = []
+    with tempfile.TemporaryDirectory() as directorio:
+        for formato in FORMATOS:
+            destino = os.path.join(directorio, f"datos.{formato}")
+            guardado = carga = float("inf")
+            for _ in range(max(1, repeticiones)):
+                inicio = time.perf_counter()
+                guardar(destino, datos, formato)
+                guardado = min(guardado, time.perf_counter() - inicio)
+                inicio = time.perf_counter()
+                cargar(destino)
+                carga = min(carga, time.perf_counter() - inicio)
+            resultados.append(
+                {
+                    "formato": formato,
+                    "bytes": os.path.getsize(destino),
+                    "guardar_ms": guardado * 1000,
+                    "cargar_ms": carga * 1000,
+                }
+            )
+    base = resultados[0]["bytes"] or 1
+    for resultado in resultados:
+        resultado["relativo"] = resultado["bytes"] / base
+    return resultados
+
+
+__all__ = [
+    "FORMATOS",
+    "SECCIONES_DIFERIDAS",
+    "DatosDiferidos",
+    "cargar",
+    "cargar_diferido",
+    "comparar_formatos",
+    "convertir",
+    "descomprimir",
+    "detectar_formato",
+    "guardar",
+    "serializar",
+]
@@ -0,0 +1,354 @@
+"""Archivo mensual de transacciones antiguas.
+
+Las transacciones anteriores a un horizonte (meses completos) se mueven del
+archivo de datos a segmentos inmutables, uno por mes, en el directorio
+``<archivo>.archivo/``::
+
+    fondo_datos.archivo/
+        manifiesto.json
+        2024-01.json.gz
+        2024-02.json.gz
+
+Cada segmento es un JSON comprimido con las transacciones del mes. El
+manifiesto describe cada segmento sin abrirlo: cantidad de movimientos,
+fechas extremas, flujos del mes, totales por cliente y el SHA-256 del archivo
+(un segmento que cambió en disco se rechaza al leerlo). Un segmento ya escrito
+no se modifica: si después se archiva otra transacción del mismo mes (cargada
+con fecha pasada), va a un segmento nuevo (``2024-01-2.json.gz``).
+
+El archivo de datos conserva solo los movimientos recientes y, en
+``saldos_arrastrados``, las cuotapartes de cada cliente acumuladas en los
+segmentos y la lista de segmentos que las componen::
+
+    "saldos_arrastrados": {
+        "hasta": "2025-10-01",
+        "segmentos": ["2024-01.json.gz", "2024-02.json.gz"],
+        "cuotapartes": {"Enzo": 120.5, "Roberto": 80.0}
+    }
+
+Esa lista es la referencia: los segmentos del manifiesto que no figuran en
+ella (por ejemplo, si se interrumpió un archivado antes de guardar el archivo
+de datos) se ignoran al leer y se descartan en el siguiente archivado.
+
+Las consultas piden el libro desde una fecha (:func:`libro`): si la fecha es
+posterior al corte alcanzan los saldos arrastrados y los movimientos
+recientes; si es anterior se abren solo los segmentos desde ese mes, y las
+cuotapartes iniciales salen de los totales del manifiesto.
+"""
+
+from __future__ import annotations
+
+import hashlib
+import json
+import os
+import threading
+from collections import OrderedDict
+from datetime import date
+from typing import Dict, Iterable, List, Optional, Sequence, Tuple
+
+import almacenamiento
+
+MANIFIESTO = "manifiesto.json"
+VERSION_MANIFIESTO = 1
+MESES_POR_DEFECTO = 12
+# Segmentos leídos que se conservan en memoria (son inmutables).
+SEGMENTOS_EN_MEMORIA = 24
+
+_FLUJOS = {"suscripcion": "suscripciones", "rescate": "rescates", "comision": "comisiones"}
+_TOTALES_CLIENTE = {"suscripcion": "suscripto", "rescate": "rescatado", "comision": "comisiones"}
+
+_segmentos: "OrderedDict[Tuple[str, str], List[Dict]]" = OrderedDict()
+_lock_segmentos = threading.Lock()
+
+
+def directorio_archivo(archivo_datos: str) -> str:
+    base, _ = os.path.splitext(archivo_datos)
+    return f"{base}.archivo"
+
+
+def ruta_manifiesto(archivo_datos: str) -> str:
+    return os.path.join(directorio_archivo(archivo_datos), MANIFIESTO)
+
+
+def leer_manifiesto(archivo_datos: str) -> Dict:
+    try:
+        with open(ruta_manifiesto(archivo_datos), "r", encoding="utf-8") as f:
+            return json.load(f)
+    except FileNotFoundError:
+        return {"version": VERSION_MANIFIESTO, "segmentos": []}
+
+
+def saldos_arrastrados(datos: Dict) -> Dict:
+    return datos.get("saldos_arrastrados") or {}
+
+
+def corte(datos: Dict) -> Optional[str]:
+    """Fecha desde la que las transacciones siguen en el archivo de datos."""
+    return saldos_arrastrados(datos).get("hasta")
+
+
+def segmentos_vigentes(datos: Dict, manifiesto: Dict) -> List[Dict]:
+    """Segmentos del manifiesto referenciados por ``datos``, en orden de mes."""
+    referenciados = set(saldos_arrastrados(datos).get("segmentos", []))
+    return sorted(
+        (s for s in manifiesto.get("segmentos", []) if s["archivo"] in referenciados),
+        key=lambda s: (s["mes"], s["archivo"]),
+    )
+
+
+def limite_archivo(meses: int, hoy: Optional[date] = None) -> str:
+    """Primer día del mes que está ``meses`` meses antes del actual."""
+    hoy = hoy or date.today()
+    indice = hoy.year * 12 + hoy.month - 1 - max(meses, 0)
+    return date(indice // 12, indice % 12 + 1, 1).isoformat()
+
+
+def _sha256(ruta: str) -> str:
+    digesto = hashlib.sha256()
+    with open(ruta, "rb") as f:
+        for bloque in iter(lambda: f.read(1 << 20), b""):
+            digesto.update(bloque)
+    return digesto.hexdigest()
+
+
+def leer_segmento(archivo_datos: str, segmento: Dict) -> List[Dict]:
+    """Transacciones de ``segmento``; verifica el hash la primera vez que se lee.
+
+    La lista se comparte entre llamadas: no debe modificarse.
+    """
+    ruta = os.path.join(directorio_archivo(archivo_datos), segmento["archivo"])
+    clave = (os.path.abspath(ruta), segmento["sha256"])
+    with _lock_segmentos:
+        if clave in _segmentos:
+            _segmentos.move_to_end(clave)
+            return _segmentos[clave]
+    if _sha256(ruta) != segmento["sha256"]:
+        raise ValueError(f"El segmento {segmento['archivo']} no coincide con el manifiesto")
+    transacciones = almacenamiento.cargar(ruta)["transacciones"]
+    with _lock_segmentos:
+        _segmentos[clave] = transacciones
+        while len(_segmentos) > SEGMENTOS_EN_MEMORIA:
+            _segmentos.popitem(last=False)
+    return transacciones
+
+
+def _resumir(transacciones: Sequence[Dict]) -> Dict:
+    """Flujos del mes y totales por cliente de un segmento."""
+    flujos = {"suscripciones": 0.0, "rescates": 0.0, "comisiones": 0.0}
+    clientes: Dict[str, Dict] = {}
+    for t in transacciones:
+        monto = abs(float(t.get("monto", 0.0) or 0.0))
+        flujos[_FLUJOS.get(t.get("tipo"), "suscripciones")] += monto
+        cliente = clientes.setdefault(
+            str(t.get("cliente", "")),
+            {
+                "cuotapartes": 0.0,
+                "suscripto": 0.0,
+                "rescatado": 0.0,
+                "comisiones": 0.0,
+                "movimientos": 0,
+                "ultimo_movimiento": None,
+            },
+        )
+        cliente["cuotapartes"] += float(t.get("cuotapartes", 0.0) or 0.0)
+        cliente[_TOTALES_CLIENTE.get(t.get("tipo"), "suscripto")] += monto
+        cliente["movimientos"] += 1
+        fecha = t.get("fecha")
+        if fecha and (cliente["ultimo_movimiento"] is None or fecha > cliente["ultimo_movimiento"]):
+            cliente["ultimo_movimiento"] = fecha
+    return {"flujos": flujos, "clientes": clientes}
+
+
+def archivar(datos: Dict, archivo_datos: str, antes_de: str) -> Dict:
+    """Mueve a segmentos mensuales las transacciones anteriores a ``antes_de``.
+
+    Escribe los segmentos y el manifiesto, y deja en ``datos`` solo las
+    transacciones restantes y los saldos arrastrados actualizados: el archivo
+    de datos debe guardarse después para que el archivado tenga efecto.
+    """
+    directorio = directorio_archivo(archivo_datos)
+    os.makedirs(directorio, exist_ok=True)
+    manifiesto = leer_manifiesto(archivo_datos)
+    saldos = saldos_arrastrados(datos)
+    referenciados = set(saldos.get("segmentos", []))
+
+    # Segmentos de un archivado que no llegó a guardarse en el archivo de datos.
+    huerfanos = [s for s in manifiesto["segmentos"] if s["archivo"] not in referenciados]
+    for segmento in huerfanos:
+        try:
+            os.remove(os.path.join(directorio, segmento["archivo"]))
+        except FileNotFoundError:
+            pass
+    manifiesto["segmentos"] = [s for s in manifiesto["segmentos"] if s["archivo"] in referenciados]
+
+    transacciones = datos.get("transacciones", [])
+    viejas = [t for t in transacciones if str(t.get("fecha", ""))[:10] < antes_de]
+    if not viejas:
+        if huerfanos:
+            almacenamiento.guardar(ruta_manifiesto(archivo_datos), manifiesto, "json")
+        return {"segmentos": [], "transacciones": 0, "restantes": len(transacciones)}
+    recientes = [t for t in transacciones if str(t.get("fecha", ""))[:10] >= antes_de]
+
+    por_mes: Dict[str, List[Dict]] = {}
+    for t in viejas:
+        por_mes.setdefault(str(t.get("fecha", ""))[:7], []).append(t)
+
+    existentes = {s["archivo"] for s in manifiesto["segmentos"]}
+    nuevos: List[Dict] = []
+    for mes in sorted(por_mes):
+        movimientos = por_mes[mes]
+        nombre, numero = f"{mes}.json.gz", 1
+        while nombre in existentes or os.path.exists(os.path.join(directorio, nombre)):
+            numero += 1
+            nombre = f"{mes}-{numero}.json.gz"
+        ruta = os.path.join(directorio, nombre)
+        almacenamiento.guardar(ruta, {"mes": mes, "transacciones": movimientos}, "gzip")
+        os.chmod(ruta, 0o444)
+        fechas = [str(t.get("fecha", "")) for t in movimientos]
+        nuevos.append(
+            {
+                "mes": mes,
+                "archivo": nombre,
+                "transacciones": len(movimientos),
+                "desde": min(fechas),
+                "hasta": max(fechas),
+                "sha256": _sha256(ruta),
+                **_resumir(movimientos),
+            }
+        )
+        existentes.add(nombre)
+
+    manifiesto["version"] = VERSION_MANIFIESTO
+    manifiesto["segmentos"] = sorted(
+        manifiesto["segmentos"] + nuevos, key=lambda s: (s["mes"], s["archivo"])
+    )
+    almacenamiento.guardar(ruta_manifiesto(archivo_datos), manifiesto, "json")
+
+    cuotapartes = dict(saldos.get("cuotapartes", {}))
+    for segmento in nuevos:
+        for nombre, totales in segmento["clientes"].items():
+            cuotapartes[nombre] = cuotapartes.get(nombre, 0.0) + totales["cuotapartes"]
+    datos["saldos_arrastrados"] = {
+        "hasta": max(antes_de, saldos.get("hasta") or antes_de),
+        "segmentos": sorted(referenciados | {s["archivo"] for s in nuevos}),
+        "cuotapartes": cuotapartes,
+    }
+    datos["transacciones"] = recientes
+    return {
+        "segmentos": [s["archivo"] for s in nuevos],
+        "transacciones": len(viejas),
+        "restantes": len(recientes),
+    }
+
+
+def libro(
+    datos: Dict,
+    archivo_datos: str,
+    desde: Optional[str] = None,
+    hasta: Optional[str] = None,
+) -> Tuple[Dict[str, float], List[Dict]]:
+    """Cuotapartes iniciales por cliente y transacciones a partir de ``desde``.
+
+    Las cuotapartes de cada cliente en cualquier fecha posterior son las
+    iniciales más sus transacciones hasta esa fecha. Sin ``desde`` (o si es
+    posterior al corte) no se abre ningún segmento. Los segmentos de meses
+    posteriores a ``hasta`` tampoco se abren.
+    """
+    saldos = saldos_arrastrados(datos)
+    recientes = list(datos.get("transacciones", []))
+    limite = saldos.get("hasta")
+    if not limite or desde is None or desde >= limite:
+        return dict(saldos.get("cuotapartes", {})), recientes
+
+    mes_desde = desde[:7]
+    iniciales: Dict[str, float] = {}
+    transacciones: List[Dict] = []
+    for segmento in segmentos_vigentes(datos, leer_manifiesto(archivo_datos)):
+        if segmento["mes"] < mes_desde:
+            for nombre, totales in segmento["clientes"].items():
+                iniciales[nombre] = iniciales.get(nombre, 0.0) + totales["cuotapartes"]
+        elif hasta is None or segmento["mes"] <= hasta[:7]:
+            transacciones.extend(leer_segmento(archivo_datos, segmento))
+    transacciones.sort(key=lambda t: str(t.get("fecha", "")))
+    return iniciales, transacciones + recientes
+
+
+def resumen_archivado(datos: Dict, archivo_datos: str) -> Dict:
+    """Flujos por mes y totales por cliente de los segmentos, sin abrirlos."""
+    meses: Dict[str, Dict] = {}
+    clientes: Dict[str, Dict] = {}
+    for segmento in segmentos_vigentes(datos, leer_manifiesto(archivo_datos)):
+        mes = meses.setdefault(
+            segmento["mes"],
+            {"suscripciones": 0.0, "rescates": 0.0, "comisiones": 0.0, "movimientos": 0},
+        )
+        for clave, valor in segmento["flujos"].items():
+            mes[clave] += valor
+        mes["movimientos"] += segmento["transacciones"]
+        for nombre, totales in segmento["clientes"].items():
+            acumulado = clientes.setdefault(
+                nombre,
+                {"suscripto": 0.0, "rescatado": 0.0, "comisiones": 0.0, "movimientos": 0,
+                 "ultimo_movimiento": None},
+            )
+            for clave in ("suscripto", "rescatado", "comisiones", "movimientos"):
+                acumulado[clave] += totales[clave]
+            ultimo = totales.get("ultimo_movimiento")
+            if ultimo and (acumulado["ultimo_movimiento"] is None or ultimo > acumulado["ultimo_movimiento"]):
+                acumulado["ultimo_movimiento"] = ultimo
+    return {"meses": meses, "clientes": clientes}
+
+
+def verificar_archivo(datos: Dict, archivo_datos: str) -> Dict:
+    """Controla que los segmentos existan, no hayan cambiado y sumen los saldos."""
+    manifiesto = leer_manifiesto(archivo_datos)
+    vigentes = segmentos_vigentes(datos, manifiesto)
+    faltantes = sorted(
+        set(saldos_arrastrados(datos).get("segmentos", [])) - {s["archivo"] for s in vigentes}
+    )
+    alterados = []
+    sumas: Dict[str, float] = {}
+    for segmento in vigentes:
+        ruta = os.path.join(directorio_archivo(archivo_datos), segmento["archivo"])
+        if not os.path.exists(ruta):
+            faltantes.append(segmento["archivo"])
+            continue
+        if _sha256(ruta) != segmento["sha256"]:
+            alterados.append(segmento["archivo"])
+        for nombre, totales in segmento["clientes"].items():
+            sumas[nombre] = sumas.get(nombre, 0.0) + totales["cuotapartes"]
+    arrastradas = saldos_arrastrados(datos).get("cuotapartes", {})
+    diferencias = sorted(
+        nombre
+        for nombre in set(sumas) | set(arrastradas)
+        if abs(sumas.get(nombre, 0.0) - arrastradas.get(nombre, 0.0)) > 1e-6
+    )
+    return {
+        "ok": not faltantes and not alterados and not diferencias,
+        "segmentos": len(vigentes),
+        "faltantes": faltantes,
+        "alterados": alterados,
+        "saldos_distintos": diferencias,
+    }
+
+
+def inicio_balance(datos: Dict) -> Optional[str]:
+    """Primera fecha del balance diario (desde ahí se necesitan tenencias)."""
+    fechas: Iterable[str] = (str(b.get("fecha", ""))[:10] for b in datos.get("balance_diario", []))
+    return min((f for f in fechas if f), default=None)
+
+
+__all__ = [
+    "MESES_POR_DEFECTO",
+    "archivar",
+    "corte",
+    "directorio_archivo",
+    "inicio_balance",
+    "leer_manifiesto",
+    "leer_segmento",
+    "libro",
+    "limite_archivo",
+    "resumen_archivado",
+    "saldos_arrastrados",
+    "verificar_archivo",
+]
@@ -0,0 +1,256 @@
+"""Arranque rápido del panel: importaciones diferidas y precalentamiento.
+
+El panel solo necesita Streamlit para mostrar el formulario de ingreso. Las
+dependencias pesadas (pandas, plotly) se importan a través de :func:`importar`
+una vez que hay un usuario autenticado, y el tiempo de cada importación queda
+registrado para poder detectar regresiones.
+
+Si se define la variable de entorno ``FCI_PRECALENTAR=1`` el primer script que
+arranca en el proceso lanza un hilo que importa esos módulos, carga los datos
+del fondo y precalcula las vistas derivadas mientras se muestra el login.
+
+Ejecutado como script imprime el desglose de tiempos de importación medido en
+procesos limpios::
+
+    python arranque.py            # tabla legible
+    python arranque.py --json     # salida para scripts de monitoreo
+"""
+
+from __future__ import annotations
+
+import argparse
+import importlib
+import json
+import os
+import subprocess
+import sys
+import threading
+import time
+from types import ModuleType
+from typing import Dict, List, Optional, Tuple
+
+from fondo import FondoInversion
+from metricas import REGISTRO, iniciar_servidor
+from pool_fondos import PoolFondos, cargar_catalogo
+from vistas import CACHE_FIGURAS, CACHE_VISTAS
+
+MODULOS_PESADOS: Tuple[str, ...] = ("pandas", "plotly.express", "PIL.Image")
+
+TIEMPOS_IMPORTACION: Dict[str, float] = {}
+TIEMPOS_PRECALENTAMIENTO: Dict[str, float] = {}
+
+POOL = PoolFondos(capacidad=int(os.environ.get("FCI_POOL_FONDOS", "8")))
+
+_lock_importacion = threading.Lock()
+_lock_precalentamiento = threading.Lock()
+_hilo_precalentamiento: Optional[threading.Thread] = None
+
+# Una sesión cuenta como activa si tuvo un rerun en los últimos minutos.
+VENTANA_SESIONES_SEGUNDOS = 300.0
+_ultima_actividad: Dict[str, float] = {}
+_lock_sesiones = threading.Lock()
+_lock_metricas = threading.Lock()
+_servidor_metricas = None
+
+
+def sesiones_activas() -> int:
+    limite = time.monotonic() - VENTANA_SESIONES_SEGUNDOS
+    with _lock_sesiones:
+        for sesion in [s for s, t in _ultima_actividad.items() if t < limite]:
+            del _ultima_actividad[sesion]
+        return len(_ultima_actividad)
+
+
+def registrar_sesion(sesion: str) -> None:
+    """Marca actividad de una sesión autenticada (para ``fci_sesiones_activas``)."""
+    with _lock_sesiones:
+        _ultima_actividad[sesion] = time.monotonic()
+
+
+REGISTRO.indicador(
+    "fci_sesiones_activas",
+    "Sesiones autenticadas con actividad en los últimos 5 minutos",
+    funcion=sesiones_activas,
+)
+REGISTRO.indicador(
+    "fci_fondos_cargados",
+    "Fondos en memoria en el pool del proceso",
+    funcion=lambda: POOL.estadisticas()["cargados"],
+)
+
+
+def importar(nombre: str) -> ModuleType:
+    """Importa ``nombre`` registrando cuánto tardó la primera importación."""
+    if nombre not in TIEMPOS_IMPORTACION:
+        with _lock_importacion:
+            if nombre not in TIEMPOS_IMPORTACION:
+                inicio = time.perf_counter()
+                importlib.import_module(nombre)
+                TIEMPOS_IMPORTACION[nombre] = time.perf_counter() - inicio
+    return importlib.import_module(nombre)
+
+
+def obtener_fondo(archivo_datos: str = "fondo_datos.json") -> FondoInversion:
+    """Devuelve el fondo compartido del pool, recargándolo si cambió en disco.
+
+    El panel es de solo lectura, así que todas las sesiones del proceso pueden
+    compartir el mismo snapshot de cada fondo.
+    """
+    return POOL.obtener(archivo_datos)
+
+
+def _precalentar(archivos: List[str]) -> None:
+    inicio = time.perf_counter()
+    for nombre in MODULOS_PESADOS:
+        importar(nombre)
+    TIEMPOS_PRECALENTAMIENTO["importaciones"] = time.perf_counter() - inicio
+
+    inicio = time.perf_counter()
+    fondos = [obtener_fondo(archivo) for archivo in archivos]
+    TIEMPOS_PRECALENTAMIENTO["carga_datos"] = time.perf_counter() - inicio
+
+    inicio = time.perf_counter()
+    for fondo in fondos:
+        fondo.precalcular()
+    TIEMPOS_PRECALENTAMIENTO["vistas_derivadas"] = time.perf_counter() - inicio
+
+
+def iniciar_precalentamiento(archivos: Optional[List[str]] = None) -> bool:
+    """Lanza el precalentamiento en segundo plano si está habilitado.
+
+    Solo se ejecuta una vez por proceso. Sin ``archivos`` se precargan los
+    fondos del catálogo, hasta la capacidad del pool. Devuelve ``True`` si el
+    hilo fue lanzado en esta llamada.
+    """
+    global _hilo_precalentamiento
+    if os.environ.get("FCI_PRECALENTAR", "").lower() not in {"1", "true", "si", "sí"}:
+        return False
+    if archivos is None:
+        fondos = cargar_catalogo()["fondos"].values()
+        archivos = [info["archivo"] for info in fondos][: POOL.capacidad]
+    with _lock_precalentamiento:
+        if _hilo_precalentamiento is not None:
+            return False
+        _hilo_precalentamiento = threading.Thread(
+            target=_precalentar,
+            args=(archivos,),
+            name="fci-precalentamiento",
+            daemon=True,
+        )
+    _hilo_precalentamiento.start()
+    return True
+
+
+def iniciar_metricas() -> bool:
+    """Publica ``/metrics`` si se definió ``FCI_METRICAS_PUERTO``.
+
+    Solo se inicia una vez por proceso (todas las sesiones comparten el
+    registro). Devuelve ``True`` si el servidor fue lanzado en esta llamada.
+    """
+    global _servidor_metricas
+    puerto = os.environ.get("FCI_METRICAS_PUERTO", "")
+    if not puerto:
+        return False
+    with _lock_metricas:
+        if _servidor_metricas is not None:
+            return False
+        _servidor_metricas = iniciar_servidor(
+            int(puerto), os.environ.get("FCI_METRICAS_DIRECCION", "127.0.0.1")
+        )
+    return True
+
+
+def reporte_proceso() -> Dict[str, Dict]:
+    """Tiempos registrados en el proceso actual (para la vista de perfilado)."""
+    return {
+        "importaciones": dict(TIEMPOS_IMPORTACION),
+        "precalentamiento": dict(TIEMPOS_PRECALENTAMIENTO),
+        "pool_fondos": POOL.estadisticas(),
+        "cache_vistas": CACHE_VISTAS.estadisticas(),
+        "cache_figuras": CACHE_FIGURAS.estadisticas(),
+    }
+
+
+def medir_importaciones(
+    modulos: Tuple[str, ...] = ("streamlit",) + MODULOS_PESADOS,
+) -> List[Dict[str, float]]:
+    """Mide el costo de importar cada módulo en un intérprete limpio.
+
+    Usa ``python -X importtime`` y toma el tiempo acumulado del módulo pedido,
+    de modo que los valores son comparables entre versiones y no dependen de
+    lo que ya esté cargado en el proceso actual.
+    """
+    resultados: List[Dict[str, float]] = []
+    for nombre in modulos:
+        proceso = subprocess.run(
+            [sys.executable, "-X", "importtime", "-c", f"import {nombre}"],
+            capture_output=True,
+            text=True,
+        )
+        acumulado = None
+        propio = None
+        for linea in proceso.stderr.splitlines():
+            if not linea.startswith("import time:"):
+                continue
+            partes = [p.strip() for p in linea[len("import time:"):].split("|")]
+            if len(partes) == 3 and partes[2].strip() == nombre:
+                propio, acumulado = int(partes[0]), int(partes[1])
+        resultados.append(
+            {
+                "modulo": nombre,
+                "ok": proceso.returncode == 0,
+                "acumulado_ms": (acumulado or 0) / 1000,
+                "propio_ms": (propio or 0) / 1000,
+            }
+        )
+    return resultados
+
+
+__all__ = [
+    "MODULOS_PESADOS",
+    "POOL",
+    "importar",
+    "iniciar_metricas",
+    "iniciar_precalentamiento",
+    "medir_importaciones",
+    "obtener_fondo",
+    "registrar_sesion",
+    "reporte_proceso",
+    "sesiones_activas",
+]
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(
+        description="Reporte de tiempos de arranque del panel"
+    )
+    parser.add_argument("--json", action="store_true", help="Salida en formato JSON")
+    parser.add_argument(
+        "--modulo",
+        action="append",
+        help="Módulo adicional a medir (se puede repetir)",
+    )
+    args = parser.parse_args()
+
+    modulos = ("streamlit",) + MODULOS_PESADOS + tuple(args.modulo or ())
+    resultados = medir_importaciones(modulos)
+
+    for nombre in MODULOS_PESADOS:
+        importar(nombre)
+    inicio = time.perf_counter()
+    FondoInversion().precalcular()
+    carga_ms = (time.perf_counter() - inicio) * 1000
+
+    if args.json:
+        print(json.dumps({"importaciones": resultados, "carga_datos_ms": carga_ms}, indent=2))
+        return
+
+    print("⏱️  TIEMPOS DE ARRANQUE")
+    for item in resultados:
+        estado = "" if item["ok"] else "  (no instalado)"
+        print(f"  • {item['modulo']:<16} {item['acumulado_ms']:>9.1f} ms{estado}")
+    print(f"  • {'datos + vistas':<16} {carga_ms:>9.1f} ms")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,469 @@
+"""Cierre diario del fondo: tareas programadas y resultados precalculados.
+
+El cierre ejecuta, en orden, las tareas de fin de día:
+
+* ``comisiones``: devenga las comisiones configuradas (ver ``comisiones``);
+  sin tasas configuradas no hace nada.
+* ``balance``: registra el balance del día si nadie lo cargó con
+  ``--balance`` (se arrastra el valor actual de las cuotapartes) y liquida
+  las órdenes que quedaron en cola.
+* ``valor_cuotaparte``: anota el valor de cuotaparte y las cuotapartes en
+  circulación en el balance del día.
+* ``rollups``: resumen mensual del balance y de los movimientos.
+* ``agregados``: totales por cliente, rendimiento del fondo y serie histórica
+  de los clientes principales, calculados con el mismo código que el panel.
+* ``verificar``: conciliación de invariantes (ver ``conciliacion``).
+
+Los resultados se guardan en ``<archivo>.cierre.json`` junto con la versión
+del archivo de datos que los originó. El panel los usa mientras esa versión
+siga vigente, de modo que la primera consulta después del cierre no recalcula
+el rendimiento ni recorre el libro de transacciones para la serie de clientes.
+Cualquier cambio posterior en los datos invalida el archivo naturalmente.
+"""
+
+from __future__ import annotations
+
+import json
+import math
+import os
+import time as reloj
+from collections import OrderedDict
+from datetime import date, datetime, time, timedelta
+from typing import Callable, Dict, Iterable, List, Optional, Sequence
+
+import almacenamiento
+from archivo_historico import resumen_archivado
+from fondo import FondoInversion
+from metricas import REGISTRO
+
+TAREAS = ("comisiones", "balance", "valor_cuotaparte", "rollups", "agregados", "verificar")
+
+CLIENTES_SERIE = 20
+DIAS_HABILES = frozenset(range(5))  # lunes a viernes
+MAX_ESPERA_SEGUNDOS = 60.0
+MAX_DIAS_BALANCE = 365
+
+# Campo de los rollups y de los agregados por cliente según el tipo de movimiento.
+_FLUJOS = {"suscripcion": "suscripciones", "rescate": "rescates", "comision": "comisiones"}
+_TOTALES_CLIENTE = {"suscripcion": "suscripto", "rescate": "rescatado", "comision": "comisiones"}
+
+_DURACION_TAREA = REGISTRO.histograma(
+    "fci_cierre_tarea_segundos",
+    "Duración de cada tarea del cierre diario",
+    ("tarea",),
+    limites=(0.1, 0.5, 1.0, 5.0, 15.0, 60.0, 300.0, 900.0),
+)
+_ERRORES_TAREA = REGISTRO.contador(
+    "fci_cierre_errores_total", "Tareas del cierre diario que fallaron", ("tarea",)
+)
+_ULTIMO_CIERRE = REGISTRO.indicador(
+    "fci_cierre_ultimo_timestamp_segundos", "Momento (epoch) del último cierre ejecutado"
+)
+_ULTIMO_CIERRE_OK = REGISTRO.indicador(
+    "fci_cierre_ultimo_ok", "1 si el último cierre terminó sin errores ni diferencias"
+)
+
+
+def ruta_cierre(archivo_datos: str) -> str:
+    base, _ = os.path.splitext(archivo_datos)
+    return f"{base}.cierre.json"
+
+
+def leer_cierre(archivo_datos: str) -> Optional[Dict]:
+    """Resultados del último cierre de ``archivo_datos`` (sin validar versión)."""
+    try:
+        with open(ruta_cierre(archivo_datos), "r", encoding="utf-8") as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return None
+
+
+def parsear_hora(texto: str) -> time:
+    """Convierte ``HH:MM`` en una hora del día."""
+    try:
+        return datetime.strptime(texto.strip(), "%H:%M").time()
+    except ValueError:
+        raise ValueError(f"Hora de cierre inválida: {texto!r} (se espera HH:MM)") from None
+
+
+def validar_tareas(tareas: Iterable[str]) -> List[str]:
+    """Tareas pedidas, en el orden de ejecución de ``TAREAS``."""
+    pedidas = {t.strip().lower() for t in tareas if t.strip()}
+    desconocidas = sorted(pedidas - set(TAREAS))
+    if desconocidas:
+        raise ValueError(
+            f"Tareas desconocidas: {', '.join(desconocidas)} (disponibles: {', '.join(TAREAS)})"
+        )
+    return [t for t in TAREAS if t in pedidas]
+
+
+# ----------------------------------------------------------------------
+# Tareas sobre los datos
+# ----------------------------------------------------------------------
+
+def devengar_comisiones(datos: Dict, fecha: str) -> bool:
+    """Devenga las comisiones configuradas hasta ``fecha`` (si hay tasas)."""
+    from comisiones import aplicar_devengamiento, calcular_devengamiento, configuracion
+
+    config = configuracion(datos)
+    if not (config.get("administracion_anual") or config.get("exito")):
+        return False
+    calculo = calcular_devengamiento(datos, date.fromisoformat(fecha))
+    if calculo is None:
+        return False
+    aplicar_devengamiento(datos, calculo)
+    return True
+
+
+def capturar_balance(datos: Dict, fecha: str) -> Optional[Dict]:
+    """Registra el balance de ``fecha`` y liquida las órdenes pendientes.
+
+    Sin un balance cargado ese día se arrastra el valor actual del fondo
+    (cuotapartes en circulación por valor de cuotaparte, que ya descuenta las
+    comisiones pendientes de pago). Las órdenes en cola
+    se liquidan a ese valor, como en ``--balance``, y su neto se suma al
+    balance del día. Devuelve ``{"liquidadas", "rechazadas"}`` (ver
+    ``ordenes.aplicar_liquidacion``) o ``None`` si no hubo nada que hacer.
+    """
+    from comisiones import pendiente
+    from ordenes import aplicar_liquidacion, calcular_liquidacion, ordenes_pendientes
+
+    balances = datos.setdefault("balance_diario", [])
+    entrada = next((b for b in balances if b.get("fecha") == fecha), None)
+    pendientes = bool(ordenes_pendientes(datos))
+    if entrada is not None and not pendientes:
+        return None
+
+    valor_cuotaparte = datos.get("valor_cuotaparte", 0.0)
+    balance = datos.get("total_cuotapartes", 0.0) * valor_cuotaparte
+    resultado: Dict = {"liquidadas": [], "rechazadas": []}
+    neto = 0.0
+    if pendientes:
+        liquidacion = calcular_liquidacion(datos, valor_cuotaparte)
+        resultado = aplicar_liquidacion(datos, liquidacion)
+        neto = liquidacion["suscripciones"] - liquidacion["rescates"]
+
+    if entrada is None:
+        entrada = {"fecha": fecha, "balance": balance + neto}
+        if pendiente(datos):
+            entrada["comisiones_pendientes"] = pendiente(datos)
+        balances.append(entrada)
+        datos["balance_diario"] = balances[-MAX_DIAS_BALANCE:]
+    else:
+        entrada["balance"] = float(entrada.get("balance", 0.0) or 0.0) + neto
+    return resultado
+
+
+def registrar_valor_cuotaparte(datos: Dict, fecha: str) -> bool:
+    """Anota valor de cuotaparte y cuotapartes en el balance de ``fecha``."""
+    for entrada in reversed(datos.get("balance_diario", [])):
+        if entrada.get("fecha") != fecha:
+            continue
+        valores = {
+            "valor_cuotaparte": datos.get("valor_cuotaparte", 0.0),
+            "total_cuotapartes": datos.get("total_cuotapartes", 0.0),
+        }
+        if all(entrada.get(k) == v for k, v in valores.items()):
+            return False
+        entrada.update(valores)
+        return True
+    return False
+
+
+# ----------------------------------------------------------------------
+# Resultados derivados
+# ----------------------------------------------------------------------
+
+def rollups_mensuales(
+    balance_diario: Sequence[Dict],
+    transacciones: Sequence[Dict],
+    archivados: Optional[Dict[str, Dict]] = None,
+) -> List[Dict]:
+    """Balance de apertura, cierre, mínimo y máximo y flujos de cada mes.
+
+    ``archivados`` son los flujos por mes de las transacciones archivadas
+    (ver ``archivo_historico.resumen_archivado``).
+    """
+    meses: "OrderedDict[str, Dict]" = OrderedDict()
+
+    def mes(clave: str) -> Dict:
+        if clave not in meses:
+            meses[clave] = {
+                "mes": clave,
+                "apertura": None,
+                "cierre": None,
+                "minimo": None,
+                "maximo": None,
+                "suscripciones": 0.0,
+                "rescates": 0.0,
+                "comisiones": 0.0,
+                "movimientos": 0,
+            }
+        return meses[clave]
+
+    for entrada in sorted(balance_diario, key=lambda b: str(b.get("fecha", ""))):
+        balance = float(entrada.get("balance", 0.0) or 0.0)
+        resumen = mes(str(entrada.get("fecha", ""))[:7])
+        if resumen["apertura"] is None:
+            resumen["apertura"] = balance
+            resumen["minimo"] = resumen["maximo"] = balance
+        resumen["cierre"] = balance
+        resumen["minimo"] = min(resumen["minimo"], balance)
+        resumen["maximo"] = max(resumen["maximo"], balance)
+
+    for clave, flujos in (archivados or {}).items():
+        resumen = mes(clave)
+        for campo, valor in flujos.items():
+            resumen[campo] += valor
+
+    for t in transacciones:
+        resumen = mes(str(t.get("fecha", ""))[:7])
+        # Rescates y comisiones se registran con monto negativo.
+        resumen[_FLUJOS.get(t.get("tipo"), "suscripciones")] += abs(
+            float(t.get("monto", 0.0) or 0.0)
+        )
+        resumen["movimientos"] += 1
+
+    resultado = []
+    for clave in sorted(meses):
+        resumen = meses[clave]
+        resumen["neto"] = resumen["suscripciones"] - resumen["rescates"]
+        apertura, cierre = resumen["apertura"], resumen["cierre"]
+        resumen["variacion"] = (
+            (cierre - apertura) / apertura * 100 if apertura else None
+        )
+        resultado.append(resumen)
+    return resultado
+
+
+def agregados_clientes(datos: Dict, archivados: Optional[Dict[str, Dict]] = None) -> Dict[str, Dict]:
+    """Tenencia, valor y totales suscriptos/rescatados de cada cliente.
+
+    ``archivados`` son los totales por cliente de las transacciones
+    archivadas, que se suman sin abrir los segmentos.
+    """
+    valor_cuotaparte = datos.get("valor_cuotaparte", 0.0)
+    agregados = {
+        nombre: {
+            "cuotapartes": info.get("cuotapartes", 0.0),
+            "valor_actual": info.get("cuotapartes", 0.0) * valor_cuotaparte,
+            "suscripto": 0.0,
+            "rescatado": 0.0,
+            "comisiones": 0.0,
+            "movimientos": 0,
+            "ultimo_movimiento": None,
+        }
+        for nombre, info in datos.get("clientes", {}).items()
+    }
+    for nombre, totales in (archivados or {}).items():
+        cliente = agregados.get(nombre)
+        if cliente is None:
+            continue
+        for campo in ("suscripto", "rescatado", "comisiones", "movimientos"):
+            cliente[campo] += totales[campo]
+        cliente["ultimo_movimiento"] = totales["ultimo_movimiento"]
+    for t in datos.get("transacciones", []):
+        cliente = agregados.get(t.get("cliente"))
+        if cliente is None:
+            continue
+        monto = abs(float(t.get("monto", 0.0) or 0.0))
+        cliente[_TOTALES_CLIENTE.get(t.get("tipo"), "suscripto")] += monto
+        cliente["movimientos"] += 1
+        fecha = t.get("fecha")
+        if fecha and (cliente["ultimo_movimiento"] is None or fecha > cliente["ultimo_movimiento"]):
+            cliente["ultimo_movimiento"] = fecha
+    return agregados
+
+
+def _sin_nan(valor: float) -> Optional[float]:
+    return None if math.isnan(valor) else valor
+
+
+def serie_clientes_principales(fondo: FondoInversion, cantidad: int = CLIENTES_SERIE) -> Dict:
+    """Serie en pesos de los ``cantidad`` clientes de mayor patrimonio."""
+    from tipos_cambio import MONEDA_BASE, serie_clientes
+
+    clientes = fondo.get_vista(None).principales(cantidad)
+    iniciales, transacciones = fondo.get_libro_balance()
+    serie = serie_clientes(
+        fondo.datos.get("balance_diario", []),
+        transacciones,
+        clientes,
+        fondo.get_tabla_tipos_cambio(),
+        MONEDA_BASE,
+        iniciales,
+    )
+    return {
+        "moneda": MONEDA_BASE,
+        "fechas": [str(f) for f in serie["fechas"]],
+        "clientes": clientes,
+        "valores": [[_sin_nan(float(v)) for v in fila] for fila in serie["valores"]],
+    }
+
+
+# ----------------------------------------------------------------------
+# Ejecución
+# ----------------------------------------------------------------------
+
+def ejecutar_cierre(
+    datos: Dict,
+    archivo_datos: str,
+    guardar: Callable[[], object],
+    tareas: Iterable[str] = TAREAS,
+    fecha: Optional[date] = None,
+) -> Dict:
+    """Ejecuta el cierre de ``fecha`` (hoy por defecto) y guarda sus resultados.
+
+    ``guardar`` persiste ``datos`` en ``archivo_datos``; se llama solo si las
+    tareas de datos cambiaron algo. Un error en una tarea queda registrado en
+    el resultado y no impide ejecutar las siguientes.
+    """
+    tareas = validar_tareas(tareas)
+    dia = (fecha or date.today()).isoformat()
+    resultado: Dict = {
+        "fecha": dia,
+        "generado": datetime.now().isoformat(timespec="seconds"),
+        "tareas": {},
+    }
+
+    def correr(nombre: str, funcion: Callable[[], object]) -> object:
+        inicio = reloj.perf_counter()
+        try:
+            valor = funcion()
+        except Exception as e:  # noqa: BLE001 - se informa en el resultado
+            resultado["tareas"][nombre] = {"ok": False, "error": str(e)}
+            _ERRORES_TAREA.incrementar(tarea=nombre)
+            valor = None
+        else:
+            resultado["tareas"][nombre] = {"ok": True}
+        segundos = reloj.perf_counter() - inicio
+        resultado["tareas"][nombre]["segundos"] = segundos
+        _DURACION_TAREA.observar(segundos, tarea=nombre)
+        return valor
+
+    cambios = False
+    if "comisiones" in tareas:
+        cambios |= bool(correr("comisiones", lambda: devengar_comisiones(datos, dia)))
+    if "balance" in tareas:
+        liquidacion = correr("balance", lambda: capturar_balance(datos, dia))
+        if liquidacion is not None:
+            cambios = True
+            resultado["ordenes"] = {
+                "liquidadas": len(liquidacion["liquidadas"]),
+                "rechazadas": liquidacion["rechazadas"],
+            }
+    if "valor_cuotaparte" in tareas:
+        cambios |= bool(correr("valor_cuotaparte", lambda: registrar_valor_cuotaparte(datos, dia)))
+    if cambios:
+        guardar()
+
+    # Los derivados se calculan sobre el archivo guardado, con el mismo código
+    # que usa el panel, y quedan asociados a su versión.
+    fondo = FondoInversion(archivo_datos)
+    resultado["version_datos"] = fondo.version
+    archivado = resumen_archivado(fondo.datos, archivo_datos)
+
+    if "rollups" in tareas:
+        resultado["rollups_mensuales"] = correr(
+            "rollups",
+            lambda: rollups_mensuales(
+                fondo.datos.get("balance_diario", []),
+                fondo.datos.get("transacciones", []),
+                archivado["meses"],
+            ),
+        )
+    if "agregados" in tareas:
+        def agregados() -> Dict:
+            total, mensual = fondo.calcular_rendimiento_mensualizado()
+            return {
+                "rendimiento": {"total": total, "mensual": mensual},
+                "clientes": agregados_clientes(fondo.datos, archivado["clientes"]),
+                "serie_clientes": serie_clientes_principales(fondo),
+            }
+
+        valores = correr("agregados", agregados)
+        if valores:
+            resultado["rendimiento"] = valores["rendimiento"]
+            resultado["agregados_clientes"] = valores["clientes"]
+            resultado["serie_clientes"] = valores["serie_clientes"]
+    if "verificar" in tareas:
+        from conciliacion import conciliar
+
+        resultado["verificacion"] = correr(
+            "verificar", lambda: conciliar(fondo.datos, archivo_datos)
+        )
+
+    verificacion = resultado.get("verificacion")
+    resultado["ok"] = all(t["ok"] for t in resultado["tareas"].values()) and (
+        verificacion is None or bool(verificacion.get("ok"))
+    )
+    almacenamiento.guardar(ruta_cierre(archivo_datos), resultado, "json")
+    _ULTIMO_CIERRE.fijar(reloj.time())
+    _ULTIMO_CIERRE_OK.fijar(1 if resultado["ok"] else 0)
+    return resultado
+
+
+def proximo_cierre(ahora: datetime, hora: time, dias: Iterable[int] = DIAS_HABILES) -> datetime:
+    """Primer horario de cierre posterior a ``ahora`` en un día de ``dias``."""
+    dias = frozenset(dias)
+    candidato = datetime.combine(ahora.date(), hora)
+    if candidato <= ahora:
+        candidato += timedelta(days=1)
+    for _ in range(7):
+        if candidato.weekday() in dias:
+            return candidato
+        candidato += timedelta(days=1)
+    raise ValueError("No hay días habilitados para el cierre")
+
+
+def esperar_hasta(objetivo: datetime) -> None:
+    """Duerme hasta ``objetivo`` en tramos cortos (tolera cambios de hora)."""
+    while True:
+        restante = (objetivo - datetime.now()).total_seconds()
+        if restante <= 0:
+            return
+        reloj.sleep(min(restante, MAX_ESPERA_SEGUNDOS))
+
+
+def ejecutar_daemon(
+    cerrar: Callable[[date], object],
+    hora: time,
+    ultimo: Optional[date] = None,
+    dias: Iterable[int] = DIAS_HABILES,
+) -> None:
+    """Llama a ``cerrar(fecha)`` todos los días hábiles a la ``hora`` indicada.
+
+    Si al arrancar ya pasó la hora de cierre de hoy y ``ultimo`` no es hoy, el
+    cierre pendiente se ejecuta enseguida. Corre hasta que se interrumpe.
+    """
+    dias = frozenset(dias)
+    while True:
+        ahora = datetime.now()
+        hoy = ahora.date()
+        if (
+            hoy.weekday() in dias
+            and ahora >= datetime.combine(hoy, hora)
+            and ultimo != hoy
+        ):
+            cerrar(hoy)
+            ultimo = hoy
+            continue
+        esperar_hasta(proximo_cierre(ahora, hora, dias))
+
+
+__all__ = [
+    "CLIENTES_SERIE",
+    "TAREAS",
+    "agregados_clientes",
+    "capturar_balance",
+    "devengar_comisiones",
+    "ejecutar_cierre",
+    "ejecutar_daemon",
+    "leer_cierre",
+    "parsear_hora",
+    "proximo_cierre",
+    "registrar_valor_cuotaparte",
+    "rollups_mensuales",
+    "ruta_cierre",
+    "validar_tareas",
+]
@@ -0,0 +1,178 @@
+"""Devengamiento diario de comisiones de administración y de éxito.
+
+Las comisiones son un gasto del fondo: bajan el valor de cuotaparte y no
+cambian las cuotapartes de nadie. El cálculo se hace para todos los clientes
+a la vez, como operaciones vectorizadas sobre el arreglo de tenencias:
+
+* administración: ``tasa_anual / 365`` del valor de cuotaparte por cada día
+  transcurrido desde el último devengamiento;
+* éxito: ``tasa_exito`` sobre la suba del valor de cuotaparte (ya neto de
+  administración) por encima del máximo histórico sobre el que se cobró
+  (*high-water mark*).
+
+Cada devengamiento deja un lote de movimientos de tipo ``comision`` (uno por
+cliente con tenencia, con ``cuotapartes`` en 0 y el importe en negativo, como
+los rescates), de modo que las conciliaciones de cuotapartes no cambian.
+
+Lo devengado es una deuda del fondo hasta que se paga: la cartera que informa
+el custodio todavía incluye ese dinero. ``devengado_pendiente`` acumula esa
+deuda; el balance del día de devengamiento baja en el mismo importe y los
+balances que se carguen después (``--balance``, corrección de balances) la
+descuentan de la valuación, así el valor de cuotaparte no vuelve a subir.
+``registrar_pago`` la cancela cuando la comisión sale de la cartera. Cada
+entrada de ``balance_diario`` anota en ``comisiones_pendientes`` la deuda que
+se descontó. La configuración y el estado viven en ``datos["comisiones"]``::
+
+    "comisiones": {
+        "administracion_anual": 0.02,
+        "exito": 0.2,
+        "ultimo_devengamiento": "2025-09-15",
+        "maximo_valor_cuotaparte": 1022.44,
+        "devengado_pendiente": 18250.0
+    }
+"""
+
+from __future__ import annotations
+
+from datetime import date, datetime
+from typing import Dict, List, Optional
+
+import numpy as np
+
+DIAS_POR_ANIO = 365
+# Diferencia de redondeo aceptada al pagar todo lo pendiente (medio centavo).
+TOLERANCIA_PAGO = 0.005
+
+
+def configuracion(datos: Dict) -> Dict:
+    return datos.get("comisiones", {})
+
+
+def pendiente(datos: Dict) -> float:
+    """Comisiones devengadas que todavía no se pagaron."""
+    return float(configuracion(datos).get("devengado_pendiente", 0.0) or 0.0)
+
+
+def calcular_devengamiento(
+    datos: Dict,
+    fecha: Optional[date] = None,
+    tasa_administracion: Optional[float] = None,
+    tasa_exito: Optional[float] = None,
+) -> Optional[Dict]:
+    """Calcula (sin modificar ``datos``) las comisiones devengadas hasta ``fecha``.
+
+    Las tasas se expresan como fracción (0.02 = 2 %); si no se indican se usan
+    las configuradas. Devuelve ``None`` si no hay días por devengar o no hay
+    cuotapartes en circulación.
+    """
+    fecha = fecha or date.today()
+    config = configuracion(datos)
+    if tasa_administracion is None:
+        tasa_administracion = float(config.get("administracion_anual", 0.0) or 0.0)
+    if tasa_exito is None:
+        tasa_exito = float(config.get("exito", 0.0) or 0.0)
+    if tasa_administracion < 0 or tasa_exito < 0:
+        raise ValueError("Las tasas de comisión no pueden ser negativas")
+
+    ultimo = config.get("ultimo_devengamiento")
+    dias = (fecha - date.fromisoformat(ultimo)).days if ultimo else 1
+    if dias <= 0:
+        return None
+
+    nombres = list(datos.get("clientes", {}))
+    tenencias = np.fromiter(
+        (float(datos["clientes"][n].get("cuotapartes", 0.0) or 0.0) for n in nombres),
+        dtype=float,
+        count=len(nombres),
+    )
+    total_cuotapartes = float(tenencias.sum())
+    valor_anterior = float(datos.get("valor_cuotaparte", 0.0) or 0.0)
+    if total_cuotapartes <= 0 or valor_anterior <= 0:
+        return None
+
+    administracion = valor_anterior * tasa_administracion * dias / DIAS_POR_ANIO
+    valor_neto = valor_anterior - administracion
+    maximo = float(config.get("maximo_valor_cuotaparte", 0.0) or valor_anterior)
+    exito = tasa_exito * max(0.0, valor_neto - maximo)
+    por_cuotaparte = administracion + exito
+
+    importes = tenencias * por_cuotaparte
+    con_tenencia = tenencias > 0
+    return {
+        "fecha": fecha.isoformat(),
+        "dias": dias,
+        "tasa_administracion": tasa_administracion,
+        "tasa_exito": tasa_exito,
+        "valor_cuotaparte_anterior": valor_anterior,
+        "valor_cuotaparte_nuevo": valor_anterior - por_cuotaparte,
+        "administracion_por_cuotaparte": administracion,
+        "exito_por_cuotaparte": exito,
+        "maximo_valor_cuotaparte": max(maximo, valor_anterior - por_cuotaparte),
+        "total_administracion": administracion * total_cuotapartes,
+        "total_exito": exito * total_cuotapartes,
+        "total": float(importes.sum()),
+        "clientes": [n for n, tiene in zip(nombres, con_tenencia) if tiene],
+        "importes": importes[con_tenencia],
+    }
+
+
+def aplicar_devengamiento(datos: Dict, calculo: Dict) -> List[Dict]:
+    """Registra el lote de ``calculo`` en ``datos`` y devuelve sus movimientos."""
+    momento = datetime.now().isoformat()
+    valor_nuevo = calculo["valor_cuotaparte_nuevo"]
+    lote = [
+        {
+            "fecha": momento,
+            "cliente": nombre,
+            "tipo": "comision",
+            "monto": -float(importe),
+            "cuotapartes": 0.0,
+            "valor_cuotaparte": valor_nuevo,
+        }
+        for nombre, importe in zip(calculo["clientes"], calculo["importes"])
+    ]
+    datos.setdefault("transacciones", []).extend(lote)
+    datos["valor_cuotaparte"] = valor_nuevo
+
+    config = datos.setdefault("comisiones", {})
+    config["administracion_anual"] = calculo["tasa_administracion"]
+    config["exito"] = calculo["tasa_exito"]
+    config["ultimo_devengamiento"] = calculo["fecha"]
+    config["maximo_valor_cuotaparte"] = calculo["maximo_valor_cuotaparte"]
+    config["devengado_pendiente"] = pendiente(datos) + calculo["total"]
+
+    # Si el balance del día ya está cargado, la deuda nueva lo baja.
+    for entrada in reversed(datos.get("balance_diario", [])):
+        if str(entrada.get("fecha", ""))[:10] == calculo["fecha"]:
+            entrada["balance"] = float(entrada.get("balance", 0.0) or 0.0) - calculo["total"]
+            entrada["comisiones_pendientes"] = config["devengado_pendiente"]
+            if "valor_cuotaparte" in entrada:
+                entrada["valor_cuotaparte"] = valor_nuevo
+            break
+    return lote
+
+
+def registrar_pago(datos: Dict, monto: float) -> float:
+    """Cancela ``monto`` de la deuda por comisiones y devuelve lo que queda.
+
+    Se llama cuando la comisión se cobra de la cartera: desde ese momento el
+    custodio informa la valuación sin ese dinero. Lanza ``ValueError`` si el
+    monto no es positivo o supera lo pendiente.
+    """
+    deuda = pendiente(datos)
+    if not monto > 0:
+        raise ValueError("El monto pagado debe ser mayor a 0")
+    if monto > deuda + TOLERANCIA_PAGO:
+        raise ValueError(f"El pago supera las comisiones pendientes (${deuda:,.2f})")
+    config = datos.setdefault("comisiones", {})
+    config["devengado_pendiente"] = max(deuda - monto, 0.0)
+    return config["devengado_pendiente"]
+
+
+__all__ = [
+    "aplicar_devengamiento",
+    "calcular_devengamiento",
+    "configuracion",
+    "pendiente",
+    "registrar_pago",
+]
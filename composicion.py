@@ -0,0 +1,192 @@
+"""Valuación vectorizada de la composición del fondo y de su historial.
+
+Cada instrumento tiene un monto en pesos y, opcionalmente, un monto en su
+moneda original. Las funciones de este módulo trabajan sobre arreglos de NumPy
+con todos los instrumentos (y todas las fechas del historial) a la vez, en
+lugar de recorrerlos uno por uno.
+"""
+
+from __future__ import annotations
+
+import math
+from typing import Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+from tipos_cambio import MONEDA_BASE, TablaTiposCambio
+
+
+def tasas_por_moneda(monedas: Sequence[str], cotizaciones: Dict[str, float]) -> np.ndarray:
+    """Pesos por unidad de cada moneda; ``nan`` si no hay cotización."""
+    monedas_arr = np.asarray(monedas, dtype=str)
+    tasas = np.full(monedas_arr.shape, np.nan)
+    tasas[monedas_arr == MONEDA_BASE] = 1.0
+    for moneda, valor in cotizaciones.items():
+        if valor and valor > 0:
+            tasas[monedas_arr == moneda] = valor
+    return tasas
+
+
+def valuar(
+    montos_pesos: np.ndarray,
+    montos_moneda: np.ndarray,
+    tasas: np.ndarray,
+) -> Tuple[np.ndarray, np.ndarray]:
+    """Completa montos en pesos y en moneda original a partir de las tasas.
+
+    ``montos_moneda`` usa ``nan`` cuando el dato no está cargado. Las posiciones
+    con cotización se revalúan (``moneda * tasa``); las que no tienen monto en
+    moneda lo derivan del monto en pesos. Sin cotización se conserva el monto
+    en pesos registrado.
+    """
+    montos_pesos = np.asarray(montos_pesos, dtype=float)
+    montos_moneda = np.asarray(montos_moneda, dtype=float)
+    tasas = np.asarray(tasas, dtype=float)
+
+    cotiza = np.isfinite(tasas) & (tasas > 0)
+    sin_monto_moneda = np.isnan(montos_moneda)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        derivado = np.where(cotiza, montos_pesos / np.where(cotiza, tasas, 1.0), np.nan)
+    montos_moneda = np.where(sin_monto_moneda, derivado, montos_moneda)
+    pesos = np.where(cotiza & ~np.isnan(montos_moneda), montos_moneda * tasas, montos_pesos)
+    return pesos, montos_moneda
+
+
+def porcentajes(montos_pesos: np.ndarray) -> np.ndarray:
+    """Participación de cada instrumento sobre el total de su fila (en %)."""
+    montos = np.asarray(montos_pesos, dtype=float)
+    totales = montos.sum(axis=-1, keepdims=True)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        resultado = np.where(totales != 0, montos / totales * 100, 0.0)
+    return resultado
+
+
+def _monto_moneda(registro: Dict) -> float:
+    valor = registro.get("monto_moneda")
+    if valor is None:
+        valor = registro.get("monto_original")
+    return math.nan if valor is None else float(valor)
+
+
+def detallar(composicion: Dict[str, Dict], cotizaciones: Dict[str, float]) -> List[Dict]:
+    """Detalle de la composición actual revaluada con ``cotizaciones``."""
+    if not composicion:
+        return []
+    instrumentos = list(composicion)
+    registros = list(composicion.values())
+    monedas = [str(r.get("moneda", MONEDA_BASE)).upper() for r in registros]
+    montos_pesos = np.array([float(r.get("monto", 0.0) or 0.0) for r in registros])
+    montos_moneda = np.array([_monto_moneda(r) for r in registros])
+
+    tasas = tasas_por_moneda(monedas, cotizaciones)
+    pesos, en_moneda = valuar(montos_pesos, montos_moneda, tasas)
+    participacion = porcentajes(pesos)
+    return [
+        {
+            "Instrumento": instrumento,
+            "Moneda": moneda,
+            "Monto_moneda": None if np.isnan(en_moneda[i]) else float(en_moneda[i]),
+            "Monto_ARS": float(pesos[i]),
+            "Porcentaje": float(participacion[i]),
+        }
+        for i, (instrumento, moneda) in enumerate(zip(instrumentos, monedas))
+    ]
+
+
+def matriz_historial(
+    historial: Sequence[Dict],
+) -> Tuple[List[str], List[str], np.ndarray, np.ndarray, np.ndarray]:
+    """Arma las matrices fechas × instrumentos de todo el historial.
+
+    Devuelve ``(fechas, instrumentos, montos_pesos, montos_moneda, monedas)``.
+    Los instrumentos ausentes en una fecha tienen monto 0.
+    """
+    fechas = [str(s.get("fecha", "")) for s in historial]
+    instrumentos = sorted({i for s in historial for i in s.get("instrumentos", {})})
+    columna = {nombre: j for j, nombre in enumerate(instrumentos)}
+
+    forma = (len(historial), len(instrumentos))
+    montos_pesos = np.zeros(forma)
+    montos_moneda = np.full(forma, np.nan)
+    monedas = np.full(forma, MONEDA_BASE, dtype=object)
+    for i, snapshot in enumerate(historial):
+        for nombre, registro in snapshot.get("instrumentos", {}).items():
+            j = columna[nombre]
+            montos_pesos[i, j] = float(registro.get("monto", 0.0) or 0.0)
+            montos_moneda[i, j] = _monto_moneda(registro)
+            monedas[i, j] = str(registro.get("moneda", MONEDA_BASE)).upper()
+    return fechas, instrumentos, montos_pesos, montos_moneda, monedas
+
+
+def revaluar_historial(
+    historial: Sequence[Dict],
+    tabla: TablaTiposCambio,
+    fecha_valuacion: Optional[str] = None,
+) -> Dict:
+    """Revalúa todas las fechas del historial en una sola operación.
+
+    Cada snapshot se valúa con las cotizaciones vigentes en su propia fecha, o
+    todas con las de ``fecha_valuacion`` si se indica.
+    """
+    fechas, instrumentos, pesos, en_moneda, monedas = matriz_historial(historial)
+    if not fechas:
+        return {"fechas": [], "instrumentos": [], "montos": np.zeros((0, 0)), "porcentajes": np.zeros((0, 0))}
+
+    fechas_cotizacion = [fecha_valuacion] * len(fechas) if fecha_valuacion else fechas
+    tasas = np.where(monedas == MONEDA_BASE, 1.0, np.nan)
+    for moneda in tabla.monedas():
+        por_fecha = tabla.cotizaciones(moneda, fechas_cotizacion)
+        tasas = np.where(monedas == moneda, por_fecha[:, None], tasas)
+    tasas = np.where(tasas > 0, tasas, np.nan)
+
+    # Posiciones en pesos: el monto en moneda es el monto en pesos.
+    en_moneda = np.where((monedas == MONEDA_BASE) & np.isnan(en_moneda), pesos, en_moneda)
+    montos, _ = valuar(pesos, en_moneda, tasas)
+    return {
+        "fechas": fechas,
+        "instrumentos": instrumentos,
+        "montos": montos,
+        "porcentajes": porcentajes(montos),
+    }
+
+
+def comparar(
+    historial: Sequence[Dict],
+    fecha_a: str,
+    fecha_b: str,
+    tabla: TablaTiposCambio,
+    fecha_valuacion: Optional[str] = None,
+) -> List[Dict]:
+    """Compara la composición de dos fechas del historial."""
+    revaluado = revaluar_historial(historial, tabla, fecha_valuacion)
+    fechas = revaluado["fechas"]
+    if fecha_a not in fechas or fecha_b not in fechas:
+        return []
+    a = fechas.index(fecha_a)
+    b = fechas.index(fecha_b)
+    montos = revaluado["montos"]
+    pct = revaluado["porcentajes"]
+    presentes = (montos[a] != 0) | (montos[b] != 0)
+    return [
+        {
+            "Instrumento": nombre,
+            "Monto_A": float(montos[a, j]),
+            "Porcentaje_A": float(pct[a, j]),
+            "Monto_B": float(montos[b, j]),
+            "Porcentaje_B": float(pct[b, j]),
+            "Variacion": float(montos[b, j] - montos[a, j]),
+        }
+        for j, nombre in enumerate(revaluado["instrumentos"])
+        if presentes[j]
+    ]
+
+
+__all__ = [
+    "comparar",
+    "detallar",
+    "matriz_historial",
+    "porcentajes",
+    "revaluar_historial",
+    "tasas_por_moneda",
+    "valuar",
+]
@@ -0,0 +1,208 @@
+"""Verificación de invariantes del fondo y reporte de conciliación.
+
+Invariantes controlados:
+
+* ``total_cuotapartes`` coincide con la suma de ``clientes[*].cuotapartes``.
+* Las cuotapartes de cada cliente coinciden con la suma de sus transacciones
+  (más las cuotapartes arrastradas de las transacciones archivadas, ver
+  ``archivo_historico``).
+* Todas las transacciones pertenecen a un cliente existente.
+
+La suma de cuotapartes por cliente se calcula con NumPy sobre todo el libro de
+transacciones. El resultado se guarda como checkpoint en un archivo auxiliar
+(``<archivo>.verificacion.json``); las verificaciones siguientes solo procesan
+las transacciones agregadas desde ese checkpoint.
+"""
+
+from __future__ import annotations
+
+import hashlib
+import json
+import os
+from datetime import datetime
+from typing import Dict, List, Optional, Sequence
+
+import numpy as np
+
+TOLERANCIA_RELATIVA = 1e-9
+TOLERANCIA_ABSOLUTA = 1e-6
+
+
+def ruta_checkpoint(archivo_datos: str) -> str:
+    base, _ = os.path.splitext(archivo_datos)
+    return f"{base}.verificacion.json"
+
+
+def huella_transaccion(transaccion: Dict) -> str:
+    """Hash estable de una transacción, usado para validar el checkpoint."""
+    contenido = json.dumps(transaccion, sort_keys=True, ensure_ascii=False)
+    return hashlib.sha256(contenido.encode("utf-8")).hexdigest()
+
+
+def cargar_checkpoint(archivo_datos: str) -> Optional[Dict]:
+    ruta = ruta_checkpoint(archivo_datos)
+    if not os.path.exists(ruta):
+        return None
+    try:
+        with open(ruta, "r", encoding="utf-8") as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return None
+
+
+def guardar_checkpoint(archivo_datos: str, checkpoint: Dict) -> None:
+    with open(ruta_checkpoint(archivo_datos), "w", encoding="utf-8") as f:
+        json.dump(checkpoint, f, indent=2, ensure_ascii=False)
+
+
+def invalidar_checkpoint(archivo_datos: str) -> None:
+    """Descarta el checkpoint (usar cuando se reescriben transacciones pasadas)."""
+    try:
+        os.remove(ruta_checkpoint(archivo_datos))
+    except FileNotFoundError:
+        pass
+
+
+def checkpoint_vigente(checkpoint: Optional[Dict], transacciones: Sequence[Dict]) -> bool:
+    """Indica si el libro actual extiende al que se verificó en el checkpoint."""
+    if not checkpoint:
+        return False
+    verificadas = checkpoint.get("transacciones_verificadas", 0)
+    if not isinstance(verificadas, int) or verificadas < 0:
+        return False
+    if verificadas > len(transacciones):
+        return False
+    if verificadas == 0:
+        return True
+    return huella_transaccion(transacciones[verificadas - 1]) == checkpoint.get("huella")
+
+
+def sumar_por_cliente(transacciones: Sequence[Dict]) -> Dict[str, float]:
+    """Suma de cuotapartes por cliente en una sola pasada vectorizada."""
+    if not transacciones:
+        return {}
+    clientes = np.array([str(t.get("cliente", "")) for t in transacciones])
+    cuotapartes = np.fromiter(
+        (float(t.get("cuotapartes", 0.0) or 0.0) for t in transacciones),
+        dtype=float,
+        count=len(transacciones),
+    )
+    nombres, indices = np.unique(clientes, return_inverse=True)
+    sumas = np.bincount(indices, weights=cuotapartes, minlength=len(nombres))
+    return {str(nombre): float(suma) for nombre, suma in zip(nombres, sumas)}
+
+
+def verificar(
+    datos: Dict,
+    checkpoint: Optional[Dict] = None,
+    completo: bool = False,
+) -> Dict:
+    """Verifica los invariantes de ``datos``.
+
+    Devuelve un diccionario con el ``reporte`` y el nuevo ``checkpoint``.
+    Si ``checkpoint`` sigue siendo válido para el libro actual y no se pide una
+    verificación ``completa``, solo se suman las transacciones posteriores.
+    """
+    transacciones = datos.get("transacciones", [])
+    clientes = datos.get("clientes", {})
+    arrastrados = datos.get("saldos_arrastrados") or {}
+
+    incremental = (
+        not completo
+        and checkpoint_vigente(checkpoint, transacciones)
+        and checkpoint.get("corte_archivo") == arrastrados.get("hasta")
+    )
+    if incremental:
+        desde = checkpoint["transacciones_verificadas"]
+        sumas = dict(checkpoint.get("sumas", {}))
+    else:
+        desde = 0
+        sumas = dict(arrastrados.get("cuotapartes", {}))
+
+    for nombre, suma in sumar_por_cliente(transacciones[desde:]).items():
+        sumas[nombre] = sumas.get(nombre, 0.0) + suma
+
+    # Tenencias de clientes frente a la suma de sus transacciones.
+    nombres = sorted(set(clientes) | set(sumas))
+    tenencias = np.array(
+        [float(clientes.get(n, {}).get("cuotapartes", 0.0) or 0.0) for n in nombres]
+    )
+    sumas_tx = np.array([sumas.get(n, 0.0) for n in nombres])
+    coincide = np.isclose(
+        tenencias, sumas_tx, rtol=TOLERANCIA_RELATIVA, atol=TOLERANCIA_ABSOLUTA
+    )
+    diferencias: List[Dict] = [
+        {
+            "cliente": nombres[i],
+            "tenencia": float(tenencias[i]),
+            "suma_transacciones": float(sumas_tx[i]),
+            "diferencia": float(tenencias[i] - sumas_tx[i]),
+        }
+        for i in np.flatnonzero(~coincide)
+    ]
+
+    # Total registrado frente a la suma de tenencias.
+    total_registrado = float(datos.get("total_cuotapartes", 0.0) or 0.0)
+    suma_clientes = float(tenencias.sum()) if len(tenencias) else 0.0
+    total_ok = bool(
+        np.isclose(
+            total_registrado,
+            suma_clientes,
+            rtol=TOLERANCIA_RELATIVA,
+            atol=TOLERANCIA_ABSOLUTA,
+        )
+    )
+
+    desconocidos = sorted(n for n in sumas if n not in clientes)
+
+    reporte = {
+        "ok": total_ok and not diferencias and not desconocidos,
+        "fecha": datetime.now().isoformat(),
+        "modo": "incremental" if incremental else "completo",
+        "transacciones_totales": len(transacciones),
+        "transacciones_procesadas": len(transacciones) - desde,
+        "invariantes": {
+            "total_cuotapartes": {
+                "ok": total_ok,
+                "registrado": total_registrado,
+                "suma_clientes": suma_clientes,
+                "diferencia": total_registrado - suma_clientes,
+            },
+            "tenencias_clientes": {
+                "ok": not diferencias,
+                "clientes_verificados": len(nombres),
+                "diferencias": diferencias,
+            },
+            "clientes_desconocidos": {
+                "ok": not desconocidos,
+                "clientes": desconocidos,
+            },
+        },
+    }
+
+    nuevo_checkpoint = {
+        "fecha": reporte["fecha"],
+        "transacciones_verificadas": len(transacciones),
+        "huella": huella_transaccion(transacciones[-1]) if transacciones else None,
+        "corte_archivo": arrastrados.get("hasta"),
+        "sumas": sumas,
+    }
+    return {"reporte": reporte, "checkpoint": nuevo_checkpoint}
+
+
+def conciliar(datos: Dict, archivo_datos: str, completo: bool = False) -> Dict:
+    """Verifica ``datos`` usando y actualizando el checkpoint de ``archivo_datos``."""
+    resultado = verificar(datos, cargar_checkpoint(archivo_datos), completo=completo)
+    guardar_checkpoint(archivo_datos, resultado["checkpoint"])
+    return resultado["reporte"]
+
+
+__all__ = [
+    "cargar_checkpoint",
+    "conciliar",
+    "guardar_checkpoint",
+    "invalidar_checkpoint",
+    "ruta_checkpoint",
+    "sumar_por_cliente",
+    "verificar",
+]
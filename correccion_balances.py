@@ -0,0 +1,252 @@
+"""Corrección retroactiva de balances con recálculo del valor de cuotaparte.
+
+Cuando el informe del custodio llega tarde, el balance de una fecha pasada
+puede estar mal (o faltar). Corregirlo cambia el valor de cuotaparte de ese
+día, con él las cuotapartes de las órdenes que se liquidaron ese día y, por lo
+tanto, las cuotapartes en circulación y el valor de cuotaparte de todos los
+días siguientes. Este módulo recalcula todo el tramo afectado de una vez.
+
+Los balances corregidos se informan como en ``--balance``: la valuación de la
+cartera sin los movimientos del día. Se les restan las comisiones pendientes
+de pago que anotó el balance de esa fecha (o el anterior, si la fecha no tenía
+balance; ver ``comisiones``). Se reprecian las suscripciones y rescates
+que liquidó un balance del tramo (los que tienen ``fecha_orden``, ver
+``ordenes``): conservan su monto y cambian sus cuotapartes y su valor de
+cuotaparte. Las demás transacciones (comisiones, movimientos anteriores a la
+cola de órdenes) no cambian, pero cuentan en las cuotapartes en circulación.
+
+Si ``S_k`` son las cuotapartes en circulación antes del lote del día ``k``,
+``V_k`` la valuación y ``F_k`` el neto liquidado ese día, el valor de
+cuotaparte es ``V_k / S_k`` y después del lote quedan ``S_k * (1 + F_k / V_k)``
+cuotapartes. La recurrencia se resuelve con productos y sumas acumuladas, sin
+recorrer los días en Python. Las transacciones archivadas no se tocan: solo
+se pueden corregir fechas posteriores al corte del archivo histórico.
+"""
+
+from __future__ import annotations
+
+from datetime import date
+from typing import Dict, List, Optional
+
+import numpy as np
+
+from archivo_historico import corte, saldos_arrastrados
+from ordenes import TIPOS, TOLERANCIA_CUOTAPARTES
+
+# Mismo límite que aplican ``--balance`` y el cierre diario.
+MAX_DIAS_BALANCE = 365
+
+
+def calcular_correccion(
+    datos: Dict, balances: Dict[str, float], hoy: Optional[date] = None
+) -> Dict:
+    """Calcula (sin modificar ``datos``) el efecto de corregir ``balances``.
+
+    ``balances`` va de fecha ``AAAA-MM-DD`` a valuación. Devuelve las series
+    de balance y valor de cuotaparte antes y después, las transacciones
+    repreciadas con sus nuevas cuotapartes y la diferencia de cuotapartes de
+    cada cliente. Lanza ``ValueError`` si alguna fecha no se puede corregir.
+    """
+    if not balances:
+        raise ValueError("No hay balances para corregir")
+    hoy_iso = (hoy or date.today()).isoformat()
+    fecha_corte = corte(datos)
+    for fecha, valor in balances.items():
+        date.fromisoformat(fecha)
+        if fecha >= hoy_iso:
+            raise ValueError(f"{fecha}: solo se corrigen fechas pasadas (para hoy usar --balance)")
+        if fecha_corte and fecha < fecha_corte:
+            raise ValueError(f"{fecha}: es anterior al corte del archivo histórico ({fecha_corte})")
+        if not valor > 0:
+            raise ValueError(f"{fecha}: el balance debe ser mayor a 0")
+
+    existentes = {
+        b["fecha"][:10]: float(b.get("balance", 0.0) or 0.0) for b in datos.get("balance_diario", [])
+    }
+    anotadas = {
+        b["fecha"][:10]: float(b.get("comisiones_pendientes", 0.0) or 0.0)
+        for b in datos.get("balance_diario", [])
+    }
+    comisiones = {fecha: _comisiones_pendientes(anotadas, fecha) for fecha in balances}
+    fechas = np.array(sorted(set(existentes) | set(balances)), dtype=str)
+    if len(fechas) > MAX_DIAS_BALANCE:
+        descartadas = sorted(f for f in balances if f < fechas[-MAX_DIAS_BALANCE])
+        if descartadas:
+            raise ValueError(
+                f"{descartadas[0]}: queda fuera de los últimos {MAX_DIAS_BALANCE} balances"
+            )
+    cantidad_fechas = len(fechas)
+    anteriores = np.array([existentes.get(f, np.nan) for f in fechas])
+    desde = int(np.searchsorted(fechas, min(balances)))
+
+    transacciones = datos.get("transacciones", [])
+    cantidad = len(transacciones)
+    dias = np.array([str(t.get("fecha", ""))[:10] for t in transacciones], dtype=str)
+    montos = np.fromiter(
+        (float(t.get("monto", 0.0) or 0.0) for t in transacciones), dtype=float, count=cantidad
+    )
+    cuotapartes = np.fromiter(
+        (float(t.get("cuotapartes", 0.0) or 0.0) for t in transacciones), dtype=float, count=cantidad
+    )
+    es_orden = np.fromiter(
+        (t.get("tipo") in TIPOS and "fecha_orden" in t for t in transacciones),
+        dtype=bool,
+        count=cantidad,
+    )
+
+    # Fila del balance que alcanza a cada transacción (como ``serie_nav``);
+    # se reprecian las órdenes del tramo liquidadas el mismo día del balance.
+    fila = np.searchsorted(fechas, dias, side="left")
+    en_serie = fila < cantidad_fechas
+    mismo_dia = en_serie & (fechas[np.minimum(fila, cantidad_fechas - 1)] == dias)
+    repreciar = es_orden & mismo_dia & (fila >= desde)
+
+    flujos = np.bincount(fila[repreciar], weights=montos[repreciar], minlength=cantidad_fechas)
+    otras = en_serie & ~repreciar
+    sin_repreciar = np.bincount(fila[otras], weights=cuotapartes[otras], minlength=cantidad_fechas)
+
+    # Valuación de cada día del tramo: la corregida (neta de comisiones
+    # pendientes) o la registrada sin el lote.
+    valuaciones = anteriores - flujos
+    for fecha, valor in balances.items():
+        valuaciones[np.searchsorted(fechas, fecha)] = valor - comisiones[fecha]
+    tramo = slice(desde, cantidad_fechas)
+    valuacion = valuaciones[tramo]
+    if np.any(~(valuacion > 0)):
+        malo = fechas[desde + int(np.flatnonzero(~(valuacion > 0))[0])]
+        raise ValueError(f"{malo}: la valuación sin los movimientos del día no es positiva")
+
+    iniciales = sum(saldos_arrastrados(datos).get("cuotapartes", {}).values())
+    previas = iniciales + float(cuotapartes[en_serie & (fila < desde)].sum())
+    inicio = previas + sin_repreciar[desde]
+    if inicio <= 0:
+        raise ValueError(f"{fechas[desde]}: no había cuotapartes en circulación para valuar")
+
+    # S_{k+1} = S_k * (1 + F_k / V_k) + G_{k+1}, resuelta en forma cerrada.
+    crecimiento = 1.0 + flujos[tramo] / valuacion
+    productos = np.concatenate(([1.0], np.cumprod(crecimiento[:-1])))
+    agregados = sin_repreciar[tramo] / productos
+    agregados[0] = 0.0
+    en_circulacion = productos * (inicio + np.cumsum(agregados))
+    nav_tramo = valuacion / en_circulacion
+
+    balances_nuevos = anteriores.copy()
+    for fecha in balances:
+        k = int(np.searchsorted(fechas, fecha))
+        balances_nuevos[k] = valuaciones[k] + flujos[k]
+
+    # Valor de cuotaparte anterior con la definición de ``serie_nav``.
+    acumuladas = iniciales + np.cumsum(
+        np.bincount(fila[en_serie], weights=cuotapartes[en_serie], minlength=cantidad_fechas)
+    )
+    with np.errstate(divide="ignore", invalid="ignore"):
+        nav_anterior = np.where(acumuladas > 0, anteriores / acumuladas, np.nan)
+    nav_nuevo = nav_anterior.copy()
+    nav_nuevo[tramo] = nav_tramo
+
+    indices = np.flatnonzero(repreciar)
+    valores = nav_nuevo[fila[indices]]
+    nuevas = montos[indices] / valores
+    diferencias = nuevas - cuotapartes[indices]
+    por_fila = np.cumsum(np.bincount(fila[indices], weights=diferencias, minlength=cantidad_fechas))
+
+    nombres, grupo = np.unique(
+        np.array([str(transacciones[i].get("cliente", "")) for i in indices], dtype=str),
+        return_inverse=True,
+    )
+    por_cliente = np.bincount(grupo, weights=diferencias, minlength=len(nombres))
+    clientes = datos.get("clientes", {})
+    sin_cuotapartes = [
+        str(nombre)
+        for nombre, diferencia in zip(nombres, por_cliente)
+        if float(clientes.get(nombre, {}).get("cuotapartes", 0.0) or 0.0) + diferencia
+        < -TOLERANCIA_CUOTAPARTES
+    ]
+
+    # El valor vigente puede incluir comisiones posteriores al último balance:
+    # se ajusta en la misma proporción que el último valor de la serie.
+    valor_actual = float(datos.get("valor_cuotaparte", 0.0) or 0.0)
+    if nav_anterior[-1] > 0 and valor_actual > 0:
+        valor_nuevo = valor_actual * float(nav_nuevo[-1] / nav_anterior[-1])
+    else:
+        valor_nuevo = float(nav_nuevo[-1])
+    return {
+        "desde": str(fechas[desde]),
+        "corregidas": sorted(balances),
+        "comisiones_pendientes": comisiones,
+        "fechas": fechas,
+        "balances_anteriores": anteriores,
+        "balances_nuevos": balances_nuevos,
+        "nav_anterior": nav_anterior,
+        "nav_nuevo": nav_nuevo,
+        "diferencia_acumulada": por_fila,
+        "indices": indices,
+        "cuotapartes": nuevas,
+        "valores_cuotaparte": valores,
+        "modificadas": int(np.count_nonzero(np.abs(diferencias) > TOLERANCIA_CUOTAPARTES)),
+        "clientes": [str(n) for n in nombres],
+        "diferencias": por_cliente,
+        "diferencia_total": float(diferencias.sum()),
+        "valor_cuotaparte_anterior": valor_actual,
+        "valor_cuotaparte_nuevo": valor_nuevo,
+        "sin_cuotapartes": sin_cuotapartes,
+    }
+
+
+def _comisiones_pendientes(anotadas: Dict[str, float], fecha: str) -> float:
+    """Comisiones pendientes anotadas en el balance de ``fecha`` o el anterior."""
+    previas = [f for f in anotadas if f <= fecha]
+    return anotadas[max(previas)] if previas else 0.0
+
+
+def aplicar_correccion(datos: Dict, correccion: Dict) -> List[Dict]:
+    """Registra en ``datos`` la corrección calculada y devuelve el balance nuevo.
+
+    Lanza ``ValueError`` si algún cliente quedaría con cuotapartes negativas.
+    """
+    if correccion["sin_cuotapartes"]:
+        raise ValueError(
+            "Cuotapartes insuficientes para los rescates de: "
+            + ", ".join(correccion["sin_cuotapartes"])
+        )
+    fechas = correccion["fechas"]
+    desde = int(np.searchsorted(fechas, correccion["desde"]))
+    corregidas = set(correccion["corregidas"])
+
+    entradas = {b["fecha"][:10]: b for b in datos.get("balance_diario", [])}
+    balance_diario = []
+    for k, fecha in enumerate(fechas):
+        entrada = entradas.get(fecha) or {"fecha": str(fecha)}
+        if fecha in corregidas:
+            entrada["balance"] = float(correccion["balances_nuevos"][k])
+            if correccion["comisiones_pendientes"][fecha]:
+                entrada["comisiones_pendientes"] = correccion["comisiones_pendientes"][fecha]
+        # Las anotaciones del cierre diario siguen el mismo recálculo.
+        if k >= desde and "valor_cuotaparte" in entrada and correccion["nav_anterior"][k] > 0:
+            entrada["valor_cuotaparte"] *= float(correccion["nav_nuevo"][k] / correccion["nav_anterior"][k])
+        if k >= desde and "total_cuotapartes" in entrada:
+            entrada["total_cuotapartes"] += float(correccion["diferencia_acumulada"][k])
+        balance_diario.append(entrada)
+    datos["balance_diario"] = balance_diario[-MAX_DIAS_BALANCE:]
+
+    transacciones = datos["transacciones"]
+    for indice, cuotapartes, valor in zip(
+        correccion["indices"], correccion["cuotapartes"], correccion["valores_cuotaparte"]
+    ):
+        transacciones[indice]["cuotapartes"] = float(cuotapartes)
+        transacciones[indice]["valor_cuotaparte"] = float(valor)
+
+    clientes = datos["clientes"]
+    for nombre, diferencia in zip(correccion["clientes"], correccion["diferencias"]):
+        if nombre in clientes:
+            clientes[nombre]["cuotapartes"] += float(diferencia)
+    datos["total_cuotapartes"] = datos.get("total_cuotapartes", 0.0) + correccion["diferencia_total"]
+    datos["valor_cuotaparte"] = correccion["valor_cuotaparte_nuevo"]
+    return datos["balance_diario"]
+
+
+__all__ = [
+    "MAX_DIAS_BALANCE",
+    "aplicar_correccion",
+    "calcular_correccion",
+]
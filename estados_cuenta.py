@@ -0,0 +1,430 @@
+"""Generación en lote de estados de cuenta por cliente.
+
+Para un período (``AAAA-MM`` o ``AAAA-MM-DD:AAAA-MM-DD``) se arma un estado por
+cliente con su tenencia al inicio y al cierre, los movimientos del período, el
+valor de cuotaparte y el rendimiento. Los archivos (CSV, HTML y PDF) se
+escriben en paralelo con un pool de procesos.
+
+El snapshot del fondo se lee una sola vez en el proceso principal. De él se
+arma un contexto compacto (valores de cuotaparte, tenencias y movimientos por
+cliente) que cada proceso del pool recibe una única vez al iniciar; las tareas
+solo transportan nombres de clientes.
+"""
+
+from __future__ import annotations
+
+import calendar
+import csv
+import hashlib
+import html
+import io
+import os
+import re
+import time
+from concurrent.futures import ProcessPoolExecutor
+from datetime import date
+from typing import Dict, Iterable, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+from archivo_historico import corte, inicio_balance, libro
+from conciliacion import sumar_por_cliente
+from tipos_cambio import serie_nav
+
+FORMATOS = ("csv", "html", "pdf")
+
+_CONTEXTO: Optional[Dict] = None
+
+
+def parsear_periodo(periodo: str) -> Tuple[str, str]:
+    """Convierte ``AAAA-MM`` o ``AAAA-MM-DD:AAAA-MM-DD`` en fechas de inicio y fin."""
+    periodo = periodo.strip()
+    if re.fullmatch(r"\d{4}-\d{2}", periodo):
+        anio, mes = (int(p) for p in periodo.split("-"))
+        ultimo = calendar.monthrange(anio, mes)[1]
+        return date(anio, mes, 1).isoformat(), date(anio, mes, ultimo).isoformat()
+    if ":" in periodo:
+        inicio, fin = (p.strip() for p in periodo.split(":", 1))
+        inicio_fecha = date.fromisoformat(inicio)
+        fin_fecha = date.fromisoformat(fin)
+        if fin_fecha < inicio_fecha:
+            raise ValueError("La fecha final es anterior a la inicial")
+        return inicio_fecha.isoformat(), fin_fecha.isoformat()
+    raise ValueError(f"Período inválido: {periodo}. Use AAAA-MM o AAAA-MM-DD:AAAA-MM-DD")
+
+
+def _nav_a_fecha(fechas: np.ndarray, navs: np.ndarray, fecha: str, defecto: float) -> float:
+    """Último valor de cuotaparte conocido hasta ``fecha`` (inclusive)."""
+    validos = ~np.isnan(navs)
+    fechas, navs = fechas[validos], navs[validos]
+    posicion = int(np.searchsorted(fechas, fecha, side="right")) - 1
+    if posicion < 0:
+        return float(navs[0]) if len(navs) else defecto
+    return float(navs[posicion])
+
+
+def preparar_contexto(
+    datos: Dict,
+    periodo: str,
+    nombre_fondo: str = "Fondo Común de Inversión",
+    archivo_datos: Optional[str] = None,
+) -> Dict:
+    """Extrae del snapshot todo lo que necesitan los estados del período.
+
+    Si el período (o el balance usado para el valor de cuotaparte) es anterior
+    al corte del archivo histórico, se abren los segmentos de ``archivo_datos``
+    necesarios.
+    """
+    inicio, fin = parsear_periodo(periodo)
+    desde = min(filter(None, (inicio, inicio_balance(datos))))
+    if archivo_datos is None and corte(datos) and desde < corte(datos):
+        raise ValueError("El período alcanza transacciones archivadas: falta el archivo de datos")
+    iniciales, transacciones = libro(datos, archivo_datos or "", desde, fin)
+    valor_actual = float(datos.get("valor_cuotaparte", 0.0) or 0.0)
+
+    serie = serie_nav(datos.get("balance_diario", []), transacciones, iniciales)
+    nav_inicio = _nav_a_fecha(serie["fechas"], serie["nav"], _dia_anterior(inicio), valor_actual)
+    nav_fin = _nav_a_fecha(serie["fechas"], serie["nav"], fin, valor_actual)
+    if fin >= date.today().isoformat():
+        nav_fin = valor_actual
+
+    previas = [t for t in transacciones if str(t.get("fecha", ""))[:10] < inicio]
+    del_periodo = [
+        t for t in transacciones if inicio <= str(t.get("fecha", ""))[:10] <= fin
+    ]
+    tenencia_inicial = sumar_por_cliente(previas)
+    for nombre, cuotapartes in iniciales.items():
+        tenencia_inicial[nombre] = tenencia_inicial.get(nombre, 0.0) + cuotapartes
+    variacion = sumar_por_cliente(del_periodo)
+
+    movimientos: Dict[str, List[Dict]] = {}
+    for t in del_periodo:
+        movimientos.setdefault(t.get("cliente", ""), []).append(
+            {
+                "fecha": t.get("fecha", ""),
+                "tipo": t.get("tipo", ""),
+                "monto": float(t.get("monto", 0.0) or 0.0),
+                "cuotapartes": float(t.get("cuotapartes", 0.0) or 0.0),
+                "valor_cuotaparte": float(t.get("valor_cuotaparte", 0.0) or 0.0),
+            }
+        )
+
+    clientes = {}
+    for nombre in datos.get("clientes", {}):
+        inicial = tenencia_inicial.get(nombre, 0.0)
+        clientes[nombre] = {
+            "cuotapartes_inicio": inicial,
+            "cuotapartes_fin": inicial + variacion.get(nombre, 0.0),
+            "movimientos": movimientos.get(nombre, []),
+        }
+
+    return {
+        "fondo": nombre_fondo,
+        "inicio": inicio,
+        "fin": fin,
+        "nav_inicio": nav_inicio,
+        "nav_fin": nav_fin,
+        "clientes": clientes,
+    }
+
+
+def _dia_anterior(fecha: str) -> str:
+    return date.fromordinal(date.fromisoformat(fecha).toordinal() - 1).isoformat()
+
+
+def calcular_estado(contexto: Dict, cliente: str) -> Dict:
+    """Cifras del estado de cuenta de ``cliente``."""
+    info = contexto["clientes"][cliente]
+    valor_inicio = info["cuotapartes_inicio"] * contexto["nav_inicio"]
+    valor_fin = info["cuotapartes_fin"] * contexto["nav_fin"]
+    # Las comisiones no son aportes ni retiros: ya bajaron el valor de
+    # cuotaparte, así que quedan dentro del resultado y se informan aparte.
+    aportes_netos = sum(
+        (m["monto"] for m in info["movimientos"] if m["tipo"] != "comision"), 0.0
+    )
+    comisiones = -sum(
+        (m["monto"] for m in info["movimientos"] if m["tipo"] == "comision"), 0.0
+    )
+    resultado = valor_fin - valor_inicio - aportes_netos
+    rendimiento = (
+        (contexto["nav_fin"] / contexto["nav_inicio"] - 1) * 100
+        if contexto["nav_inicio"]
+        else 0.0
+    )
+    return {
+        "cliente": cliente,
+        "fondo": contexto["fondo"],
+        "inicio": contexto["inicio"],
+        "fin": contexto["fin"],
+        "nav_inicio": contexto["nav_inicio"],
+        "nav_fin": contexto["nav_fin"],
+        "cuotapartes_inicio": info["cuotapartes_inicio"],
+        "cuotapartes_fin": info["cuotapartes_fin"],
+        "valor_inicio": valor_inicio,
+        "valor_fin": valor_fin,
+        "aportes_netos": aportes_netos,
+        "comisiones": comisiones,
+        "resultado": resultado,
+        "rendimiento": rendimiento,
+        "movimientos": info["movimientos"],
+    }
+
+
+_CAMPOS_CSV = (
+    "cliente",
+    "fondo",
+    "inicio",
+    "fin",
+    "cuotapartes_inicio",
+    "cuotapartes_fin",
+    "nav_inicio",
+    "nav_fin",
+    "valor_inicio",
+    "aportes_netos",
+    "comisiones",
+    "valor_fin",
+    "resultado",
+    "rendimiento",
+)
+
+
+def _lineas_resumen(estado: Dict) -> List[Tuple[str, str]]:
+    return [
+        ("Cliente", estado["cliente"]),
+        ("Fondo", estado["fondo"]),
+        ("Período", f"{estado['inicio']} al {estado['fin']}"),
+        ("Cuotapartes al inicio", f"{estado['cuotapartes_inicio']:,.4f}"),
+        ("Cuotapartes al cierre", f"{estado['cuotapartes_fin']:,.4f}"),
+        ("Valor cuotaparte al inicio", f"${estado['nav_inicio']:,.2f}"),
+        ("Valor cuotaparte al cierre", f"${estado['nav_fin']:,.2f}"),
+        ("Saldo al inicio", f"${estado['valor_inicio']:,.2f}"),
+        ("Suscripciones netas", f"${estado['aportes_netos']:,.2f}"),
+        ("Comisiones", f"${estado['comisiones']:,.2f}"),
+        ("Saldo al cierre", f"${estado['valor_fin']:,.2f}"),
+        ("Resultado del período", f"${estado['resultado']:,.2f}"),
+        ("Rendimiento de la cuotaparte", f"{estado['rendimiento']:+.2f}%"),
+    ]
+
+
+def estado_csv(estado: Dict) -> str:
+    """Estado en CSV con valores numéricos sin formato (aptos para planillas)."""
+    salida = io.StringIO()
+    escritor = csv.writer(salida)
+    for campo in _CAMPOS_CSV:
+        valor = estado[campo]
+        escritor.writerow([campo, f"{valor:.6f}" if isinstance(valor, float) else valor])
+    escritor.writerow([])
+    escritor.writerow(["fecha", "tipo", "monto", "cuotapartes", "valor_cuotaparte"])
+    for m in estado["movimientos"]:
+        escritor.writerow(
+            [m["fecha"], m["tipo"], f"{m['monto']:.2f}", f"{m['cuotapartes']:.6f}", f"{m['valor_cuotaparte']:.6f}"]
+        )
+    return salida.getvalue()
+
+
+def estado_html(estado: Dict) -> str:
+    e = html.escape
+    filas_resumen = "\n".join(
+        f"<tr><th>{e(etiqueta)}</th><td>{e(valor)}</td></tr>"
+        for etiqueta, valor in _lineas_resumen(estado)
+    )
+    filas_movimientos = "\n".join(
+        f"<tr><td>{e(m['fecha'][:19])}</td><td>{e(m['tipo'])}</td>"
+        f"<td>${m['monto']:,.2f}</td><td>{m['cuotapartes']:,.4f}</td>"
+        f"<td>${m['valor_cuotaparte']:,.2f}</td></tr>"
+        for m in estado["movimientos"]
+    ) or '<tr><td colspan="5">Sin movimientos en el período</td></tr>'
+    return f"""<!DOCTYPE html>
+<html lang="es">
+<head>
+<meta charset="utf-8">
+<title>Estado de cuenta - {e(estado['cliente'])}</title>
+<style>
+body {{ font-family: sans-serif; margin: 2rem; color: #222; }}
+h1 {{ color: #4b3fa0; }}
+table {{ border-collapse: collapse; margin-bottom: 1.5rem; }}
+th, td {{ border: 1px solid #dee2e6; padding: 6px 12px; text-align: left; }}
+th {{ background: #f8f9fa; }}
+</style>
+</head>
+<body>
+<h1>Estado de cuenta</h1>
+<table>
+{filas_resumen}
+</table>
+<h2>Movimientos del período</h2>
+<table>
+<tr><th>Fecha</th><th>Tipo</th><th>Monto</th><th>Cuotapartes</th><th>Valor cuotaparte</th></tr>
+{filas_movimientos}
+</table>
+</body>
+</html>
+"""
+
+
+def _texto_pdf(texto: str) -> str:
+    texto = texto.encode("cp1252", errors="replace").decode("latin-1")
+    return texto.replace("\\", "\\\\").replace("(", "\\(").replace(")", "\\)")
+
+
+def estado_pdf(estado: Dict) -> bytes:
+    """PDF de texto simple (Helvetica), sin dependencias externas."""
+    lineas = ["ESTADO DE CUENTA", ""]
+    lineas += [f"{etiqueta}: {valor}" for etiqueta, valor in _lineas_resumen(estado)]
+    lineas += ["", "MOVIMIENTOS DEL PERÍODO", ""]
+    if estado["movimientos"]:
+        for m in estado["movimientos"]:
+            lineas.append(
+                f"{m['fecha'][:10]}  {m['tipo']:<12} ${m['monto']:>16,.2f}  "
+                f"{m['cuotapartes']:>14,.4f} cp  a ${m['valor_cuotaparte']:,.2f}"
+            )
+    else:
+        lineas.append("Sin movimientos en el período")
+
+    por_pagina = 50
+    paginas = [lineas[i:i + por_pagina] for i in range(0, len(lineas), por_pagina)]
+
+    objetos: List[bytes] = []
+    # 1: catálogo, 2: árbol de páginas, 3: fuente; luego página + contenido.
+    ids_paginas = [4 + 2 * i for i in range(len(paginas))]
+    objetos.append(b"<< /Type /Catalog /Pages 2 0 R >>")
+    kids = " ".join(f"{i} 0 R" for i in ids_paginas)
+    objetos.append(f"<< /Type /Pages /Kids [{kids}] /Count {len(paginas)} >>".encode())
+    objetos.append(
+        b"<< /Type /Font /Subtype /Type1 /BaseFont /Helvetica /Encoding /WinAnsiEncoding >>"
+    )
+    for numero, pagina in enumerate(paginas):
+        contenido = ["BT", "/F1 10 Tf", "14 TL", "50 800 Td"]
+        for linea in pagina:
+            contenido.append(f"({_texto_pdf(linea)}) Tj T*")
+        contenido.append("ET")
+        flujo = "\n".join(contenido).encode("latin-1")
+        objetos.append(
+            f"<< /Type /Page /Parent 2 0 R /MediaBox [0 0 595 842] "
+            f"/Resources << /Font << /F1 3 0 R >> >> /Contents {ids_paginas[numero] + 1} 0 R >>".encode()
+        )
+        objetos.append(b"<< /Length %d >>\nstream\n" % len(flujo) + flujo + b"\nendstream")
+
+    salida = bytearray(b"%PDF-1.4\n")
+    posiciones = []
+    for indice, objeto in enumerate(objetos, start=1):
+        posiciones.append(len(salida))
+        salida += b"%d 0 obj\n" % indice + objeto + b"\nendobj\n"
+    inicio_xref = len(salida)
+    salida += b"xref\n0 %d\n0000000000 65535 f \n" % (len(objetos) + 1)
+    for posicion in posiciones:
+        salida += b"%010d 00000 n \n" % posicion
+    salida += (
+        b"trailer\n<< /Size %d /Root 1 0 R >>\nstartxref\n%d\n%%%%EOF\n"
+        % (len(objetos) + 1, inicio_xref)
+    )
+    return bytes(salida)
+
+
+def _nombre_archivo(cliente: str) -> str:
+    """Nombre legible y único: el hash del nombre exacto separa a los clientes
+    cuyos nombres limpios coinciden ("Juan Pérez" y "Juan/Pérez")."""
+    limpio = re.sub(r"[^\w\-]+", "_", cliente, flags=re.UNICODE).strip("_")
+    huella = hashlib.sha1(cliente.encode("utf-8")).hexdigest()[:8]
+    return f"{limpio or 'cliente'}_{huella}"
+
+
+def escribir_estado(estado: Dict, directorio: str, formatos: Sequence[str]) -> int:
+    base = os.path.join(directorio, _nombre_archivo(estado["cliente"]))
+    escritos = 0
+    if "csv" in formatos:
+        with open(base + ".csv", "w", encoding="utf-8", newline="") as f:
+            f.write(estado_csv(estado))
+        escritos += 1
+    if "html" in formatos:
+        with open(base + ".html", "w", encoding="utf-8") as f:
+            f.write(estado_html(estado))
+        escritos += 1
+    if "pdf" in formatos:
+        with open(base + ".pdf", "wb") as f:
+            f.write(estado_pdf(estado))
+        escritos += 1
+    return escritos
+
+
+def _inicializar_proceso(contexto: Dict) -> None:
+    global _CONTEXTO
+    _CONTEXTO = contexto
+
+
+def _generar_lote(clientes: List[str], directorio: str, formatos: Sequence[str]) -> int:
+    escritos = 0
+    for cliente in clientes:
+        escritos += escribir_estado(calcular_estado(_CONTEXTO, cliente), directorio, formatos)
+    return escritos
+
+
+def _lotes(nombres: List[str], cantidad: int) -> Iterable[List[str]]:
+    for i in range(0, len(nombres), cantidad):
+        yield nombres[i:i + cantidad]
+
+
+def generar_estados_cuenta(
+    datos: Dict,
+    periodo: str,
+    directorio: str,
+    formatos: Sequence[str] = FORMATOS,
+    procesos: Optional[int] = None,
+    clientes: Optional[Sequence[str]] = None,
+    nombre_fondo: str = "Fondo Común de Inversión",
+    tamano_lote: int = 64,
+    archivo_datos: Optional[str] = None,
+) -> Dict:
+    """Genera los estados de cuenta del período y devuelve métricas de la corrida."""
+    formatos = [f for f in formatos if f in FORMATOS]
+    if not formatos:
+        raise ValueError(f"Formatos válidos: {', '.join(FORMATOS)}")
+
+    inicio_reloj = time.perf_counter()
+    contexto = preparar_contexto(datos, periodo, nombre_fondo, archivo_datos)
+    nombres = [c for c in (clientes or contexto["clientes"]) if c in contexto["clientes"]]
+    os.makedirs(directorio, exist_ok=True)
+    preparacion = time.perf_counter() - inicio_reloj
+
+    procesos = procesos or os.cpu_count() or 1
+    procesos = max(1, min(procesos, len(nombres) or 1))
+    if procesos == 1:
+        _inicializar_proceso(contexto)
+        archivos = _generar_lote(nombres, directorio, formatos)
+    else:
+        archivos = 0
+        with ProcessPoolExecutor(
+            max_workers=procesos,
+            initializer=_inicializar_proceso,
+            initargs=(contexto,),
+        ) as pool:
+            futuros = [
+                pool.submit(_generar_lote, lote, directorio, formatos)
+                for lote in _lotes(nombres, tamano_lote)
+            ]
+            for futuro in futuros:
+                archivos += futuro.result()
+
+    segundos = time.perf_counter() - inicio_reloj
+    return {
+        "periodo": f"{contexto['inicio']}:{contexto['fin']}",
+        "directorio": directorio,
+        "clientes": len(nombres),
+        "archivos": archivos,
+        "procesos": procesos,
+        "segundos": segundos,
+        "segundos_preparacion": preparacion,
+        "clientes_por_segundo": (len(nombres) / segundos) if segundos else 0.0,
+    }
+
+
+__all__ = [
+    "FORMATOS",
+    "calcular_estado",
+    "estado_csv",
+    "estado_html",
+    "estado_pdf",
+    "generar_estados_cuenta",
+    "parsear_periodo",
+    "preparar_contexto",
+]
@@ -0,0 +1,138 @@
+"""Exportación por bloques del libro de movimientos.
+
+El CSV se produce por bloques desde un generador: no se arma el DataFrame
+formateado ni se formatea todo el libro en un único string. ``FlujoBytes``
+adapta ese generador a un objeto de archivo de solo lectura, que es lo que
+aceptan los botones de descarga del panel.
+
+Limitación: ``st.download_button`` no transmite el archivo por partes. Al
+pulsar el botón Streamlit lee el flujo completo y lo guarda como un único
+``bytes`` en su almacenamiento de medios, así que el CSV entero ocupa memoria
+del servidor durante la descarga. Lo que se evita es generarlo en cada rerun
+(se arma solo al pulsar) y las copias intermedias del DataFrame formateado.
+Streamlit no ofrece una descarga en streaming; servir el archivo como estático
+lo dejaría al alcance de cualquiera, sin el filtro de clientes del usuario.
+"""
+
+from __future__ import annotations
+
+import csv
+import io
+from typing import Callable, Dict, Iterable, Iterator, Optional, Sequence
+
+COLUMNAS_MOVIMIENTOS = (
+    "fecha",
+    "cliente",
+    "tipo",
+    "monto",
+    "cuotapartes",
+    "valor_cuotaparte",
+)
+
+
+def iterar_movimientos_csv(
+    transacciones: Sequence[Dict],
+    clientes_permitidos: Optional[Iterable[str]] = None,
+    tamano_bloque: int = 1000,
+    codificacion: str = "utf-8",
+) -> Iterator[bytes]:
+    """Genera el CSV de movimientos en bloques de ``tamano_bloque`` filas.
+
+    Las transacciones se emiten en el orden del libro (cronológico) y, si se
+    indica ``clientes_permitidos``, solo las de esos clientes.
+    """
+    permitidos = None if clientes_permitidos is None else set(clientes_permitidos)
+    buffer = io.StringIO()
+    escritor = csv.writer(buffer, lineterminator="\n")
+    escritor.writerow(COLUMNAS_MOVIMIENTOS)
+
+    filas = 0
+    for t in transacciones:
+        if permitidos is not None and t.get("cliente") not in permitidos:
+            continue
+        escritor.writerow(
+            [
+                t.get("fecha", ""),
+                t.get("cliente", ""),
+                t.get("tipo", ""),
+                f"{float(t.get('monto', 0.0) or 0.0):.2f}",
+                f"{float(t.get('cuotapartes', 0.0) or 0.0):.6f}",
+                f"{float(t.get('valor_cuotaparte', 0.0) or 0.0):.6f}",
+            ]
+        )
+        filas += 1
+        if filas >= tamano_bloque:
+            yield buffer.getvalue().encode(codificacion)
+            buffer.seek(0)
+            buffer.truncate()
+            filas = 0
+
+    resto = buffer.getvalue()
+    if resto:
+        yield resto.encode(codificacion)
+
+
+class FlujoBytes(io.RawIOBase):
+    """Archivo binario de solo lectura alimentado por un generador de bloques.
+
+    ``fabrica`` crea un generador nuevo; ``seek(0)`` vuelve a empezar desde el
+    principio, cualquier otro desplazamiento no está soportado.
+    """
+
+    def __init__(self, fabrica: Callable[[], Iterator[bytes]]) -> None:
+        super().__init__()
+        self._fabrica = fabrica
+        self._bloques = fabrica()
+        self._pendiente = memoryview(b"")
+        self._posicion = 0
+
+    def readable(self) -> bool:
+        return True
+
+    def seekable(self) -> bool:
+        return True
+
+    def tell(self) -> int:
+        return self._posicion
+
+    def seek(self, desplazamiento: int, desde: int = io.SEEK_SET) -> int:
+        if desde == io.SEEK_CUR and desplazamiento == 0:
+            return self._posicion
+        if desde != io.SEEK_SET or desplazamiento != 0:
+            raise io.UnsupportedOperation("Solo se puede volver al inicio del flujo")
+        self._bloques = self._fabrica()
+        self._pendiente = memoryview(b"")
+        self._posicion = 0
+        return 0
+
+    def readinto(self, destino) -> int:
+        while not self._pendiente:
+            try:
+                self._pendiente = memoryview(next(self._bloques))
+            except StopIteration:
+                return 0
+        cantidad = min(len(destino), len(self._pendiente))
+        destino[:cantidad] = self._pendiente[:cantidad]
+        self._pendiente = self._pendiente[cantidad:]
+        self._posicion += cantidad
+        return cantidad
+
+
+def flujo_movimientos_csv(
+    transacciones: Sequence[Dict],
+    clientes_permitidos: Optional[Iterable[str]] = None,
+    tamano_bloque: int = 1000,
+) -> FlujoBytes:
+    """Flujo de lectura con el CSV de movimientos (ver :func:`iterar_movimientos_csv`)."""
+    permitidos = None if clientes_permitidos is None else frozenset(clientes_permitidos)
+    return FlujoBytes(
+        lambda: iterar_movimientos_csv(transacciones, permitidos, tamano_bloque)
+    )
+
+
+__all__ = [
+    "COLUMNAS_MOVIMIENTOS",
+    "FlujoBytes",
+    "flujo_movimientos_csv",
+    "iterar_movimientos_csv",
+]
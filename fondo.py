@@ -0,0 +1,384 @@
+"""Modelo de datos del fondo utilizado por el panel web.
+
+El módulo no importa pandas al cargarse: la pantalla de login solo necesita
+los usuarios y los datos básicos, y las dependencias pesadas se importan
+recién cuando una vista autenticada las usa.
+
+El panel nunca modifica ``datos``: las vistas por conjunto de clientes se
+memoizan entre sesiones por versión de datos (ver ``vistas``).
+"""
+
+from __future__ import annotations
+
+import os
+from datetime import date
+from typing import TYPE_CHECKING, Dict, List, Optional, Tuple
+
+import almacenamiento
+from metricas import REGISTRO
+from vistas import CACHE_VISTAS, ModeloVista, vista_compartida
+
+if TYPE_CHECKING:
+    import pandas as pd
+
+    from tipos_cambio import TablaTiposCambio
+
+_DURACION_CARGA = REGISTRO.histograma(
+    "fci_carga_datos_segundos", "Duración de la carga inicial del archivo de datos", ("archivo",)
+)
+_TAMANO_DATOS = REGISTRO.indicador(
+    "fci_tamano_datos_bytes", "Tamaño en disco del último snapshot cargado o guardado", ("archivo",)
+)
+_DURACION_GUARDADO = REGISTRO.histograma(
+    "fci_guardado_datos_segundos", "Duración de cada guardado del archivo de datos", ("origen",)
+)
+
+
+def registrar_tamano(archivo_datos: str) -> None:
+    """Actualiza el indicador de tamaño del snapshot de ``archivo_datos``."""
+    try:
+        tamano = os.path.getsize(archivo_datos)
+    except OSError:
+        return
+    _TAMANO_DATOS.fijar(tamano, archivo=os.path.basename(archivo_datos))
+
+
+class FondoInversion:
+    """Modelo de datos del fondo"""
+
+    def __init__(self, archivo_datos: str = "fondo_datos.json") -> None:
+        self.archivo_datos = archivo_datos
+        self.version = self.version_archivo(archivo_datos)
+        # Clave de las vistas compartidas entre sesiones (ver ``vistas``).
+        self.clave_datos = (os.path.abspath(archivo_datos), self.version)
+        with _DURACION_CARGA.medir(archivo=os.path.basename(archivo_datos)):
+            self.datos = self.cargar_datos()
+        registrar_tamano(archivo_datos)
+        self._balance_df: Optional[pd.DataFrame] = None
+        self._composicion: Optional[List[Dict]] = None
+        self._tabla_tipos_cambio: Optional[TablaTiposCambio] = None
+        self._cierre: Optional[Dict] = None
+        self._version_cierre: Optional[str] = None
+        self._libros: Dict[Optional[str], Tuple[Dict[str, float], List[Dict]]] = {}
+
+    @staticmethod
+    def version_archivo(archivo_datos: str) -> str:
+        """Versión de los datos en disco (cambia cada vez que se reescribe)."""
+        try:
+            estado = os.stat(archivo_datos)
+        except OSError:
+            return "0-0"
+        return f"{estado.st_mtime_ns}-{estado.st_size}"
+
+    def cargar_datos(self) -> Dict:
+        """Carga los datos desde disco asegurando la estructura básica."""
+        if os.path.exists(self.archivo_datos):
+            try:
+                # Transacciones y balances se parsean recién cuando una vista los usa.
+                datos = almacenamiento.cargar_diferido(
+                    self.archivo_datos, self.estructura_inicial()
+                )
+            except Exception:
+                datos = self.estructura_inicial()
+        else:
+            datos = self.estructura_inicial()
+
+        estructura = self.estructura_inicial()
+        for clave, valor_default in estructura.items():
+            if clave not in datos:
+                datos[clave] = valor_default
+        return datos
+
+    def estructura_inicial(self) -> Dict:
+        return {
+            "clientes": {},
+            "transacciones": [],
+            "balance_diario": [],
+            "valor_cuotaparte": 1000.0,
+            "total_cuotapartes": 0,
+            "composicion_fondo": {},
+            "distribucion_activos": {},
+            "usuarios": {},
+            "tipo_cambio": 0.0,
+            "historial_composicion": [],
+            "tipos_cambio": {},
+            "comisiones": {},
+            "ordenes_pendientes": [],
+        }
+
+    def guardar_datos(self) -> None:
+        with _DURACION_GUARDADO.medir(origen="fondo"):
+            almacenamiento.guardar(self.archivo_datos, self.datos)
+        registrar_tamano(self.archivo_datos)
+
+    # ------------------------------------------------------------------
+    # Métodos de consulta de datos
+    # ------------------------------------------------------------------
+
+    def get_cierre(self) -> Optional[Dict]:
+        """Resultados del último cierre diario, si se calcularon sobre estos datos.
+
+        El archivo del cierre se vuelve a leer solo cuando cambia en disco.
+        """
+        from cierre_diario import leer_cierre, ruta_cierre
+
+        version = self.version_archivo(ruta_cierre(self.archivo_datos))
+        if version != self._version_cierre:
+            cierre = leer_cierre(self.archivo_datos)
+            if cierre is not None and cierre.get("version_datos") != self.version:
+                cierre = None
+            self._cierre, self._version_cierre = cierre, version
+        return self._cierre
+
+    def get_usuario(self, username: str) -> Optional[Dict]:
+        return self.datos.get("usuarios", {}).get(username)
+
+    @vista_compartida
+    def get_clientes_filtrados(
+        self, clientes_permitidos: Optional[List[str]]
+    ) -> Dict[str, Dict]:
+        clientes = self.datos.get("clientes", {})
+        if clientes_permitidos is None:
+            return dict(clientes)
+        permitidos = set(clientes_permitidos)
+        return {
+            nombre: info
+            for nombre, info in clientes.items()
+            if nombre in permitidos
+        }
+
+    def get_corte_archivo(self) -> Optional[str]:
+        """Fecha desde la que hay movimientos en el archivo de datos (None si no se archivó)."""
+        from archivo_historico import corte
+
+        return corte(self.datos)
+
+    def get_libro(self, desde: Optional[str] = None) -> Tuple[Dict[str, float], List[Dict]]:
+        """Cuotapartes iniciales por cliente y transacciones desde el mes de ``desde``.
+
+        Los segmentos archivados se abren solo si ``desde`` es anterior al
+        corte (ver ``archivo_historico``); sin ``desde`` alcanza con los
+        movimientos recientes.
+        """
+        from archivo_historico import corte, libro
+
+        limite = corte(self.datos)
+        clave = desde if limite and desde and desde < limite else None
+        if clave not in self._libros:
+            self._libros[clave] = libro(self.datos, self.archivo_datos, clave)
+        return self._libros[clave]
+
+    def get_libro_balance(self) -> Tuple[Dict[str, float], List[Dict]]:
+        """Libro desde la primera fecha del balance, para las series históricas."""
+        from archivo_historico import inicio_balance
+
+        return self.get_libro(inicio_balance(self.datos))
+
+    def get_transacciones_filtradas(
+        self, clientes_permitidos: Optional[List[str]], desde: Optional[str] = None
+    ) -> List[Dict]:
+        transacciones = self.get_libro(desde)[1]
+        if desde:
+            transacciones = [t for t in transacciones if str(t.get("fecha", ""))[:10] >= desde]
+        if clientes_permitidos is None:
+            return list(transacciones)
+        return [
+            t for t in transacciones if t.get("cliente") in clientes_permitidos
+        ]
+
+    @vista_compartida
+    def get_vista(self, clientes_permitidos: Optional[List[str]]) -> ModeloVista:
+        """Patrimonio, totales y conteos del panel en una sola pasada."""
+        return ModeloVista(self.datos, clientes_permitidos, self.get_tipo_cambio())
+
+    def get_patrimonio_clientes(
+        self, clientes_permitidos: Optional[List[str]]
+    ) -> Dict[str, Dict]:
+        return self.get_vista(clientes_permitidos).patrimonio
+
+    def get_total_cuotapartes_filtradas(
+        self, clientes_permitidos: Optional[List[str]]
+    ) -> float:
+        return self.get_vista(clientes_permitidos).total_cuotapartes
+
+    def get_balance_diario_df(self) -> pd.DataFrame:
+        """Serie de balance diario ordenada por fecha.
+
+        El panel nunca modifica ``self.datos``, así que el DataFrame se arma
+        una sola vez por instancia y se reutiliza en cada rerun.
+        """
+        if self._balance_df is not None:
+            return self._balance_df
+
+        import pandas as pd
+
+        df = pd.DataFrame(self.datos.get("balance_diario", []))
+        if not df.empty:
+            df["fecha"] = pd.to_datetime(df["fecha"], errors="coerce")
+            df = df.dropna(subset=["fecha"]).sort_values("fecha")
+        self._balance_df = df
+        return df
+
+    def calcular_rendimiento_mensualizado(self) -> Tuple[float, float]:
+        cierre = self.get_cierre()
+        if cierre and "rendimiento" in cierre:
+            return cierre["rendimiento"]["total"], cierre["rendimiento"]["mensual"]
+
+        if len(self.datos.get("balance_diario", [])) < 2:
+            return 0.0, 0.0
+
+        df_balance = self.get_balance_diario_df()
+        if df_balance.empty:
+            return 0.0, 0.0
+
+        balance_inicial = df_balance["balance"].iloc[0]
+        balance_actual = df_balance["balance"].iloc[-1]
+        if balance_inicial == 0:
+            return 0.0, 0.0
+
+        fecha_inicial = df_balance["fecha"].iloc[0]
+        fecha_actual = df_balance["fecha"].iloc[-1]
+        dias = (fecha_actual - fecha_inicial).days
+        if dias <= 0:
+            return 0.0, 0.0
+
+        rendimiento_total = ((balance_actual - balance_inicial) / balance_inicial) * 100
+        if dias >= 30:
+            rendimiento_mensual = (
+                (pow(balance_actual / balance_inicial, 30 / dias) - 1) * 100
+            )
+        else:
+            rendimiento_mensual = (rendimiento_total / dias) * 30
+
+        return rendimiento_total, rendimiento_mensual
+
+    def get_balance_total_filtrado(
+        self, clientes_permitidos: Optional[List[str]]
+    ) -> float:
+        return self.get_vista(clientes_permitidos).balance_total
+
+    def get_tabla_tipos_cambio(self) -> TablaTiposCambio:
+        if self._tabla_tipos_cambio is None:
+            from tipos_cambio import TablaTiposCambio
+
+            self._tabla_tipos_cambio = TablaTiposCambio.desde_datos(self.datos)
+        return self._tabla_tipos_cambio
+
+    def get_monedas(self) -> List[str]:
+        """Monedas en las que se pueden expresar las vistas (pesos primero)."""
+        return ["ARS"] + [m for m in self.get_tabla_tipos_cambio().monedas() if m != "ARS"]
+
+    def get_tipo_cambio(self, moneda: str = "USD") -> float:
+        """Última cotización de ``moneda`` (pesos por unidad); 0 si no hay."""
+        return self.get_tabla_tipos_cambio().cotizacion(moneda)
+
+    def get_composicion_detallada(self) -> List[Dict]:
+        """Composición vigente revaluada al tipo de cambio actual."""
+        if self._composicion is None:
+            from composicion import detallar
+
+            self._composicion = detallar(
+                self.datos.get("composicion_fondo", {}),
+                self.get_tabla_tipos_cambio().vigentes(),
+            )
+        return self._composicion
+
+    def get_fechas_composicion(self) -> List[str]:
+        return [s.get("fecha", "") for s in self.datos.get("historial_composicion", [])]
+
+    def comparar_composicion(
+        self, fecha_a: str, fecha_b: str, tipo_cambio_actual: bool = False
+    ) -> List[Dict]:
+        """Compara dos snapshots del historial de composición.
+
+        Por defecto cada fecha se valúa con las cotizaciones vigentes ese día;
+        con ``tipo_cambio_actual`` ambas se revalúan a las cotizaciones de hoy.
+        """
+        from composicion import comparar
+
+        return comparar(
+            self.datos.get("historial_composicion", []),
+            fecha_a,
+            fecha_b,
+            self.get_tabla_tipos_cambio(),
+            date.today().isoformat() if tipo_cambio_actual else None,
+        )
+
+    def get_serie_fondo(self, moneda: str = "ARS") -> pd.DataFrame:
+        """Balance diario del fondo expresado en ``moneda`` a la cotización de cada día."""
+        import pandas as pd
+
+        from tipos_cambio import serie_fondo
+
+        serie = serie_fondo(
+            self.datos.get("balance_diario", []), self.get_tabla_tipos_cambio(), moneda
+        )
+        return pd.DataFrame(
+            {"fecha": pd.to_datetime(serie["fechas"], errors="coerce"), "valor": serie["valores"]}
+        ).dropna()
+
+    def get_serie_clientes(self, clientes: List[str], moneda: str = "ARS") -> pd.DataFrame:
+        """Valor histórico de cada cliente en ``moneda`` (formato largo).
+
+        Si el último cierre ya calculó la serie de esos clientes, se usa esa y
+        no se recorre el libro de transacciones.
+        """
+        import pandas as pd
+
+        from tipos_cambio import serie_clientes
+
+        cierre = self.get_cierre()
+        precalculada = (cierre or {}).get("serie_clientes")
+        if (
+            precalculada
+            and precalculada["moneda"] == moneda
+            and set(clientes) <= set(precalculada["clientes"])
+        ):
+            df = pd.DataFrame(precalculada["valores"], columns=precalculada["clientes"], dtype=float)
+            df = df[list(clientes)]
+            df["fecha"] = pd.to_datetime(precalculada["fechas"], errors="coerce")
+            return df.melt(id_vars="fecha", var_name="cliente", value_name="valor").dropna()
+
+        iniciales, transacciones = self.get_libro_balance()
+        serie = serie_clientes(
+            self.datos.get("balance_diario", []),
+            transacciones,
+            clientes,
+            self.get_tabla_tipos_cambio(),
+            moneda,
+            iniciales,
+        )
+        df = pd.DataFrame(serie["valores"], columns=list(serie["clientes"]))
+        df["fecha"] = pd.to_datetime(serie["fechas"], errors="coerce")
+        return df.melt(id_vars="fecha", var_name="cliente", value_name="valor").dropna()
+
+    def get_proyeccion(self, meses: int = 12, caminos: Optional[int] = None) -> Optional[Dict]:
+        """Bandas de percentiles del factor de crecimiento para los próximos ``meses``.
+
+        Se simula una vez por versión de datos y parámetros, y se comparte
+        entre sesiones. ``None`` si el historial no alcanza para estimar.
+        """
+        from proyeccion import DIAS_HABILES_POR_MES, proyectar, rendimientos_diarios
+
+        caminos = caminos or int(os.environ.get("FCI_PROYECCION_CAMINOS", "20000"))
+
+        def calcular() -> Optional[Dict]:
+            iniciales, transacciones = self.get_libro_balance()
+            rendimientos = rendimientos_diarios(
+                self.datos.get("balance_diario", []), transacciones, iniciales
+            )
+            return proyectar(rendimientos, meses * DIAS_HABILES_POR_MES, caminos)
+
+        clave = (self.clave_datos, None, "proyeccion", meses, caminos)
+        return CACHE_VISTAS.obtener(clave, calcular)
+
+    def precalcular(self) -> None:
+        """Calcula por adelantado las vistas derivadas más costosas."""
+        self.get_cierre()
+        self.get_balance_diario_df()
+        self.calcular_rendimiento_mensualizado()
+        self.get_vista(None)
+        self.get_composicion_detallada()
+
+
+__all__ = ["FondoInversion", "registrar_tamano"]
@@ -0,0 +1,141 @@
+"""Índice ordenado de nombres para búsqueda por prefijo y autocompletado.
+
+La consola de administración pide nombres de clientes y usuarios por teclado.
+Con miles de clientes no sirve listar todos ni exigir el nombre exacto: este
+índice mantiene los nombres ordenados por una clave normalizada (sin
+mayúsculas ni acentos), resuelve prefijos con búsqueda binaria, sugiere
+nombres parecidos ante errores de tipeo y alimenta el autocompletado con Tab
+de ``readline`` cuando está disponible.
+"""
+
+from __future__ import annotations
+
+import bisect
+import contextlib
+import difflib
+import unicodedata
+from typing import Iterable, Iterator, List, Optional, Tuple
+
+try:  # readline no existe en todas las plataformas (p. ej. Windows).
+    import readline
+except ImportError:  # pragma: no cover - depende de la plataforma
+    readline = None
+
+_FIN_CLAVE = "\U0010ffff"
+
+
+def normalizar(nombre: str) -> str:
+    """Clave de comparación: sin distinguir mayúsculas ni acentos."""
+    descompuesto = unicodedata.normalize("NFKD", nombre.strip().casefold())
+    return "".join(c for c in descompuesto if not unicodedata.combining(c))
+
+
+class IndiceNombres:
+    """Nombres ordenados por clave normalizada, con altas y bajas incrementales."""
+
+    def __init__(self, nombres: Iterable[str] = ()) -> None:
+        self._entradas: List[Tuple[str, str]] = sorted(
+            (normalizar(n), n) for n in set(nombres)
+        )
+        self._opciones: List[str] = []
+
+    def __len__(self) -> int:
+        return len(self._entradas)
+
+    def __contains__(self, nombre: object) -> bool:
+        if not isinstance(nombre, str):
+            return False
+        entrada = (normalizar(nombre), nombre)
+        posicion = bisect.bisect_left(self._entradas, entrada)
+        return posicion < len(self._entradas) and self._entradas[posicion] == entrada
+
+    def __iter__(self) -> Iterator[str]:
+        return (nombre for _, nombre in self._entradas)
+
+    def agregar(self, nombre: str) -> None:
+        if nombre not in self:
+            bisect.insort(self._entradas, (normalizar(nombre), nombre))
+
+    def quitar(self, nombre: str) -> None:
+        entrada = (normalizar(nombre), nombre)
+        posicion = bisect.bisect_left(self._entradas, entrada)
+        if posicion < len(self._entradas) and self._entradas[posicion] == entrada:
+            del self._entradas[posicion]
+
+    def con_prefijo(self, prefijo: str, limite: Optional[int] = None) -> List[str]:
+        """Nombres que empiezan con ``prefijo`` (sin distinguir mayúsculas ni acentos)."""
+        clave = normalizar(prefijo)
+        desde = bisect.bisect_left(self._entradas, (clave, ""))
+        hasta = bisect.bisect_left(self._entradas, (clave + _FIN_CLAVE, ""), lo=desde)
+        if limite is not None:
+            hasta = min(hasta, desde + limite)
+        return [nombre for _, nombre in self._entradas[desde:hasta]]
+
+    def sugerencias(self, nombre: str, cantidad: int = 5) -> List[str]:
+        """Nombres con prefijo ``nombre`` o, si no hay, los más parecidos."""
+        por_prefijo = self.con_prefijo(nombre, cantidad)
+        if por_prefijo:
+            return por_prefijo
+        claves = [clave for clave, _ in self._entradas]
+        parecidas = difflib.get_close_matches(normalizar(nombre), claves, n=cantidad, cutoff=0.6)
+        resultado: List[str] = []
+        for clave in parecidas:
+            posicion = bisect.bisect_left(self._entradas, (clave, ""))
+            while posicion < len(self._entradas) and self._entradas[posicion][0] == clave:
+                if self._entradas[posicion][1] not in resultado:
+                    resultado.append(self._entradas[posicion][1])
+                posicion += 1
+        return resultado[:cantidad]
+
+    def resolver(self, texto: str) -> Optional[str]:
+        """Nombre registrado que corresponde a ``texto``, o ``None``.
+
+        Acepta el nombre exacto o el mismo nombre con otras mayúsculas o
+        acentos, siempre que identifique a uno solo. Los prefijos no se
+        resuelven solos: se ofrecen como sugerencias.
+        """
+        texto = texto.strip()
+        if not texto:
+            return None
+        if texto in self:
+            return texto
+        clave = normalizar(texto)
+        desde = bisect.bisect_left(self._entradas, (clave, ""))
+        iguales = []
+        for entrada_clave, nombre in self._entradas[desde:desde + 2]:
+            if entrada_clave == clave:
+                iguales.append(nombre)
+        return iguales[0] if len(iguales) == 1 else None
+
+    def completar(self, texto: str, estado: int) -> Optional[str]:
+        """Función de completado para ``readline`` (listas separadas por coma)."""
+        if estado == 0:
+            sangria = texto[: len(texto) - len(texto.lstrip())]
+            self._opciones = [sangria + n for n in self.con_prefijo(texto.lstrip(), 50)]
+        if estado < len(self._opciones):
+            return self._opciones[estado]
+        return None
+
+
+@contextlib.contextmanager
+def autocompletado(indice: Optional[IndiceNombres]) -> Iterator[None]:
+    """Activa el completado con Tab sobre ``indice`` mientras dure el bloque."""
+    if readline is None or indice is None:
+        yield
+        return
+    anterior = readline.get_completer()
+    delimitadores = readline.get_completer_delims()
+    readline.set_completer(indice.completar)
+    readline.set_completer_delims(",")
+    if "libedit" in (readline.__doc__ or ""):
+        readline.parse_and_bind("bind ^I rl_complete")
+    else:
+        readline.parse_and_bind("tab: complete")
+    try:
+        yield
+    finally:
+        readline.set_completer(anterior)
+        readline.set_completer_delims(delimitadores)
+
+
+__all__ = ["IndiceNombres", "autocompletado", "normalizar"]
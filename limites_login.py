@@ -0,0 +1,214 @@
+"""Límites de intentos de ingreso al panel.
+
+Cada intento de ingreso cuesta una derivación PBKDF2 completa (ver
+``security``). Para que una ráfaga de intentos no acapare la CPU del servidor:
+
+* cada usuario y cada dirección de cliente tienen un cubo de tokens: un intento
+  consume un token y los tokens se reponen a ritmo constante;
+* tras varios fallos seguidos la misma clave queda bloqueada con una espera que
+  se duplica en cada fallo (hasta un máximo) y se reinicia al ingresar bien;
+* un semáforo acota las verificaciones en curso en todo el proceso; si no se
+  libera un lugar a tiempo, el intento se rechaza sin calcular el hash.
+
+Los parámetros se leen de variables de entorno (``FCI_LOGIN_*``) al importar
+el módulo. El estado vive en memoria del proceso y se comparte entre sesiones.
+"""
+
+from __future__ import annotations
+
+import contextlib
+import math
+import os
+import threading
+import time
+from collections import OrderedDict
+from typing import Callable, Iterator, Tuple
+
+from metricas import REGISTRO
+
+_RECHAZOS = REGISTRO.contador(
+    "fci_ingresos_limitados_total",
+    "Intentos de ingreso rechazados antes de verificar la contraseña",
+    ("motivo",),
+)
+_EN_CURSO = REGISTRO.indicador(
+    "fci_verificaciones_en_curso", "Verificaciones de contraseña en curso en el proceso"
+)
+
+
+class CuboTokens:
+    """Cubo de ``capacidad`` tokens que se repone a ``por_segundo`` tokens/s."""
+
+    __slots__ = ("capacidad", "por_segundo", "tokens", "actualizado")
+
+    def __init__(self, capacidad: float, por_segundo: float, ahora: float) -> None:
+        self.capacidad = capacidad
+        self.por_segundo = por_segundo
+        self.tokens = capacidad
+        self.actualizado = ahora
+
+    def _reponer(self, ahora: float) -> None:
+        transcurrido = max(0.0, ahora - self.actualizado)
+        self.tokens = min(self.capacidad, self.tokens + transcurrido * self.por_segundo)
+        self.actualizado = ahora
+
+    def espera(self, ahora: float) -> float:
+        """Segundos hasta que haya un token disponible (0 si ya lo hay)."""
+        self._reponer(ahora)
+        if self.tokens >= 1:
+            return 0.0
+        return (1 - self.tokens) / self.por_segundo
+
+    def consumir(self, ahora: float) -> None:
+        self._reponer(ahora)
+        self.tokens -= 1
+
+
+class _Estado:
+    """Cubo de tokens y fallos consecutivos de una clave (usuario o dirección)."""
+
+    __slots__ = ("cubo", "fallos", "bloqueado_hasta")
+
+    def __init__(self, cubo: CuboTokens) -> None:
+        self.cubo = cubo
+        self.fallos = 0
+        self.bloqueado_hasta = 0.0
+
+
+class LimitadorIngresos:
+    """Cubos de tokens y espera exponencial por usuario y por dirección.
+
+    Se guardan como mucho ``max_claves`` claves por tipo; las que llevan más
+    tiempo sin intentos se descartan primero (un flujo de usuarios
+    inexistentes no hace crecer la memoria sin límite).
+    """
+
+    def __init__(
+        self,
+        intentos_usuario: float = 5,
+        segundos_por_intento_usuario: float = 30.0,
+        intentos_direccion: float = 20,
+        segundos_por_intento_direccion: float = 3.0,
+        fallos_antes_de_esperar: int = 3,
+        espera_maxima: float = 300.0,
+        max_claves: int = 10_000,
+        reloj: Callable[[], float] = time.monotonic,
+    ) -> None:
+        self._parametros = {
+            "usuario": (intentos_usuario, 1 / segundos_por_intento_usuario),
+            "direccion": (intentos_direccion, 1 / segundos_por_intento_direccion),
+        }
+        self.fallos_antes_de_esperar = fallos_antes_de_esperar
+        self.espera_maxima = espera_maxima
+        self.max_claves = max_claves
+        self._reloj = reloj
+        self._estados = {tipo: OrderedDict() for tipo in self._parametros}
+        self._lock = threading.Lock()
+
+    @classmethod
+    def desde_entorno(cls) -> "LimitadorIngresos":
+        entorno = os.environ.get
+        return cls(
+            intentos_usuario=float(entorno("FCI_LOGIN_INTENTOS_USUARIO", "5")),
+            segundos_por_intento_usuario=float(entorno("FCI_LOGIN_SEGUNDOS_USUARIO", "30")),
+            intentos_direccion=float(entorno("FCI_LOGIN_INTENTOS_DIRECCION", "20")),
+            segundos_por_intento_direccion=float(entorno("FCI_LOGIN_SEGUNDOS_DIRECCION", "3")),
+            fallos_antes_de_esperar=int(entorno("FCI_LOGIN_FALLOS_ANTES_DE_ESPERAR", "3")),
+            espera_maxima=float(entorno("FCI_LOGIN_ESPERA_MAXIMA", "300")),
+        )
+
+    def _estado(self, tipo: str, clave: str, ahora: float) -> _Estado:
+        estados = self._estados[tipo]
+        estado = estados.get(clave)
+        if estado is None:
+            capacidad, por_segundo = self._parametros[tipo]
+            estado = estados[clave] = _Estado(CuboTokens(capacidad, por_segundo, ahora))
+            while len(estados) > self.max_claves:
+                estados.popitem(last=False)
+        else:
+            estados.move_to_end(clave)
+        return estado
+
+    def _claves(self, usuario: str, direccion: str) -> Tuple[Tuple[str, str], ...]:
+        return (("direccion", direccion), ("usuario", usuario.strip().casefold()))
+
+    def permitir(self, usuario: str, direccion: str) -> float:
+        """Consume un intento; devuelve 0 si se permite o los segundos a esperar.
+
+        Un intento rechazado no consume tokens.
+        """
+        ahora = self._reloj()
+        with self._lock:
+            estados = [(tipo, self._estado(tipo, clave, ahora)) for tipo, clave in self._claves(usuario, direccion)]
+            for tipo, estado in estados:
+                espera = max(estado.bloqueado_hasta - ahora, estado.cubo.espera(ahora))
+                if espera > 0:
+                    _RECHAZOS.incrementar(motivo=tipo)
+                    return espera
+            for _, estado in estados:
+                estado.cubo.consumir(ahora)
+        return 0.0
+
+    def registrar(self, usuario: str, direccion: str, exito: bool) -> None:
+        """Registra el resultado de un intento permitido."""
+        ahora = self._reloj()
+        with self._lock:
+            for tipo, clave in self._claves(usuario, direccion):
+                estado = self._estado(tipo, clave, ahora)
+                if exito:
+                    estado.fallos = 0
+                    estado.bloqueado_hasta = 0.0
+                    continue
+                estado.fallos += 1
+                exceso = estado.fallos - self.fallos_antes_de_esperar
+                if exceso >= 0:
+                    espera = min(self.espera_maxima, 2.0 ** exceso)
+                    estado.bloqueado_hasta = ahora + espera
+
+
+class CupoVerificaciones:
+    """Cantidad máxima de verificaciones de contraseña simultáneas."""
+
+    def __init__(self, maximo: int, espera: float = 2.0) -> None:
+        self.maximo = max(1, maximo)
+        self.espera = espera
+        self._semaforo = threading.BoundedSemaphore(self.maximo)
+
+    @contextlib.contextmanager
+    def reservar(self) -> Iterator[bool]:
+        """Entrega ``True`` si se obtuvo un lugar a tiempo, ``False`` si no."""
+        if not self._semaforo.acquire(timeout=self.espera):
+            _RECHAZOS.incrementar(motivo="ocupado")
+            yield False
+            return
+        _EN_CURSO.sumar(1)
+        try:
+            yield True
+        finally:
+            _EN_CURSO.sumar(-1)
+            self._semaforo.release()
+
+
+def segundos_legibles(segundos: float) -> str:
+    """Espera redondeada hacia arriba, para mostrar al usuario."""
+    segundos = math.ceil(segundos)
+    if segundos < 60:
+        return f"{segundos} s"
+    return f"{math.ceil(segundos / 60)} min"
+
+
+LIMITADOR = LimitadorIngresos.desde_entorno()
+CUPO_VERIFICACIONES = CupoVerificaciones(
+    int(os.environ.get("FCI_LOGIN_CONCURRENCIA", str(os.cpu_count() or 1))),
+    float(os.environ.get("FCI_LOGIN_ESPERA_CUPO", "2")),
+)
+
+
+__all__ = [
+    "CUPO_VERIFICACIONES",
+    "CupoVerificaciones",
+    "CuboTokens",
+    "LIMITADOR",
+    "LimitadorIngresos",
+    "segundos_legibles",
+]
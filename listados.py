@@ -0,0 +1,55 @@
+"""Selección de los primeros N elementos y paginación sin ordenar todo.
+
+Los listados de la consola (clientes, composición, usuarios) pueden tener
+miles de filas. Para mostrar una página solo hace falta conocer los primeros
+``pagina * tamano`` elementos según el criterio elegido: se obtienen con un
+heap (``heapq.nlargest``/``nsmallest``), en O(n log k) en lugar de ordenar la
+lista completa.
+"""
+
+from __future__ import annotations
+
+import heapq
+import math
+from typing import Callable, Iterable, List, Tuple, TypeVar
+
+T = TypeVar("T")
+
+
+def primeros(
+    elementos: Iterable[T],
+    cantidad: int,
+    clave: Callable[[T], object],
+    descendente: bool = True,
+) -> List[T]:
+    """Los ``cantidad`` primeros elementos según ``clave``, ya ordenados."""
+    if cantidad <= 0:
+        return []
+    seleccion = heapq.nlargest if descendente else heapq.nsmallest
+    return seleccion(cantidad, elementos, key=clave)
+
+
+def pagina(
+    elementos: Iterable[T],
+    tamano: int,
+    numero: int,
+    clave: Callable[[T], object],
+    descendente: bool = True,
+) -> List[T]:
+    """Elementos de la página ``numero`` (desde 1) de tamaño ``tamano``."""
+    numero = max(numero, 1)
+    seleccion = primeros(elementos, tamano * numero, clave, descendente)
+    return seleccion[tamano * (numero - 1):]
+
+
+def cantidad_paginas(total: int, tamano: int) -> int:
+    return max(1, math.ceil(total / tamano)) if tamano > 0 else 1
+
+
+def rango_pagina(total: int, tamano: int, numero: int) -> Tuple[int, int]:
+    """Posiciones (desde 1) del primer y último elemento de la página."""
+    inicio = min(tamano * (max(numero, 1) - 1), total)
+    return inicio + 1, min(inicio + tamano, total)
+
+
+__all__ = ["cantidad_paginas", "pagina", "primeros", "rango_pagina"]
@@ -1,15 +1,32 @@
 from __future__ import annotations
 
-import json
 import os
-from typing import Dict, List, Optional, Tuple
+import time
+import uuid
+from datetime import date, datetime
+from typing import TYPE_CHECKING, Dict, List, Optional
 
-import pandas as pd
-import plotly.express as px
 import streamlit as st
-from PIL import Image
 
+from arranque import (
+    importar,
+    iniciar_metricas,
+    iniciar_precalentamiento,
+    obtener_fondo,
+    registrar_sesion,
+    reporte_proceso,
+)
+from exportacion import flujo_movimientos_csv
+from fondo import FondoInversion
+from limites_login import CUPO_VERIFICACIONES, LIMITADOR, segundos_legibles
+from listados import cantidad_paginas, pagina, rango_pagina
+from metricas import REGISTRO
+from pool_fondos import cargar_catalogo, consolidar, fondos_visibles
 from security import verify_password
+from vistas import figura_compartida
+
+if TYPE_CHECKING:
+    from PIL import Image
 
 # Configuración de la página
 st.set_page_config(
@@ -20,207 +37,6 @@ st.set_page_config(
 )
 
 
-class FondoInversion:
-    """Modelo de datos del fondo"""
-
-    def __init__(self, archivo_datos: str = "fondo_datos.json") -> None:
-        self.archivo_datos = archivo_datos
-        self.datos = self.cargar_datos()
-
-    def cargar_datos(self) -> Dict:
-        """Carga los datos desde disco asegurando la estructura básica."""
-        if os.path.exists(self.archivo_datos):
-            try:
-                with open(self.archivo_datos, "r", encoding="utf-8") as f:
-                    datos = json.load(f)
-            except Exception:
-                datos = self.estructura_inicial()
-        else:
-            datos = self.estructura_inicial()
-
-        estructura = self.estructura_inicial()
-        for clave, valor_default in estructura.items():
-            if clave not in datos:
-                datos[clave] = valor_default
-        return datos
-
-    def estructura_inicial(self) -> Dict:
-        return {
-            "clientes": {},
-            "transacciones": [],
-            "balance_diario": [],
-            "valor_cuotaparte": 1000.0,
-            "total_cuotapartes": 0,
-            "composicion_fondo": {},
-            "distribucion_activos": {},
-            "usuarios": {},
-            "tipo_cambio": 0.0,
-        }
-
-    def guardar_datos(self) -> None:
-        with open(self.archivo_datos, "w", encoding="utf-8") as f:
-            json.dump(self.datos, f, indent=2, ensure_ascii=False)
-
-    # ------------------------------------------------------------------
-    # Métodos de consulta de datos
-    # ------------------------------------------------------------------
-
-    def get_usuario(self, username: str) -> Optional[Dict]:
-        return self.datos.get("usuarios", {}).get(username)
-
-    def get_clientes_filtrados(
-        self, clientes_permitidos: Optional[List[str]]
-    ) -> Dict[str, Dict]:
-        clientes = self.datos.get("clientes", {})
-        if clientes_permitidos is None:
-            return dict(clientes)
-        return {
-            nombre: info
-            for nombre, info in clientes.items()
-            if nombre in clientes_permitidos
-        }
-
-    def get_transacciones_filtradas(
-        self, clientes_permitidos: Optional[List[str]]
-    ) -> List[Dict]:
-        transacciones = self.datos.get("transacciones", [])
-        if clientes_permitidos is None:
-            return list(transacciones)
-        return [
-            t for t in transacciones if t.get("cliente") in clientes_permitidos
-        ]
-
-    def get_patrimonio_clientes(
-        self, clientes_permitidos: Optional[List[str]]
-    ) -> Dict[str, Dict]:
-        clientes = self.get_clientes_filtrados(clientes_permitidos)
-        if clientes_permitidos is None:
-            total_para_porcentaje = self.datos.get("total_cuotapartes", 0)
-        else:
-            total_para_porcentaje = sum(
-                datos.get("cuotapartes", 0) for datos in clientes.values()
-            )
-
-        patrimonio: Dict[str, Dict] = {}
-        valor_cuotaparte = self.datos.get("valor_cuotaparte", 0)
-        for nombre, datos in clientes.items():
-            cuotapartes = datos.get("cuotapartes", 0)
-            valor_actual = cuotapartes * valor_cuotaparte
-            porcentaje = (
-                (cuotapartes / total_para_porcentaje * 100)
-                if total_para_porcentaje
-                else 0
-            )
-            patrimonio[nombre] = {
-                "cuotapartes": cuotapartes,
-                "valor_actual": valor_actual,
-                "porcentaje": porcentaje,
-            }
-        return patrimonio
-
-    def get_total_cuotapartes_filtradas(
-        self, clientes_permitidos: Optional[List[str]]
-    ) -> float:
-        if clientes_permitidos is None:
-            return self.datos.get("total_cuotapartes", 0.0)
-        clientes = self.get_clientes_filtrados(clientes_permitidos)
-        return sum(datos.get("cuotapartes", 0.0) for datos in clientes.values())
-
-    def get_balance_diario_df(self) -> pd.DataFrame:
-        df = pd.DataFrame(self.datos.get("balance_diario", []))
-        if df.empty:
-            return df
-        df["fecha"] = pd.to_datetime(df["fecha"], errors="coerce")
-        df = df.dropna(subset=["fecha"]).sort_values("fecha")
-        return df
-
-    def calcular_rendimiento_mensualizado(self) -> Tuple[float, float]:
-        if len(self.datos.get("balance_diario", [])) < 2:
-            return 0.0, 0.0
-
-        df_balance = self.get_balance_diario_df()
-        if df_balance.empty:
-            return 0.0, 0.0
-
-        balance_inicial = df_balance["balance"].iloc[0]
-        balance_actual = df_balance["balance"].iloc[-1]
-        if balance_inicial == 0:
-            return 0.0, 0.0
-
-        fecha_inicial = df_balance["fecha"].iloc[0]
-        fecha_actual = df_balance["fecha"].iloc[-1]
-        dias = (fecha_actual - fecha_inicial).days
-        if dias <= 0:
-            return 0.0, 0.0
-
-        rendimiento_total = ((balance_actual - balance_inicial) / balance_inicial) * 100
-        if dias >= 30:
-            rendimiento_mensual = (
-                (pow(balance_actual / balance_inicial, 30 / dias) - 1) * 100
-            )
-        else:
-            rendimiento_mensual = (rendimiento_total / dias) * 30
-
-        return rendimiento_total, rendimiento_mensual
-
-    def get_balance_total_filtrado(
-        self, clientes_permitidos: Optional[List[str]]
-    ) -> float:
-        patrimonio = self.get_patrimonio_clientes(clientes_permitidos)
-        return sum(info["valor_actual"] for info in patrimonio.values())
-
-    def get_tipo_cambio(self) -> float:
-        tipo_cambio = self.datos.get("tipo_cambio", 0.0)
-        try:
-            tipo_cambio_float = float(tipo_cambio)
-        except (TypeError, ValueError):
-            return 0.0
-        return tipo_cambio_float if tipo_cambio_float > 0 else 0.0
-
-    def get_composicion_detallada(self) -> List[Dict]:
-        composicion = self.datos.get("composicion_fondo", {})
-        tipo_cambio = self.get_tipo_cambio()
-        detalle: List[Dict] = []
-
-        for instrumento, datos in composicion.items():
-            moneda = str(datos.get("moneda", "ARS")).upper()
-            monto_pesos = float(datos.get("monto", 0.0) or 0.0)
-            monto_moneda = datos.get("monto_moneda")
-            if monto_moneda is None:
-                monto_moneda = datos.get("monto_original")
-
-            if moneda == "ARS":
-                if monto_moneda is None:
-                    monto_moneda = monto_pesos
-            elif moneda == "USD":
-                if monto_moneda is None and tipo_cambio:
-                    monto_moneda = monto_pesos / tipo_cambio
-                if monto_moneda is not None and tipo_cambio:
-                    monto_pesos = float(monto_moneda) * tipo_cambio
-            else:
-                if monto_moneda is None:
-                    monto_moneda = monto_pesos
-
-            detalle.append(
-                {
-                    "Instrumento": instrumento,
-                    "Moneda": moneda,
-                    "Monto_moneda": float(monto_moneda)
-                    if monto_moneda is not None
-                    else None,
-                    "Monto_ARS": monto_pesos,
-                }
-            )
-
-        total_en_pesos = sum(item["Monto_ARS"] for item in detalle)
-        for item in detalle:
-            item["Porcentaje"] = (
-                (item["Monto_ARS"] / total_en_pesos * 100) if total_en_pesos else 0.0
-            )
-
-        return detalle
-
-
 # ----------------------------------------------------------------------
 # Utilidades de interfaz
 # ----------------------------------------------------------------------
@@ -230,7 +46,7 @@ def cargar_logo() -> Optional[Image.Image]:
     logo_path = "Andes.png"
     if os.path.exists(logo_path):
         try:
-            return Image.open(logo_path)
+            return importar("PIL.Image").open(logo_path)
         except Exception:
             return None
     return None
@@ -270,6 +86,19 @@ def aplicar_estilos() -> None:
     )
 
 
+DURACION_LOGIN = REGISTRO.histograma(
+    "fci_login_segundos", "Duración de cada intento de ingreso al panel", ("resultado",)
+)
+
+
+def direccion_cliente() -> str:
+    """Dirección del navegador que hace el pedido ("local" si no se conoce)."""
+    try:
+        return st.context.ip_address or "local"
+    except Exception:
+        return "local"
+
+
 def verificar_autenticacion(fondo: FondoInversion) -> bool:
     if "authenticated" not in st.session_state:
         st.session_state.authenticated = False
@@ -304,10 +133,30 @@ def verificar_autenticacion(fondo: FondoInversion) -> bool:
         submitted = st.form_submit_button("Ingresar")
 
         if submitted:
-            datos_usuario = fondo.get_usuario(usuario)
-            if datos_usuario and verify_password(
-                password, datos_usuario.get("salt", ""), datos_usuario.get("password_hash", "")
-            ):
+            direccion = direccion_cliente()
+            valido = False
+            espera = LIMITADOR.permitir(usuario, direccion)
+            if espera:
+                st.error(
+                    "⏳ Demasiados intentos de ingreso. "
+                    f"Vuelve a intentar en {segundos_legibles(espera)}."
+                )
+                st.stop()
+            with CUPO_VERIFICACIONES.reservar() as habilitado:
+                if not habilitado:
+                    st.error("⏳ El servidor está ocupado. Intenta de nuevo en unos segundos.")
+                    st.stop()
+                inicio = time.perf_counter()
+                # Un usuario inexistente cuesta lo mismo que uno real (ver security).
+                datos_usuario = fondo.get_usuario(usuario) or {}
+                valido = verify_password(
+                    password, datos_usuario.get("salt", ""), datos_usuario.get("password_hash", "")
+                )
+                DURACION_LOGIN.observar(
+                    time.perf_counter() - inicio, resultado="ok" if valido else "rechazado"
+                )
+            LIMITADOR.registrar(usuario, direccion, valido)
+            if valido:
                 st.session_state.authenticated = True
                 st.session_state.usuario = usuario
                 rol = datos_usuario.get("rol", "cliente")
@@ -335,26 +184,157 @@ def mostrar_logout(fondo: FondoInversion) -> None:
             "Esta es una vista de solo lectura. Todas las modificaciones deben realizarse desde `admin_console.py`."
         )
         if st.button("🚪 Cerrar sesión", use_container_width=True):
-            for key in ["authenticated", "usuario", "rol", "clientes_permitidos"]:
+            for key in ["authenticated", "usuario", "rol", "clientes_permitidos", "fondo_id"]:
                 st.session_state.pop(key, None)
             st.rerun()
 
 
+def mostrar_perfilado() -> None:
+    """Tiempos de arranque del proceso, visibles solo para administradores."""
+    if st.session_state.get("rol") != "admin":
+        return
+    reporte = reporte_proceso()
+    with st.sidebar.expander("⏱️ Rendimiento"):
+        st.caption("Importaciones diferidas (primera carga en el proceso)")
+        for modulo, segundos in reporte["importaciones"].items():
+            st.write(f"`{modulo}`: {segundos * 1000:,.1f} ms")
+        pool = reporte["pool_fondos"]
+        st.caption("Pool de fondos cargados")
+        st.write(
+            f"{pool['cargados']}/{pool['capacidad']} en memoria · "
+            f"{pool['aciertos']} aciertos · {pool['cargas']} cargas · "
+            f"{pool['desalojos']} desalojos"
+        )
+        for clave, titulo in (
+            ("cache_vistas", "Vistas compartidas entre sesiones"),
+            ("cache_figuras", "Figuras compartidas entre sesiones"),
+        ):
+            cache = reporte[clave]
+            st.caption(titulo)
+            st.write(
+                f"{cache['tasa_aciertos']:.0%} aciertos · {cache['aciertos']} / "
+                f"{cache['fallos']} fallos · {cache['entradas']}/{cache['capacidad']} "
+                f"entradas · {cache['desalojos']} desalojos"
+            )
+        if reporte["precalentamiento"]:
+            st.caption("Precalentamiento al iniciar el servidor")
+            for etapa, segundos in reporte["precalentamiento"].items():
+                st.write(f"{etapa}: {segundos * 1000:,.1f} ms")
+
+
+OPCION_CONSOLIDADO = "__consolidado__"
+# Clientes con porción propia en la torta (el resto se agrupa en "Otros"),
+# rangos del histograma de tenencias y tarjetas por página en el Resumen.
+CLIENTES_TORTA = int(os.environ.get("FCI_CLIENTES_TORTA", "10"))
+BALDES_HISTOGRAMA = int(os.environ.get("FCI_BALDES_HISTOGRAMA", "20"))
+CLIENTES_POR_PAGINA = 10
+
+
+def seleccionar_fondo(catalogo: Dict, visibles: List[str]) -> str:
+    """Selector de fondo en la barra lateral según los fondos visibles del usuario."""
+    if not visibles:
+        st.warning("Tu usuario no tiene fondos asignados. Consulta al administrador.")
+        st.stop()
+
+    opciones = list(visibles)
+    if st.session_state.get("rol") == "admin" and len(visibles) > 1:
+        opciones.append(OPCION_CONSOLIDADO)
+    if len(opciones) == 1:
+        return opciones[0]
+
+    def etiqueta(fondo_id: str) -> str:
+        if fondo_id == OPCION_CONSOLIDADO:
+            return "📊 Consolidado"
+        return catalogo["fondos"][fondo_id]["nombre"]
+
+    with st.sidebar:
+        return st.selectbox("🏦 Fondo", opciones, format_func=etiqueta, key="fondo_id")
+
+
+def mostrar_consolidado(catalogo: Dict, fondo_ids: List[str]) -> None:
+    """Vista de administrador con el patrimonio agregado de todos los fondos."""
+    fondos = {
+        fondo_id: obtener_fondo(catalogo["fondos"][fondo_id]["archivo"])
+        for fondo_id in fondo_ids
+    }
+    nombres = {fondo_id: info["nombre"] for fondo_id, info in catalogo["fondos"].items()}
+    consolidado = consolidar(fondos, nombres)
+
+    st.subheader("Vista consolidada")
+    col1, col2, col3 = st.columns(3)
+    with col1:
+        st.metric("Patrimonio total (ARS)", f"${consolidado['total_ars']:,.2f}")
+    with col2:
+        total_usd = consolidado["total_usd"]
+        st.metric("Patrimonio total (USD)", f"US$ {total_usd:,.2f}" if total_usd is not None else "—")
+    with col3:
+        st.metric("Fondos", str(len(fondos)))
+
+    df_fondos = pd.DataFrame(consolidado["por_fondo"]).rename(
+        columns={
+            "nombre": "Fondo",
+            "clientes": "Clientes",
+            "cuotapartes": "Cuotapartes",
+            "valor_cuotaparte": "Valor cuotaparte",
+            "valor_actual": "Valor actual",
+            "valor_usd": "Valor actual (USD)",
+        }
+    )
+    st.dataframe(
+        df_fondos.drop(columns=["fondo"]).style.format(
+            {
+                "Cuotapartes": "{:,.4f}",
+                "Valor cuotaparte": "${:,.2f}",
+                "Valor actual": "${:,.2f}",
+                "Valor actual (USD)": "US$ {:,.2f}",
+            },
+            na_rep="—",
+        ),
+        use_container_width=True,
+    )
+
+    if consolidado["por_cliente"]:
+        st.subheader("Clientes en todos los fondos")
+        df_clientes = pd.DataFrame(
+            [
+                {"Cliente": nombre, "Fondos": info["fondos"], "Valor actual": info["valor_actual"]}
+                for nombre, info in consolidado["por_cliente"].items()
+            ]
+        ).sort_values("Valor actual", ascending=False)
+        st.dataframe(
+            df_clientes.style.format({"Valor actual": "${:,.2f}"}),
+            use_container_width=True,
+        )
+
+
 # ----------------------------------------------------------------------
 # Inicio de la aplicación
 # ----------------------------------------------------------------------
 
 aplicar_estilos()
+iniciar_precalentamiento()
+iniciar_metricas()
 
-if "fondo" not in st.session_state:
-    st.session_state.fondo = FondoInversion()
-
-fondo: FondoInversion = st.session_state.fondo
+catalogo = cargar_catalogo()
+# Las credenciales del panel viven en el fondo principal del catálogo.
+fondo_usuarios = obtener_fondo(catalogo["fondos"][catalogo["principal"]]["archivo"])
 
-if not verificar_autenticacion(fondo):
+if not verificar_autenticacion(fondo_usuarios):
     st.stop()
 
-mostrar_logout(fondo)
+registrar_sesion(st.session_state.setdefault("id_sesion", uuid.uuid4().hex))
+
+# A partir de aquí hay un usuario autenticado: recién ahora se pagan las
+# importaciones pesadas que el formulario de ingreso no necesita.
+pd = importar("pandas")
+px = importar("plotly.express")
+
+mostrar_logout(fondo_usuarios)
+fondos_usuario = fondos_visibles(
+    fondo_usuarios.get_usuario(st.session_state.usuario), catalogo
+)
+fondo_id = seleccionar_fondo(catalogo, fondos_usuario)
+mostrar_perfilado()
 
 logo = cargar_logo()
 
@@ -377,40 +357,37 @@ else:
     )
 st.markdown("</div>", unsafe_allow_html=True)
 
-clientes_permitidos = st.session_state.get("clientes_permitidos")
-patrimonio_clientes = fondo.get_patrimonio_clientes(clientes_permitidos)
-transacciones_filtradas = fondo.get_transacciones_filtradas(clientes_permitidos)
+if fondo_id == OPCION_CONSOLIDADO:
+    mostrar_consolidado(catalogo, fondos_usuario)
+    st.stop()
 
-balance_total = fondo.get_balance_total_filtrado(clientes_permitidos)
-valor_cuotaparte = fondo.datos.get("valor_cuotaparte", 0.0)
-tipo_cambio = fondo.get_tipo_cambio()
-valor_total_usd = (balance_total / tipo_cambio) if tipo_cambio else None
+fondo: FondoInversion = obtener_fondo(catalogo["fondos"][fondo_id]["archivo"])
 
-clientes_filtrados = fondo.get_clientes_filtrados(clientes_permitidos)
-numero_clientes = len(clientes_filtrados)
+clientes_permitidos = st.session_state.get("clientes_permitidos")
+vista = fondo.get_vista(clientes_permitidos)
+patrimonio_clientes = vista.patrimonio
 
-cuotapartes_totales = fondo.get_total_cuotapartes_filtradas(clientes_permitidos)
 rendimiento_total, rendimiento_mensual = fondo.calcular_rendimiento_mensualizado()
 
 col1, col2, col3, col4, col5, col6 = st.columns(6)
 with col1:
-    st.metric("Valor actual (ARS)", f"${balance_total:,.2f}")
+    st.metric("Valor actual (ARS)", f"${vista.balance_total:,.2f}")
 with col2:
-    if valor_total_usd is not None:
-        st.metric("Valor actual (USD)", f"US$ {valor_total_usd:,.2f}")
+    if vista.balance_total_usd is not None:
+        st.metric("Valor actual (USD)", f"US$ {vista.balance_total_usd:,.2f}")
     else:
         st.metric("Valor actual (USD)", "—")
 with col3:
-    if tipo_cambio:
-        st.metric("Tipo de cambio (ARS/USD)", f"${tipo_cambio:,.2f}")
+    if vista.tipo_cambio:
+        st.metric("Tipo de cambio (ARS/USD)", f"${vista.tipo_cambio:,.2f}")
     else:
         st.metric("Tipo de cambio (ARS/USD)", "—")
 with col4:
-    st.metric("Clientes visibles", str(numero_clientes))
+    st.metric("Clientes visibles", str(vista.numero_clientes))
 with col5:
-    st.metric("Cuotapartes", f"{cuotapartes_totales:,.4f}")
+    st.metric("Cuotapartes", f"{vista.total_cuotapartes:,.4f}")
 with col6:
-    st.metric("Valor de cuotaparte", f"${valor_cuotaparte:,.2f}")
+    st.metric("Valor de cuotaparte", f"${vista.valor_cuotaparte:,.2f}")
 
 col_r1, col_r2, col_r3 = st.columns([1, 2, 1])
 with col_r2:
@@ -427,7 +404,7 @@ with col_r2:
         unsafe_allow_html=True,
     )
 
-if clientes_permitidos is not None and not clientes_filtrados:
+if vista.filtrado and not vista.numero_clientes:
     st.warning(
         "Tu usuario no tiene clientes asociados actualmente. Consulta al administrador si necesitas acceso."
     )
@@ -444,32 +421,182 @@ with tab_resumen:
         unsafe_allow_html=True,
     )
 
-    df_balance = fondo.get_balance_diario_df()
-    if not df_balance.empty:
-        fig_balance = px.line(
+    monedas_disponibles = fondo.get_monedas()
+    moneda_vista = "ARS"
+    if len(monedas_disponibles) > 1:
+        moneda_vista = st.radio(
+            "Moneda de los gráficos",
+            monedas_disponibles,
+            horizontal=True,
+            key="moneda_vista",
+            help="Cada fecha se convierte con la cotización vigente ese día.",
+        )
+
+    def figura_balance():
+        df_balance = fondo.get_serie_fondo(moneda_vista)
+        if df_balance.empty:
+            return None
+        figura = px.line(
             df_balance,
             x="fecha",
-            y="balance",
-            title="Evolución del balance del fondo",
+            y="valor",
+            title=f"Evolución del balance del fondo ({moneda_vista})",
             markers=True,
+            labels={"valor": f"Balance ({moneda_vista})", "fecha": "Fecha"},
         )
-        fig_balance.update_layout(margin=dict(l=10, r=10, t=50, b=10))
+        figura.update_layout(margin=dict(l=10, r=10, t=50, b=10))
+        return figura
+
+    fig_balance = figura_compartida(fondo, None, "balance", figura_balance, moneda_vista)
+    if fig_balance is not None:
         st.plotly_chart(fig_balance, use_container_width=True)
     else:
         st.info("No hay registros de balance diario disponibles.")
 
+    def figura_serie_clientes():
+        # Con muchos clientes solo se grafican los de mayor patrimonio.
+        clientes_serie = vista.principales(10)
+        df_serie_clientes = fondo.get_serie_clientes(clientes_serie, moneda_vista)
+        if df_serie_clientes.empty:
+            return None
+        figura = px.line(
+            df_serie_clientes,
+            x="fecha",
+            y="valor",
+            color="cliente",
+            title=f"Evolución por cliente ({moneda_vista})",
+            markers=True,
+            labels={"valor": f"Valor ({moneda_vista})", "fecha": "Fecha", "cliente": "Cliente"},
+        )
+        figura.update_layout(margin=dict(l=10, r=10, t=50, b=10))
+        return figura
+
+    if patrimonio_clientes:
+        fig_serie_clientes = figura_compartida(
+            fondo, clientes_permitidos, "serie_clientes", figura_serie_clientes, moneda_vista
+        )
+        if fig_serie_clientes is not None:
+            st.plotly_chart(fig_serie_clientes, use_container_width=True)
+
+    st.subheader("Proyección")
+    opcion_total = "Total del fondo" if not vista.filtrado else "Total de mis clientes"
+    col_horizonte, col_sujeto = st.columns([1, 2])
+    with col_horizonte:
+        meses_proyeccion = st.radio(
+            "Horizonte",
+            [6, 12],
+            index=1,
+            horizontal=True,
+            format_func=lambda meses: f"{meses} meses",
+            key="meses_proyeccion",
+        )
+    with col_sujeto:
+        col_filtro, col_seleccion = st.columns(2)
+        with col_filtro:
+            filtro_proyeccion = st.text_input("Filtrar clientes", key="filtro_proyeccion")
+        # El filtro reemplaza a un tope de clientes: cualquier cliente
+        # permitido se puede proyectar buscándolo por nombre.
+        candidatos = vista.buscar(filtro_proyeccion)
+        candidatos.sort(key=lambda nombre: vista.patrimonio[nombre]["valor_actual"], reverse=True)
+        with col_seleccion:
+            sujeto_proyeccion = st.selectbox(
+                "Proyectar",
+                [opcion_total] + candidatos,
+                key="sujeto_proyeccion",
+            )
+    proyeccion = fondo.get_proyeccion(meses_proyeccion)
+
+    def figura_proyeccion():
+        from proyeccion import fechas_proyeccion
+
+        go = importar("plotly.graph_objects")
+        if sujeto_proyeccion == opcion_total:
+            valor_inicial = vista.balance_total
+        else:
+            valor_inicial = vista.patrimonio[sujeto_proyeccion]["valor_actual"]
+        fechas = pd.to_datetime(fechas_proyeccion(datetime.now().date(), proyeccion["dias"]))
+        bandas = dict(zip(proyeccion["percentiles"], proyeccion["bandas"] * valor_inicial))
+        figura = go.Figure()
+        for inferior, superior, opacidad in ((5, 95, 0.15), (25, 75, 0.3)):
+            figura.add_trace(
+                go.Scatter(x=fechas, y=bandas[superior], line=dict(width=0), showlegend=False,
+                           hoverinfo="skip")
+            )
+            figura.add_trace(
+                go.Scatter(
+                    x=fechas,
+                    y=bandas[inferior],
+                    fill="tonexty",
+                    fillcolor=f"rgba(102, 126, 234, {opacidad})",
+                    line=dict(width=0),
+                    name=f"P{inferior}–P{superior}",
+                )
+            )
+        figura.add_trace(
+            go.Scatter(x=fechas, y=bandas[50], line=dict(color="#764ba2", width=2), name="Mediana")
+        )
+        figura.update_layout(
+            title=f"Proyección a {meses_proyeccion} meses: {sujeto_proyeccion} (ARS)",
+            yaxis_title="Valor (ARS)",
+            margin=dict(l=10, r=10, t=50, b=10),
+        )
+        return figura
+
+    if proyeccion is None:
+        st.info("El historial de balances todavía no alcanza para proyectar.")
+    else:
+        fig_proyeccion = figura_compartida(
+            fondo,
+            clientes_permitidos,
+            "proyeccion",
+            figura_proyeccion,
+            meses_proyeccion,
+            sujeto_proyeccion,
+        )
+        st.plotly_chart(fig_proyeccion, use_container_width=True)
+        st.caption(
+            f"{proyeccion['caminos']:,} escenarios simulados a partir de "
+            f"{proyeccion['observaciones']} rendimientos diarios del valor de cuotaparte "
+            f"({'remuestreo histórico' if proyeccion['metodo'] == 'bootstrap' else 'ajuste normal'}). "
+            "Supone que no hay nuevas suscripciones ni rescates; no es una garantía de resultados."
+        )
+
     if patrimonio_clientes:
         st.subheader("Detalle por cliente")
-        for nombre, info in patrimonio_clientes.items():
+        col_busqueda, col_pagina = st.columns([3, 1])
+        with col_busqueda:
+            busqueda = st.text_input("Buscar cliente", key="buscar_cliente")
+        encontrados = vista.buscar(busqueda)
+        paginas = cantidad_paginas(len(encontrados), CLIENTES_POR_PAGINA)
+        with col_pagina:
+            numero_pagina = st.number_input(
+                "Página", min_value=1, max_value=paginas, value=1, step=1, key="pagina_clientes"
+            )
+        numero_pagina = min(int(numero_pagina), paginas)
+        clientes_pagina = pagina(
+            encontrados,
+            CLIENTES_POR_PAGINA,
+            numero_pagina,
+            clave=lambda nombre: patrimonio_clientes[nombre]["valor_actual"],
+        )
+        if encontrados:
+            desde_cliente, hasta_cliente = rango_pagina(len(encontrados), CLIENTES_POR_PAGINA, numero_pagina)
+            st.caption(
+                f"Clientes {desde_cliente}–{hasta_cliente} de {len(encontrados):,}, "
+                "ordenados por valor actual."
+            )
+        else:
+            st.info("Ningún cliente coincide con la búsqueda.")
+        for nombre in clientes_pagina:
+            info = patrimonio_clientes[nombre]
             st.markdown(f"#### {nombre}")
             col_a, col_b, col_c = st.columns(3)
             with col_a:
                 st.metric("Cuotapartes", f"{info['cuotapartes']:,.4f}")
             with col_b:
                 st.metric("Valor actual (ARS)", f"${info['valor_actual']:,.2f}")
-                if tipo_cambio:
-                    valor_usd_cliente = info["valor_actual"] / tipo_cambio
-                    st.caption(f"Equivalente: US$ {valor_usd_cliente:,.2f}")
+                if info["valor_usd"] is not None:
+                    st.caption(f"Equivalente: US$ {info['valor_usd']:,.2f}")
             with col_c:
                 st.metric("Participación", f"{info['porcentaje']:.2f}%")
     else:
@@ -484,15 +611,14 @@ with tab_clientes:
                     "Cliente": nombre,
                     "Cuotapartes": datos["cuotapartes"],
                     "Valor actual": datos["valor_actual"],
+                    "Valor actual (USD)": datos["valor_usd"],
                     "Participación (%)": datos["porcentaje"],
                 }
                 for nombre, datos in patrimonio_clientes.items()
             ]
         )
-        if tipo_cambio:
-            df_clientes["Valor actual (USD)"] = (
-                df_clientes["Valor actual"] / tipo_cambio
-            )
+        if not vista.tipo_cambio:
+            df_clientes = df_clientes.drop(columns=["Valor actual (USD)"])
         df_clientes = df_clientes.sort_values("Valor actual", ascending=False)
         columnas = ["Cliente", "Cuotapartes", "Valor actual"]
         if "Valor actual (USD)" in df_clientes.columns:
@@ -516,30 +642,70 @@ with tab_clientes:
 with tab_graficos:
     st.subheader("Visualizaciones")
 
-    df_clientes_plot = pd.DataFrame(
-        [
-            {"Cliente": nombre, "Valor actual": datos["valor_actual"]}
-            for nombre, datos in patrimonio_clientes.items()
-        ]
-    )
-
-    if not df_clientes_plot.empty:
-        fig_pie = px.pie(
+    def figura_distribucion_clientes(cantidad: int):
+        df_clientes_plot = pd.DataFrame(
+            vista.distribucion(cantidad), columns=["Cliente", "Valor actual"]
+        )
+        figura = px.pie(
             df_clientes_plot,
             names="Cliente",
             values="Valor actual",
             title="Distribución por cliente",
         )
-        fig_pie.update_traces(textposition="inside", textinfo="percent+label")
+        figura.update_traces(textposition="inside", textinfo="percent+label")
+        return figura
+
+    def figura_histograma_tenencias(baldes: int):
+        go = importar("plotly.graph_objects")
+        conteos, bordes = vista.histograma(baldes)
+        figura = go.Figure(
+            go.Bar(
+                x=(bordes[:-1] + bordes[1:]) / 2,
+                y=conteos,
+                width=bordes[1:] - bordes[:-1],
+                customdata=list(zip(bordes[:-1], bordes[1:])),
+                hovertemplate="$%{customdata[0]:,.0f} – $%{customdata[1]:,.0f}<br>%{y} clientes<extra></extra>",
+                marker_color="#667eea",
+            )
+        )
+        figura.update_layout(
+            title="Clientes por valor de tenencia",
+            xaxis_title="Valor actual (ARS)",
+            yaxis_title="Clientes",
+            bargap=0.05,
+        )
+        return figura
+
+    if patrimonio_clientes:
+        fig_pie = figura_compartida(
+            fondo,
+            clientes_permitidos,
+            "distribucion_clientes",
+            lambda: figura_distribucion_clientes(CLIENTES_TORTA),
+            CLIENTES_TORTA,
+        )
         st.plotly_chart(fig_pie, use_container_width=True)
+        if vista.numero_clientes > CLIENTES_TORTA:
+            fig_histograma = figura_compartida(
+                fondo,
+                clientes_permitidos,
+                "histograma_tenencias",
+                lambda: figura_histograma_tenencias(BALDES_HISTOGRAMA),
+                BALDES_HISTOGRAMA,
+            )
+            st.plotly_chart(fig_histograma, use_container_width=True)
     else:
         st.info("No hay datos suficientes para generar gráficos de clientes.")
 
-    df_transacciones = pd.DataFrame(transacciones_filtradas)
-    if not df_transacciones.empty:
+    def figura_movimientos():
+        # Solo aquí (y en el historial) se leen las transacciones del archivo.
+        transacciones = fondo.get_transacciones_filtradas(clientes_permitidos)
+        if not transacciones:
+            return None
+        df_transacciones = pd.DataFrame(transacciones)
         df_transacciones["fecha"] = pd.to_datetime(df_transacciones["fecha"], errors="coerce")
         df_transacciones = df_transacciones.dropna(subset=["fecha"]).sort_values("fecha")
-        fig_mov = px.bar(
+        figura = px.bar(
             df_transacciones,
             x="fecha",
             y="monto",
@@ -547,13 +713,44 @@ with tab_graficos:
             title="Movimientos registrados",
             labels={"monto": "Monto", "fecha": "Fecha", "tipo": "Tipo"},
         )
-        fig_mov.update_layout(margin=dict(l=10, r=10, t=50, b=10))
+        figura.update_layout(margin=dict(l=10, r=10, t=50, b=10))
+        return figura
+
+    fig_mov = figura_compartida(
+        fondo, clientes_permitidos, "movimientos", figura_movimientos
+    )
+    if fig_mov is not None:
         st.plotly_chart(fig_mov, use_container_width=True)
     else:
         st.info("No se registran transacciones para este usuario.")
 
 with tab_historial:
     st.subheader("Historial de movimientos")
+    corte_archivo = fondo.get_corte_archivo()
+    desde_historial = None
+    if corte_archivo:
+        # Los segmentos archivados se abren solo si se pide una fecha anterior al corte.
+        desde_historial = st.date_input(
+            "Desde",
+            value=date.fromisoformat(corte_archivo),
+            key="historial_desde",
+            help="Los movimientos anteriores a esta fecha están archivados; "
+            "si eliges una fecha previa se incluyen (la consulta tarda un poco más).",
+        ).isoformat()
+    transacciones_filtradas = fondo.get_transacciones_filtradas(
+        clientes_permitidos, desde_historial
+    )
+    if transacciones_filtradas:
+        # El CSV se genera recién al pulsar el botón, por bloques y sin formatear;
+        # Streamlit igual lo junta en un único bytes antes de enviarlo.
+        st.download_button(
+            "⬇️ Descargar movimientos (CSV)",
+            data=lambda: flujo_movimientos_csv(transacciones_filtradas, clientes_permitidos),
+            file_name=f"movimientos_{fondo_id}_{datetime.now():%Y%m%d}.csv",
+            mime="text/csv",
+            on_click="ignore",
+            key="descargar_movimientos",
+        )
     df_historial = pd.DataFrame(transacciones_filtradas)
     if not df_historial.empty:
         df_historial["fecha"] = pd.to_datetime(df_historial["fecha"], errors="coerce")
@@ -602,39 +799,102 @@ with tab_composicion:
             use_container_width=True,
         )
 
-        if tipo_cambio == 0 and (df_composicion["Moneda"] == "USD").any():
+        if vista.tipo_cambio == 0 and (df_composicion["Moneda"] == "USD").any():
             st.warning(
                 "Carga un tipo de cambio para valorizar correctamente las posiciones en USD."
             )
 
-        fig_comp = px.pie(
-            df_composicion,
-            names="Instrumento",
-            values="Monto_ARS",
-            title="Participación por instrumento",
-        )
-        fig_comp.update_layout(margin=dict(l=10, r=10, t=50, b=10))
+        def figura_composicion():
+            figura = px.pie(
+                df_composicion,
+                names="Instrumento",
+                values="Monto_ARS",
+                title="Participación por instrumento",
+            )
+            figura.update_layout(margin=dict(l=10, r=10, t=50, b=10))
+            return figura
+
+        fig_comp = figura_compartida(fondo, None, "composicion", figura_composicion)
         st.plotly_chart(fig_comp, use_container_width=True)
     else:
         st.info("Todavía no se cargó la composición del fondo.")
 
+    fechas_composicion = fondo.get_fechas_composicion()
+    if len(fechas_composicion) >= 2:
+        st.subheader("Comparar composición entre fechas")
+        col_fa, col_fb, col_tc = st.columns(3)
+        with col_fa:
+            fecha_a = st.selectbox(
+                "Fecha inicial",
+                fechas_composicion,
+                index=len(fechas_composicion) - 2,
+                key="composicion_fecha_a",
+            )
+        with col_fb:
+            fecha_b = st.selectbox(
+                "Fecha final",
+                fechas_composicion,
+                index=len(fechas_composicion) - 1,
+                key="composicion_fecha_b",
+            )
+        with col_tc:
+            revaluar_actual = st.checkbox(
+                "Valuar ambas fechas al tipo de cambio actual",
+                key="composicion_tc_actual",
+            )
+
+        comparacion = fondo.comparar_composicion(fecha_a, fecha_b, revaluar_actual)
+        if comparacion:
+            df_comparacion = pd.DataFrame(comparacion).rename(
+                columns={
+                    "Monto_A": f"Monto {fecha_a}",
+                    "Porcentaje_A": f"% {fecha_a}",
+                    "Monto_B": f"Monto {fecha_b}",
+                    "Porcentaje_B": f"% {fecha_b}",
+                    "Variacion": "Variación (ARS)",
+                }
+            )
+            st.dataframe(
+                df_comparacion.style.format(
+                    {
+                        f"Monto {fecha_a}": "${:,.2f}",
+                        f"% {fecha_a}": "{:.2f}%",
+                        f"Monto {fecha_b}": "${:,.2f}",
+                        f"% {fecha_b}": "{:.2f}%",
+                        "Variación (ARS)": "${:+,.2f}",
+                    }
+                ),
+                use_container_width=True,
+            )
+    elif fechas_composicion:
+        st.caption(
+            "El historial de composición tiene una sola fecha. La comparación estará disponible con la próxima actualización."
+        )
+
     distribucion = fondo.datos.get("distribucion_activos", {})
     if distribucion:
         st.subheader("Distribución de activos")
-        df_distribucion = pd.DataFrame(
-            [
-                {"Activo": activo, "Porcentaje": valor}
-                for activo, valor in distribucion.items()
-            ]
-        )
-        fig_dist = px.bar(
-            df_distribucion,
-            x="Activo",
-            y="Porcentaje",
-            title="Distribución por tipo de activo",
-            labels={"Porcentaje": "%"},
+
+        def figura_distribucion_activos():
+            df_distribucion = pd.DataFrame(
+                [
+                    {"Activo": activo, "Porcentaje": valor}
+                    for activo, valor in distribucion.items()
+                ]
+            )
+            figura = px.bar(
+                df_distribucion,
+                x="Activo",
+                y="Porcentaje",
+                title="Distribución por tipo de activo",
+                labels={"Porcentaje": "%"},
+            )
+            figura.update_layout(margin=dict(l=10, r=10, t=50, b=10))
+            return figura
+
+        fig_dist = figura_compartida(
+            fondo, None, "distribucion_activos", figura_distribucion_activos
         )
-        fig_dist.update_layout(margin=dict(l=10, r=10, t=50, b=10))
         st.plotly_chart(fig_dist, use_container_width=True)
     else:
         st.caption("Carga la distribución de activos desde la consola para verla aquí.")
@@ -0,0 +1,327 @@
+"""Métricas operativas en formato de texto de Prometheus.
+
+Registro en memoria de contadores, indicadores (gauges) e histogramas de
+latencia, sin dependencias externas. Cada proceso tiene su registro
+(``REGISTRO``) y lo publica de una de dos formas:
+
+* el panel, con ``FCI_METRICAS_PUERTO``, sirve ``/metrics`` por HTTP en un
+  hilo propio (:func:`iniciar_servidor`);
+* la consola escribe un archivo al terminar (``--metricas`` o
+  ``FCI_METRICAS_ARCHIVO``), pensado para el *textfile collector* de
+  node_exporter.
+
+Las métricas se declaran a nivel de módulo con ``REGISTRO.contador(...)``,
+``REGISTRO.indicador(...)`` o ``REGISTRO.histograma(...)``; declarar dos veces
+el mismo nombre devuelve la misma métrica, así que es seguro hacerlo en
+scripts que se vuelven a ejecutar (como ``main.py`` en cada rerun).
+"""
+
+from __future__ import annotations
+
+import contextlib
+import math
+import os
+import tempfile
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Callable, Dict, Iterator, List, Optional, Sequence, Tuple
+
+LIMITES_LATENCIA: Tuple[float, ...] = (
+    0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0,
+)
+TIPO_CONTENIDO = "text/plain; version=0.0.4; charset=utf-8"
+
+
+def _escapar(valor: str) -> str:
+    return valor.replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _numero(valor: float) -> str:
+    if math.isinf(valor):
+        return "+Inf" if valor > 0 else "-Inf"
+    if math.isnan(valor):
+        return "NaN"
+    return repr(float(valor))
+
+
+def _etiquetas(nombres: Sequence[str], valores: Sequence[str], extra: str = "") -> str:
+    partes = [f'{n}="{_escapar(v)}"' for n, v in zip(nombres, valores)]
+    if extra:
+        partes.append(extra)
+    return "{" + ",".join(partes) + "}" if partes else ""
+
+
+class Metrica:
+    """Familia de series con el mismo nombre, distinguidas por etiquetas."""
+
+    tipo = "untyped"
+
+    def __init__(self, nombre: str, ayuda: str, etiquetas: Sequence[str] = ()) -> None:
+        self.nombre = nombre
+        self.ayuda = ayuda
+        self.etiquetas = tuple(etiquetas)
+        self._lock = threading.Lock()
+
+    def _clave(self, valores: Dict[str, object]) -> Tuple[str, ...]:
+        if set(valores) != set(self.etiquetas):
+            raise ValueError(
+                f"{self.nombre} requiere las etiquetas {self.etiquetas}, no {tuple(valores)}"
+            )
+        return tuple(str(valores[n]) for n in self.etiquetas)
+
+    def lineas(self) -> List[str]:
+        raise NotImplementedError
+
+    def exponer(self) -> str:
+        ayuda = self.ayuda.replace("\\", "\\\\").replace("\n", "\\n")
+        encabezado = [
+            f"# HELP {self.nombre} {ayuda}",
+            f"# TYPE {self.nombre} {self.tipo}",
+        ]
+        return "\n".join(encabezado + self.lineas())
+
+
+class Contador(Metrica):
+    """Valor que solo crece (operaciones, errores)."""
+
+    tipo = "counter"
+
+    def __init__(self, nombre: str, ayuda: str, etiquetas: Sequence[str] = ()) -> None:
+        super().__init__(nombre, ayuda, etiquetas)
+        self._valores: Dict[Tuple[str, ...], float] = {}
+
+    def incrementar(self, cantidad: float = 1.0, **etiquetas: object) -> None:
+        if cantidad < 0:
+            raise ValueError("Un contador no puede decrementarse")
+        clave = self._clave(etiquetas)
+        with self._lock:
+            self._valores[clave] = self._valores.get(clave, 0.0) + cantidad
+
+    def valor(self, **etiquetas: object) -> float:
+        with self._lock:
+            return self._valores.get(self._clave(etiquetas), 0.0)
+
+    def lineas(self) -> List[str]:
+        with self._lock:
+            valores = sorted(self._valores.items())
+        return [
+            f"{self.nombre}{_etiquetas(self.etiquetas, clave)} {_numero(valor)}"
+            for clave, valor in valores
+        ]
+
+
+class Indicador(Metrica):
+    """Valor que sube y baja (tamaño de datos, sesiones activas).
+
+    Con ``funcion`` el valor se lee al exponer las métricas (solo para
+    indicadores sin etiquetas).
+    """
+
+    tipo = "gauge"
+
+    def __init__(
+        self,
+        nombre: str,
+        ayuda: str,
+        etiquetas: Sequence[str] = (),
+        funcion: Optional[Callable[[], float]] = None,
+    ) -> None:
+        super().__init__(nombre, ayuda, etiquetas)
+        if funcion is not None and self.etiquetas:
+            raise ValueError("Un indicador con función no puede tener etiquetas")
+        self.funcion = funcion
+        self._valores: Dict[Tuple[str, ...], float] = {}
+
+    def fijar(self, valor: float, **etiquetas: object) -> None:
+        clave = self._clave(etiquetas)
+        with self._lock:
+            self._valores[clave] = float(valor)
+
+    def sumar(self, cantidad: float = 1.0, **etiquetas: object) -> None:
+        clave = self._clave(etiquetas)
+        with self._lock:
+            self._valores[clave] = self._valores.get(clave, 0.0) + cantidad
+
+    def valor(self, **etiquetas: object) -> float:
+        if self.funcion is not None:
+            return float(self.funcion())
+        with self._lock:
+            return self._valores.get(self._clave(etiquetas), 0.0)
+
+    def lineas(self) -> List[str]:
+        if self.funcion is not None:
+            return [f"{self.nombre} {_numero(self.valor())}"]
+        with self._lock:
+            valores = sorted(self._valores.items())
+        return [
+            f"{self.nombre}{_etiquetas(self.etiquetas, clave)} {_numero(valor)}"
+            for clave, valor in valores
+        ]
+
+
+class Histograma(Metrica):
+    """Distribución de duraciones en baldes acumulativos, más suma y cantidad."""
+
+    tipo = "histogram"
+
+    def __init__(
+        self,
+        nombre: str,
+        ayuda: str,
+        etiquetas: Sequence[str] = (),
+        limites: Sequence[float] = LIMITES_LATENCIA,
+    ) -> None:
+        super().__init__(nombre, ayuda, etiquetas)
+        self.limites = tuple(sorted(float(l) for l in limites))
+        # Por serie: [conteo por balde (no acumulado), suma, cantidad].
+        self._series: Dict[Tuple[str, ...], List] = {}
+
+    def observar(self, valor: float, **etiquetas: object) -> None:
+        clave = self._clave(etiquetas)
+        with self._lock:
+            serie = self._series.get(clave)
+            if serie is None:
+                serie = self._series[clave] = [[0] * len(self.limites), 0.0, 0]
+            for i, limite in enumerate(self.limites):
+                if valor <= limite:
+                    serie[0][i] += 1
+                    break
+            serie[1] += valor
+            serie[2] += 1
+
+    @contextlib.contextmanager
+    def medir(self, **etiquetas: object) -> Iterator[None]:
+        """Observa la duración del bloque en segundos (también si falla)."""
+        inicio = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observar(time.perf_counter() - inicio, **etiquetas)
+
+    def cantidad(self, **etiquetas: object) -> int:
+        with self._lock:
+            serie = self._series.get(self._clave(etiquetas))
+            return serie[2] if serie else 0
+
+    def lineas(self) -> List[str]:
+        with self._lock:
+            series = sorted((k, (list(v[0]), v[1], v[2])) for k, v in self._series.items())
+        lineas: List[str] = []
+        for clave, (baldes, suma, cantidad) in series:
+            acumulado = 0
+            for limite, conteo in zip(self.limites, baldes):
+                acumulado += conteo
+                le = f'le="{_numero(limite)}"'
+                lineas.append(
+                    f"{self.nombre}_bucket{_etiquetas(self.etiquetas, clave, le)} {acumulado}"
+                )
+            le = 'le="+Inf"'
+            lineas.append(f"{self.nombre}_bucket{_etiquetas(self.etiquetas, clave, le)} {cantidad}")
+            lineas.append(f"{self.nombre}_sum{_etiquetas(self.etiquetas, clave)} {_numero(suma)}")
+            lineas.append(f"{self.nombre}_count{_etiquetas(self.etiquetas, clave)} {cantidad}")
+        return lineas
+
+
+class Registro:
+    """Conjunto de métricas de un proceso."""
+
+    def __init__(self) -> None:
+        self._metricas: Dict[str, Metrica] = {}
+        self._lock = threading.Lock()
+
+    def _registrar(self, clase, nombre: str, ayuda: str, etiquetas: Sequence[str], **opciones):
+        with self._lock:
+            existente = self._metricas.get(nombre)
+            if existente is not None:
+                if type(existente) is not clase or existente.etiquetas != tuple(etiquetas):
+                    raise ValueError(f"La métrica {nombre} ya existe con otro tipo o etiquetas")
+                return existente
+            metrica = clase(nombre, ayuda, etiquetas, **opciones)
+            self._metricas[nombre] = metrica
+            return metrica
+
+    def contador(self, nombre: str, ayuda: str, etiquetas: Sequence[str] = ()) -> Contador:
+        return self._registrar(Contador, nombre, ayuda, etiquetas)
+
+    def indicador(
+        self,
+        nombre: str,
+        ayuda: str,
+        etiquetas: Sequence[str] = (),
+        funcion: Optional[Callable[[], float]] = None,
+    ) -> Indicador:
+        return self._registrar(Indicador, nombre, ayuda, etiquetas, funcion=funcion)
+
+    def histograma(
+        self,
+        nombre: str,
+        ayuda: str,
+        etiquetas: Sequence[str] = (),
+        limites: Sequence[float] = LIMITES_LATENCIA,
+    ) -> Histograma:
+        return self._registrar(Histograma, nombre, ayuda, etiquetas, limites=limites)
+
+    def exponer(self) -> str:
+        """Todas las métricas en formato de texto de Prometheus."""
+        with self._lock:
+            metricas = sorted(self._metricas.values(), key=lambda m: m.nombre)
+        return "".join(m.exponer() + "\n" for m in metricas)
+
+    def escribir(self, ruta: str) -> None:
+        """Escribe las métricas en ``ruta`` reemplazando el archivo de forma atómica."""
+        directorio = os.path.dirname(os.path.abspath(ruta))
+        descriptor, temporal = tempfile.mkstemp(dir=directorio, prefix=".metricas-")
+        try:
+            with os.fdopen(descriptor, "w", encoding="utf-8") as f:
+                f.write(self.exponer())
+            os.chmod(temporal, 0o644)
+            os.replace(temporal, ruta)
+        except BaseException:
+            with contextlib.suppress(OSError):
+                os.remove(temporal)
+            raise
+
+
+REGISTRO = Registro()
+
+
+def iniciar_servidor(
+    puerto: int,
+    direccion: str = "127.0.0.1",
+    registro: Registro = REGISTRO,
+) -> ThreadingHTTPServer:
+    """Sirve ``/metrics`` en un hilo en segundo plano y devuelve el servidor."""
+
+    class Manejador(BaseHTTPRequestHandler):
+        def do_GET(self) -> None:  # noqa: N802 - nombre impuesto por http.server
+            if self.path.split("?", 1)[0] not in ("/metrics", "/"):
+                self.send_error(404)
+                return
+            cuerpo = registro.exponer().encode("utf-8")
+            self.send_response(200)
+            self.send_header("Content-Type", TIPO_CONTENIDO)
+            self.send_header("Content-Length", str(len(cuerpo)))
+            self.end_headers()
+            self.wfile.write(cuerpo)
+
+        def log_message(self, formato: str, *args) -> None:
+            pass
+
+    servidor = ThreadingHTTPServer((direccion, puerto), Manejador)
+    servidor.daemon_threads = True
+    threading.Thread(
+        target=servidor.serve_forever, name="fci-metricas", daemon=True
+    ).start()
+    return servidor
+
+
+__all__ = [
+    "Contador",
+    "Histograma",
+    "Indicador",
+    "LIMITES_LATENCIA",
+    "REGISTRO",
+    "Registro",
+    "iniciar_servidor",
+]
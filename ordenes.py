@@ -0,0 +1,168 @@
+"""Cola de órdenes de suscripción y rescate con liquidación diaria en lote.
+
+Las suscripciones y rescates no se liquidan al registrarse: quedan en
+``datos["ordenes_pendientes"]`` y se liquidan todas juntas cuando se fija el
+balance del día, al valor de cuotaparte que resulta de ese balance::
+
+    "ordenes_pendientes": [
+        {"fecha": "2025-09-15T10:12:03", "cliente": "Enzo",
+         "tipo": "suscripcion", "monto": 5000.0}
+    ]
+
+El balance informado es la valuación de la cartera sin los movimientos del
+día; el valor de cuotaparte es ese balance dividido por las cuotapartes en
+circulación antes del lote. Las cuotapartes de todo el lote se calculan en una
+sola operación vectorizada y el balance que queda registrado incluye el neto
+del lote, como espera ``tipos_cambio.serie_nav``.
+
+Los rescates se controlan también en lote: cada cliente puede rescatar hasta
+sus cuotapartes más las que suscribe en el mismo lote. Si pide más, se
+liquidan sus rescates en orden de llegada mientras alcancen y el resto se
+rechaza (no queda pendiente).
+"""
+
+from __future__ import annotations
+
+from datetime import datetime
+from typing import Dict, List, Optional
+
+import numpy as np
+
+TIPOS = ("suscripcion", "rescate")
+# Margen para que un rescate del total no falle por redondeo.
+TOLERANCIA_CUOTAPARTES = 1e-9
+
+
+def ordenes_pendientes(datos: Dict) -> List[Dict]:
+    return datos.setdefault("ordenes_pendientes", [])
+
+
+def registrar_orden(datos: Dict, cliente: str, tipo: str, monto: float) -> Dict:
+    """Agrega una orden a la cola y la devuelve (no cambia cuotapartes)."""
+    if tipo not in TIPOS:
+        raise ValueError(f"Tipo de orden inválido: {tipo}")
+    if cliente not in datos.get("clientes", {}):
+        raise ValueError(f"Cliente {cliente} no existe")
+    if monto <= 0:
+        raise ValueError("El monto debe ser mayor a 0")
+    orden = {
+        "fecha": datetime.now().isoformat(),
+        "cliente": cliente,
+        "tipo": tipo,
+        "monto": float(monto),
+    }
+    ordenes_pendientes(datos).append(orden)
+    return orden
+
+
+def calcular_liquidacion(datos: Dict, valor_cuotaparte: float) -> Dict:
+    """Calcula (sin modificar ``datos``) la liquidación de la cola completa.
+
+    Devuelve las órdenes aceptadas con sus cuotapartes (con signo, como en el
+    libro), las rechazadas y los totales del lote.
+    """
+    if valor_cuotaparte <= 0:
+        raise ValueError("El valor de cuotaparte debe ser mayor a 0")
+    ordenes = list(ordenes_pendientes(datos))
+    cantidad = len(ordenes)
+    if not cantidad:
+        return {
+            "valor_cuotaparte": valor_cuotaparte,
+            "ordenes": [],
+            "cuotapartes": np.zeros(0),
+            "aceptadas": np.zeros(0, dtype=bool),
+            "motivos": [],
+            "suscripciones": 0.0,
+            "rescates": 0.0,
+            "cuotapartes_netas": 0.0,
+        }
+    montos = np.fromiter((float(o["monto"]) for o in ordenes), dtype=float, count=cantidad)
+    es_rescate = np.fromiter((o["tipo"] == "rescate" for o in ordenes), dtype=bool, count=cantidad)
+    cuotapartes = np.where(es_rescate, -montos, montos) / valor_cuotaparte
+
+    # Clientes del lote como índices enteros para agrupar con bincount.
+    nombres, grupo = np.unique([str(o["cliente"]) for o in ordenes], return_inverse=True)
+    clientes = datos.get("clientes", {})
+    tenencias = np.fromiter(
+        (float(clientes.get(n, {}).get("cuotapartes", 0.0) or 0.0) for n in nombres),
+        dtype=float,
+        count=len(nombres),
+    )
+    existe = np.fromiter((n in clientes for n in nombres), dtype=bool, count=len(nombres))
+    disponibles = tenencias + np.bincount(
+        grupo, weights=np.where(es_rescate, 0.0, cuotapartes), minlength=len(nombres)
+    )
+
+    # Rescates acumulados por cliente en orden de llegada: orden estable por
+    # cliente, suma acumulada y se descuenta lo acumulado antes de cada grupo.
+    pedidos = np.where(es_rescate, -cuotapartes, 0.0)
+    orden = np.argsort(grupo, kind="stable")
+    acumulado_ordenado = np.cumsum(pedidos[orden])
+    primeros = np.flatnonzero(np.r_[True, grupo[orden][1:] != grupo[orden][:-1]])
+    previo = (acumulado_ordenado - pedidos[orden])[primeros]
+    acumulado = np.empty(cantidad)
+    acumulado[orden] = acumulado_ordenado - previo[grupo[orden]]
+    alcanza = acumulado <= disponibles[grupo] + TOLERANCIA_CUOTAPARTES
+
+    aceptada = existe[grupo] & (~es_rescate | alcanza)
+    return {
+        "valor_cuotaparte": valor_cuotaparte,
+        "ordenes": ordenes,
+        "cuotapartes": cuotapartes,
+        "aceptadas": aceptada,
+        "motivos": [
+            None if ok else ("cliente inexistente" if not existe[g] else "cuotapartes insuficientes")
+            for ok, g in zip(aceptada, grupo)
+        ],
+        "suscripciones": float(montos[aceptada & ~es_rescate].sum()),
+        "rescates": float(montos[aceptada & es_rescate].sum()),
+        "cuotapartes_netas": float(cuotapartes[aceptada].sum()),
+    }
+
+
+def aplicar_liquidacion(datos: Dict, liquidacion: Dict, fecha: Optional[str] = None) -> Dict:
+    """Registra las órdenes aceptadas en el libro y vacía la cola.
+
+    Devuelve ``{"liquidadas", "rechazadas"}`` con las órdenes de cada grupo
+    (las rechazadas con su ``motivo``).
+    """
+    momento = fecha or datetime.now().isoformat()
+    valor = liquidacion["valor_cuotaparte"]
+    clientes = datos["clientes"]
+    liquidadas: List[Dict] = []
+    rechazadas: List[Dict] = []
+    for orden, cuotapartes, aceptada, motivo in zip(
+        liquidacion["ordenes"],
+        liquidacion["cuotapartes"],
+        liquidacion["aceptadas"],
+        liquidacion["motivos"],
+    ):
+        if not aceptada:
+            rechazadas.append({**orden, "motivo": motivo})
+            continue
+        signo = -1.0 if orden["tipo"] == "rescate" else 1.0
+        movimiento = {
+            "fecha": momento,
+            "cliente": orden["cliente"],
+            "tipo": orden["tipo"],
+            "monto": signo * float(orden["monto"]),
+            "cuotapartes": float(cuotapartes),
+            "valor_cuotaparte": valor,
+            "fecha_orden": orden["fecha"],
+        }
+        clientes[orden["cliente"]]["cuotapartes"] += movimiento["cuotapartes"]
+        liquidadas.append(movimiento)
+
+    datos.setdefault("transacciones", []).extend(liquidadas)
+    datos["total_cuotapartes"] = datos.get("total_cuotapartes", 0.0) + liquidacion["cuotapartes_netas"]
+    datos["ordenes_pendientes"] = []
+    return {"liquidadas": liquidadas, "rechazadas": rechazadas}
+
+
+__all__ = [
+    "TIPOS",
+    "aplicar_liquidacion",
+    "calcular_liquidacion",
+    "ordenes_pendientes",
+    "registrar_orden",
+]
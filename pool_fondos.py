@@ -0,0 +1,239 @@
+"""Catálogo de fondos y pool LRU de fondos cargados.
+
+Un mismo panel (y una misma consola) puede atender varios archivos de fondo.
+Los fondos disponibles se declaran en un catálogo JSON (``fondos.json`` junto
+al proyecto, o la ruta indicada en ``FCI_CATALOGO``)::
+
+    {
+      "principal": "andes",
+      "fondos": {
+        "andes": {"archivo": "fondo_datos.json", "nombre": "Fondo Andes"},
+        "renta": {"archivo": "renta_fija.json", "nombre": "Renta Fija"}
+      }
+    }
+
+El fondo ``principal`` guarda los usuarios del panel. Cada usuario puede tener
+una lista ``fondos`` con los identificadores que puede consultar; los
+administradores ven todos. Sin catálogo se usa un único fondo
+``fondo_datos.json``, igual que antes.
+"""
+
+from __future__ import annotations
+
+import json
+import os
+import threading
+from collections import OrderedDict
+from typing import Callable, Dict, List, Optional
+
+from fondo import FondoInversion
+
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+FONDO_POR_DEFECTO = "principal"
+
+
+def _ruta_absoluta(archivo: str, base_dir: str) -> str:
+    if os.path.isabs(archivo):
+        return archivo
+    return os.path.join(base_dir, archivo)
+
+
+def ruta_catalogo() -> str:
+    return os.environ.get("FCI_CATALOGO") or os.path.join(BASE_DIR, "fondos.json")
+
+
+def cargar_catalogo(ruta: Optional[str] = None) -> Dict:
+    """Lee el catálogo de fondos, con rutas de archivo absolutas.
+
+    Devuelve ``{"principal": id, "fondos": {id: {"archivo", "nombre"}}}``.
+    """
+    ruta = ruta or ruta_catalogo()
+    catalogo: Dict = {}
+    if os.path.exists(ruta):
+        try:
+            with open(ruta, "r", encoding="utf-8") as f:
+                catalogo = json.load(f)
+        except (OSError, ValueError):
+            catalogo = {}
+
+    base_dir = os.path.dirname(os.path.abspath(ruta))
+    fondos: Dict[str, Dict] = {}
+    for fondo_id, info in (catalogo.get("fondos") or {}).items():
+        if isinstance(info, str):
+            info = {"archivo": info}
+        archivo = info.get("archivo")
+        if not archivo:
+            continue
+        fondos[fondo_id] = {
+            "archivo": _ruta_absoluta(archivo, base_dir),
+            "nombre": info.get("nombre", fondo_id),
+        }
+
+    if not fondos:
+        fondos = {
+            FONDO_POR_DEFECTO: {
+                "archivo": os.path.join(BASE_DIR, "fondo_datos.json"),
+                "nombre": "Fondo principal",
+            }
+        }
+
+    principal = catalogo.get("principal")
+    if principal not in fondos:
+        principal = next(iter(fondos))
+    return {"principal": principal, "fondos": fondos}
+
+
+def fondos_visibles(datos_usuario: Optional[Dict], catalogo: Dict) -> List[str]:
+    """Identificadores de los fondos que puede consultar un usuario."""
+    if not datos_usuario:
+        return []
+    todos = list(catalogo["fondos"])
+    if datos_usuario.get("rol") == "admin":
+        return todos
+    asignados = datos_usuario.get("fondos")
+    if not asignados:
+        return [catalogo["principal"]]
+    return [fondo_id for fondo_id in todos if fondo_id in asignados]
+
+
+class PoolFondos:
+    """Fondos cargados en memoria, acotados por cantidad y desalojados por LRU.
+
+    Cada entrada conserva la versión de datos con la que se cargó (ver
+    ``FondoInversion.version``). Si el archivo cambia en disco, la siguiente
+    consulta recarga el fondo y la versión avanza.
+    """
+
+    def __init__(
+        self,
+        capacidad: int = 8,
+        fabrica: Callable[[str], FondoInversion] = FondoInversion,
+    ) -> None:
+        if capacidad < 1:
+            raise ValueError("La capacidad del pool debe ser al menos 1")
+        self.capacidad = capacidad
+        self._fabrica = fabrica
+        self._fondos: "OrderedDict[str, FondoInversion]" = OrderedDict()
+        self._lock = threading.Lock()
+        # Un lock por archivo para serializar solo las cargas del mismo fondo.
+        self._cargas: Dict[str, threading.Lock] = {}
+        self.cargas = 0
+        self.recargas = 0
+        self.aciertos = 0
+        self.desalojos = 0
+
+    def obtener(self, archivo_datos: str) -> FondoInversion:
+        ruta = os.path.abspath(archivo_datos)
+        fondo = self._vigente(ruta, FondoInversion.version_archivo(ruta))
+        if fondo is not None:
+            return fondo
+
+        # La carga se hace fuera del lock del pool, con un lock por archivo:
+        # un fondo lento de leer no frena las consultas a los demás, y dos
+        # sesiones que piden el mismo fondo lo cargan una sola vez.
+        with self._lock:
+            carga = self._cargas.setdefault(ruta, threading.Lock())
+        with carga:
+            version_disco = FondoInversion.version_archivo(ruta)
+            fondo = self._vigente(ruta, version_disco)
+            if fondo is not None:
+                return fondo
+            fondo = self._fabrica(ruta)
+            with self._lock:
+                if ruta in self._fondos:
+                    self.recargas += 1
+                self.cargas += 1
+                self._fondos[ruta] = fondo
+                self._fondos.move_to_end(ruta)
+                while len(self._fondos) > self.capacidad:
+                    self._fondos.popitem(last=False)
+                    self.desalojos += 1
+            return fondo
+
+    def _vigente(self, ruta: str, version_disco: str) -> Optional[FondoInversion]:
+        """El fondo cargado de ``ruta`` si sigue en la versión del disco."""
+        with self._lock:
+            fondo = self._fondos.get(ruta)
+            if fondo is None or fondo.version != version_disco:
+                return None
+            self._fondos.move_to_end(ruta)
+            self.aciertos += 1
+            return fondo
+
+    def versiones(self) -> Dict[str, str]:
+        with self._lock:
+            return {ruta: fondo.version for ruta, fondo in self._fondos.items()}
+
+    def estadisticas(self) -> Dict[str, int]:
+        with self._lock:
+            return {
+                "capacidad": self.capacidad,
+                "cargados": len(self._fondos),
+                "cargas": self.cargas,
+                "recargas": self.recargas,
+                "aciertos": self.aciertos,
+                "desalojos": self.desalojos,
+            }
+
+
+def consolidar(
+    fondos: Dict[str, FondoInversion],
+    nombres: Optional[Dict[str, str]] = None,
+    clientes_permitidos: Optional[List[str]] = None,
+) -> Dict:
+    """Agrega patrimonio y cuotapartes de varios fondos.
+
+    Devuelve el detalle por fondo, el patrimonio de cada cliente sumado entre
+    fondos y los totales generales (en ARS y, si hay tipo de cambio, en USD).
+    """
+    nombres = nombres or {}
+    por_fondo: List[Dict] = []
+    por_cliente: Dict[str, Dict] = {}
+    total_ars = 0.0
+    total_usd = 0.0
+    usd_completo = True
+
+    for fondo_id, fondo in fondos.items():
+        vista = fondo.get_vista(clientes_permitidos)
+        patrimonio = vista.patrimonio
+        valor = vista.balance_total
+        tipo_cambio = vista.tipo_cambio
+        por_fondo.append(
+            {
+                "fondo": fondo_id,
+                "nombre": nombres.get(fondo_id, fondo_id),
+                "clientes": vista.numero_clientes,
+                "cuotapartes": vista.total_cuotapartes,
+                "valor_cuotaparte": vista.valor_cuotaparte,
+                "valor_actual": valor,
+                "valor_usd": vista.balance_total_usd,
+            }
+        )
+        total_ars += valor
+        if tipo_cambio:
+            total_usd += valor / tipo_cambio
+        elif valor:
+            usd_completo = False
+
+        for cliente, info in patrimonio.items():
+            acumulado = por_cliente.setdefault(
+                cliente, {"valor_actual": 0.0, "fondos": 0}
+            )
+            acumulado["valor_actual"] += info["valor_actual"]
+            acumulado["fondos"] += 1
+
+    return {
+        "por_fondo": por_fondo,
+        "por_cliente": por_cliente,
+        "total_ars": total_ars,
+        "total_usd": total_usd if usd_completo else None,
+    }
+
+
+__all__ = [
+    "PoolFondos",
+    "cargar_catalogo",
+    "consolidar",
+    "fondos_visibles",
+    "ruta_catalogo",
+]
@@ -0,0 +1,138 @@
+"""Proyección Monte Carlo del valor del fondo y de cada cliente.
+
+Los rendimientos diarios se toman del valor de cuotaparte histórico (ver
+``tipos_cambio.serie_nav``), de modo que suscripciones y rescates no se
+confunden con ganancias. Con suficientes observaciones se remuestrean
+(*bootstrap*); con pocas se ajusta una normal a los rendimientos logarítmicos.
+
+Todos los caminos se simulan a la vez como una matriz caminos × días. Para
+proyectar ``n`` días solo se conservan algunos puntos del camino (uno por
+semana), así la memoria no crece con el horizonte y los lotes que corren en
+otros procesos devuelven poco. Cada lote usa su propia semilla derivada de la
+semilla principal: el resultado no depende de cuántos procesos se usen.
+
+Como todos los clientes tienen cuotapartes del mismo fondo y se supone que no
+hay movimientos futuros, las bandas de cada cliente son las del factor de
+crecimiento del fondo multiplicadas por su valor actual.
+"""
+
+from __future__ import annotations
+
+import os
+from concurrent.futures import ProcessPoolExecutor
+from datetime import date
+from typing import Dict, Optional, Sequence, Tuple
+
+import numpy as np
+
+from tipos_cambio import serie_nav
+
+PERCENTILES: Tuple[int, ...] = (5, 25, 50, 75, 95)
+DIAS_HABILES_POR_MES = 21
+PASO_DIAS = 5
+# Con menos rendimientos la estimación es demasiado inestable para mostrarla.
+MIN_OBSERVACIONES = 10
+MIN_OBSERVACIONES_BOOTSTRAP = 20
+TAMANO_LOTE = 10_000
+# Por debajo de esta cantidad de caminos no conviene pagar el arranque de procesos.
+MIN_CAMINOS_PARALELO = 50_000
+
+
+def rendimientos_diarios(
+    balance_diario: Sequence[Dict],
+    transacciones: Sequence[Dict],
+    iniciales: Optional[Dict[str, float]] = None,
+) -> np.ndarray:
+    """Rendimientos logarítmicos entre fechas consecutivas del balance."""
+    nav = serie_nav(balance_diario, transacciones, iniciales)["nav"]
+    nav = nav[np.isfinite(nav) & (nav > 0)]
+    return np.diff(np.log(nav))
+
+
+def _simular_lote(
+    rendimientos: np.ndarray,
+    metodo: str,
+    caminos: int,
+    dias: int,
+    puntos: np.ndarray,
+    semilla: np.random.SeedSequence,
+) -> np.ndarray:
+    """Factor de crecimiento (caminos × puntos) en los días ``puntos`` (desde 1)."""
+    generador = np.random.default_rng(semilla)
+    if metodo == "bootstrap":
+        pasos = generador.choice(rendimientos, size=(caminos, dias))
+    else:
+        pasos = generador.normal(
+            rendimientos.mean(), rendimientos.std(ddof=1), size=(caminos, dias)
+        )
+    acumulado = np.cumsum(pasos, axis=1)
+    return np.exp(acumulado[:, puntos - 1])
+
+
+def proyectar(
+    rendimientos: np.ndarray,
+    dias: int,
+    caminos: int = TAMANO_LOTE,
+    percentiles: Sequence[float] = PERCENTILES,
+    semilla: int = 0,
+    procesos: Optional[int] = None,
+    paso: int = PASO_DIAS,
+) -> Optional[Dict]:
+    """Percentiles del factor de crecimiento del fondo para los próximos ``dias``.
+
+    Devuelve ``None`` si hay menos de ``MIN_OBSERVACIONES`` rendimientos. El
+    resultado incluye ``dias`` (días hábiles desde hoy de cada punto, empezando
+    en 0) y ``bandas`` con forma ``(len(percentiles), len(dias))``.
+    """
+    rendimientos = np.asarray(rendimientos, dtype=float)
+    rendimientos = rendimientos[np.isfinite(rendimientos)]
+    if len(rendimientos) < MIN_OBSERVACIONES or dias < 1:
+        return None
+    # Un punto cada ``paso`` días y siempre el último día del horizonte.
+    puntos = np.unique(np.append(np.arange(max(paso, 1), dias + 1, max(paso, 1)), dias))
+    metodo = "bootstrap" if len(rendimientos) >= MIN_OBSERVACIONES_BOOTSTRAP else "normal"
+
+    tamanos = [TAMANO_LOTE] * (caminos // TAMANO_LOTE)
+    if caminos % TAMANO_LOTE:
+        tamanos.append(caminos % TAMANO_LOTE)
+    semillas = np.random.SeedSequence(semilla).spawn(len(tamanos))
+    argumentos = [
+        (rendimientos, metodo, tamano, dias, puntos, s) for tamano, s in zip(tamanos, semillas)
+    ]
+
+    procesos = procesos or os.cpu_count() or 1
+    procesos = max(1, min(procesos, len(argumentos)))
+    if procesos == 1 or caminos < MIN_CAMINOS_PARALELO:
+        lotes = [_simular_lote(*a) for a in argumentos]
+    else:
+        with ProcessPoolExecutor(max_workers=procesos) as ejecutor:
+            lotes = list(ejecutor.map(_simular_lote, *zip(*argumentos)))
+    factores = np.concatenate(lotes)
+
+    bandas = np.percentile(factores, list(percentiles), axis=0)
+    unos = np.ones((len(percentiles), 1))
+    return {
+        "metodo": metodo,
+        "observaciones": len(rendimientos),
+        "caminos": int(factores.shape[0]),
+        "percentiles": tuple(percentiles),
+        "dias": np.insert(puntos, 0, 0),
+        "bandas": np.hstack([unos, bandas]),
+        "media_anual": float(rendimientos.mean() * DIAS_HABILES_POR_MES * 12),
+        "volatilidad_anual": float(rendimientos.std(ddof=1) * np.sqrt(DIAS_HABILES_POR_MES * 12)),
+    }
+
+
+def fechas_proyeccion(desde: date, dias: np.ndarray) -> np.ndarray:
+    """Fecha de cada punto contando ``dias`` días hábiles desde ``desde``."""
+    return np.busday_offset(np.datetime64(desde, "D"), dias, roll="forward")
+
+
+__all__ = [
+    "DIAS_HABILES_POR_MES",
+    "MIN_OBSERVACIONES",
+    "PERCENTILES",
+    "fechas_proyeccion",
+    "proyectar",
+    "rendimientos_diarios",
+]
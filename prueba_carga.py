@@ -0,0 +1,465 @@
+"""Prueba de carga del panel con sesiones concurrentes simuladas.
+
+Ejecuta ``main.py`` sin navegador mediante ``streamlit.testing.v1.AppTest``:
+cada usuario simulado es una sesión propia que ingresa con su rol (admin o
+inversor) y luego interactúa con los controles del panel (moneda, horizonte y
+sujeto de la proyección, selector de fondo) o simplemente vuelve a ejecutar
+el script, como al cambiar de pestaña. Todas las sesiones comparten el
+proceso, igual que en un servidor real, así que se miden también las cachés
+compartidas.
+
+Los fondos son sintéticos y se generan en un directorio temporal con una
+semilla fija, de modo que dos corridas con los mismos parámetros son
+comparables entre versiones del código::
+
+    python prueba_carga.py --usuarios 20 --interacciones 15
+    python prueba_carga.py --json > antes.json
+    python prueba_carga.py --json --comparar antes.json
+"""
+
+from __future__ import annotations
+
+import argparse
+import contextlib
+import json
+import os
+import platform
+import random
+import resource
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import date, datetime, timedelta
+from typing import Dict, List, Optional, Sequence
+
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+SCRIPT_PANEL = os.path.join(BASE_DIR, "main.py")
+PASSWORD_CARGA = "carga-2024"
+PERCENTILES = (50, 95, 99)
+
+# Peso relativo de cada interacción después del ingreso.
+ACCIONES = {
+    "rerun": 4,
+    "moneda": 2,
+    "horizonte": 1,
+    "proyectar": 1,
+    "fondo": 1,
+}
+
+
+# ----------------------------------------------------------------------
+# Datos sintéticos
+# ----------------------------------------------------------------------
+
+def generar_fondo(
+    ruta: str,
+    clientes: int,
+    transacciones: int,
+    dias: int,
+    usuarios: Dict[str, Dict],
+    semilla: int,
+) -> None:
+    """Escribe un archivo de fondo sintético con ``usuarios`` ya creados."""
+    import almacenamiento
+
+    rng = random.Random(semilla)
+    hoy = date.today()
+    fechas: List[str] = []
+    dia = hoy - timedelta(days=int(dias * 7 / 5) + 7)
+    while len(fechas) < dias:
+        if dia.weekday() < 5:
+            fechas.append(dia.isoformat())
+        dia += timedelta(days=1)
+
+    nombres = [f"Cliente {i:05d}" for i in range(clientes)]
+    tenencias = {nombre: 0.0 for nombre in nombres}
+    valor = 1000.0
+    navs = []
+    for _ in fechas:
+        valor *= 1 + rng.gauss(0.0005, 0.006)
+        navs.append(valor)
+
+    movimientos = []
+    for _ in range(transacciones):
+        i = rng.randrange(dias)
+        nombre = rng.choice(nombres)
+        monto = round(rng.uniform(1_000, 500_000), 2)
+        cuotapartes = monto / navs[i]
+        tenencias[nombre] += cuotapartes
+        movimientos.append(
+            {
+                "fecha": f"{fechas[i]}T12:00:00",
+                "cliente": nombre,
+                "tipo": "suscripcion",
+                "monto": monto,
+                "cuotapartes": cuotapartes,
+                "valor_cuotaparte": navs[i],
+            }
+        )
+    movimientos.sort(key=lambda t: t["fecha"])
+
+    # Balance consistente con las cuotapartes en circulación de cada día.
+    circulacion = 0.0
+    balances = []
+    pendientes = iter(movimientos)
+    siguiente = next(pendientes, None)
+    for fecha, nav in zip(fechas, navs):
+        while siguiente is not None and siguiente["fecha"][:10] <= fecha:
+            circulacion += siguiente["cuotapartes"]
+            siguiente = next(pendientes, None)
+        balances.append({"fecha": fecha, "balance": circulacion * nav})
+
+    total = sum(tenencias.values())
+    datos = {
+        "clientes": {
+            nombre: {"cuotapartes": cuotapartes, "fecha_alta": fechas[0]}
+            for nombre, cuotapartes in tenencias.items()
+        },
+        "valor_cuotaparte": navs[-1],
+        "total_cuotapartes": total,
+        "composicion_fondo": {
+            "Caución": {"monto": total * navs[-1] * 0.4, "porcentaje": 40.0},
+            "Bonos": {"monto": total * navs[-1] * 0.6, "porcentaje": 60.0},
+        },
+        "distribucion_activos": {},
+        "usuarios": usuarios,
+        "tipo_cambio": 1000.0,
+        "tipos_cambio": {
+            "USD": [
+                {"fecha": fecha, "valor": 1000.0 * (1 + 0.001 * i)}
+                for i, fecha in enumerate(fechas)
+            ]
+        },
+        "balance_diario": balances,
+        "historial_composicion": [],
+        "transacciones": movimientos,
+    }
+    almacenamiento.guardar(ruta, datos, "min")
+
+
+def generar_escenario(
+    directorio: str,
+    fondos: int,
+    clientes: int,
+    transacciones: int,
+    dias: int,
+    usuarios: int,
+    proporcion_admin: float,
+    semilla: int,
+) -> List[Dict]:
+    """Genera catálogo, fondos y usuarios; devuelve los usuarios simulados."""
+    from security import generate_salt, hash_password
+
+    rng = random.Random(semilla)
+    # Una sola derivación PBKDF2 para todos: generar el escenario debe ser rápido.
+    salt = generate_salt()
+    password_hash = hash_password(PASSWORD_CARGA, salt)
+
+    simulados = []
+    registros: Dict[str, Dict] = {}
+    cantidad_admin = max(1, round(usuarios * proporcion_admin)) if proporcion_admin > 0 else 0
+    for i in range(usuarios):
+        rol = "admin" if i < cantidad_admin else "cliente"
+        username = f"{rol}{i:04d}"
+        asignados = [] if rol == "admin" else [
+            f"Cliente {rng.randrange(clientes):05d}" for _ in range(rng.randint(1, 3))
+        ]
+        registros[username] = {
+            "password_hash": password_hash,
+            "salt": salt,
+            "rol": rol,
+            "clientes": sorted(set(asignados)),
+            "fecha_creacion": datetime.now().isoformat(),
+        }
+        simulados.append({"usuario": username, "rol": rol})
+
+    catalogo = {"principal": "f0", "fondos": {}}
+    for i in range(fondos):
+        archivo = os.path.join(directorio, f"fondo_{i}.json")
+        generar_fondo(archivo, clientes, transacciones, dias, registros, semilla + i)
+        catalogo["fondos"][f"f{i}"] = {"archivo": archivo, "nombre": f"Fondo sintético {i}"}
+    with open(os.path.join(directorio, "fondos.json"), "w", encoding="utf-8") as f:
+        json.dump(catalogo, f)
+    return simulados
+
+
+# ----------------------------------------------------------------------
+# Simulación
+# ----------------------------------------------------------------------
+
+def memoria_residente() -> float:
+    """Memoria residente actual del proceso en bytes."""
+    try:
+        with open("/proc/self/statm", "r") as f:
+            return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+    except (OSError, ValueError, IndexError):
+        # Sin /proc solo se conoce el máximo alcanzado.
+        maximo = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        return maximo if sys.platform == "darwin" else maximo * 1024
+
+
+def _widget(lista, etiqueta: str):
+    for widget in lista:
+        if widget.label == etiqueta:
+            return widget
+    return None
+
+
+def _otra_opcion(widget, rng: random.Random):
+    opciones = [o for o in widget.options if o != widget.value]
+    return rng.choice(opciones) if opciones else None
+
+
+class Sesion:
+    """Un usuario simulado con su propia sesión del panel."""
+
+    def __init__(self, usuario: Dict, timeout: float) -> None:
+        from streamlit.testing.v1 import AppTest
+
+        self.usuario = usuario
+        self.app = AppTest.from_file(SCRIPT_PANEL, default_timeout=timeout)
+        self.errores: List[str] = []
+
+    def _medir(self, accion: str, registro: List) -> None:
+        inicio = time.perf_counter()
+        self.app.run()
+        registro.append((accion, time.perf_counter() - inicio))
+        if self.app.exception:
+            self.errores.append(f"{accion}: {self.app.exception[0].message}")
+
+    def ingresar(self, registro: List) -> bool:
+        self._medir("inicio", registro)
+        self.app.text_input[0].input(self.usuario["usuario"])
+        self.app.text_input[1].input(PASSWORD_CARGA)
+        self.app.button[0].click()
+        self._medir("ingreso", registro)
+        if not self.app.metric:
+            self.errores.append("ingreso: no se mostró el panel")
+            return False
+        return True
+
+    def interactuar(self, accion: str, rng: random.Random, registro: List) -> None:
+        widget = None
+        if accion == "moneda":
+            widget = _widget(self.app.radio, "Moneda de los gráficos")
+        elif accion == "horizonte":
+            widget = _widget(self.app.radio, "Horizonte")
+        elif accion == "proyectar":
+            widget = _widget(self.app.selectbox, "Proyectar")
+        elif accion == "fondo":
+            widget = _widget(self.app.selectbox, "🏦 Fondo")
+        opcion = _otra_opcion(widget, rng) if widget is not None else None
+        if opcion is None:
+            accion = "rerun"
+        else:
+            widget.set_value(opcion)
+        self._medir(accion, registro)
+
+
+def percentiles_ms(valores: Sequence[float]) -> Dict[str, float]:
+    import numpy as np
+
+    if not valores:
+        return {}
+    ms = np.asarray(valores) * 1000
+    resumen = {f"p{p}": float(np.percentile(ms, p)) for p in PERCENTILES}
+    resumen["media"] = float(ms.mean())
+    resumen["max"] = float(ms.max())
+    return resumen
+
+
+def ejecutar_prueba(
+    usuarios: List[Dict],
+    concurrencia: int,
+    interacciones: int,
+    semilla: int,
+    timeout: float,
+) -> Dict:
+    """Corre todas las sesiones y devuelve las métricas agregadas."""
+    # El primer usuario calienta importaciones y cachés fuera de la medición,
+    # así la memoria por sesión no incluye lo que se paga una vez por proceso.
+    calentamiento = Sesion(usuarios[0], timeout)
+    calentamiento.ingresar([])
+    del calentamiento
+    memoria_inicial = memoria_residente()
+
+    registro: List = []
+    lock = threading.Lock()
+    sesiones: List[Sesion] = []
+    acciones = list(ACCIONES)
+    pesos = [ACCIONES[a] for a in acciones]
+
+    def simular(indice: int) -> None:
+        rng = random.Random(semilla * 10_007 + indice)
+        sesion = Sesion(usuarios[indice], timeout)
+        propio: List = []
+        if sesion.ingresar(propio):
+            for _ in range(interacciones):
+                sesion.interactuar(rng.choices(acciones, pesos)[0], rng, propio)
+        with lock:
+            registro.extend(propio)
+            sesiones.append(sesion)
+
+    inicio = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrencia) as ejecutor:
+        list(ejecutor.map(simular, range(len(usuarios))))
+    segundos = time.perf_counter() - inicio
+    # Las sesiones siguen vivas: la diferencia es lo que ocupan en memoria.
+    memoria_final = memoria_residente()
+
+    por_accion: Dict[str, List[float]] = {}
+    for accion, duracion in registro:
+        por_accion.setdefault(accion, []).append(duracion)
+    reruns = [d for a, d in registro if a != "inicio"]
+    errores = [e for s in sesiones for e in s.errores]
+    return {
+        "sesiones": len(sesiones),
+        "reruns": len(reruns),
+        "segundos": segundos,
+        "reruns_por_segundo": len(reruns) / segundos if segundos else 0.0,
+        "latencia_ms": percentiles_ms(reruns),
+        "latencia_por_accion_ms": {
+            accion: dict(percentiles_ms(valores), cantidad=len(valores))
+            for accion, valores in sorted(por_accion.items())
+        },
+        "memoria_por_sesion_mb": max(0.0, memoria_final - memoria_inicial) / len(usuarios) / 2**20,
+        "memoria_final_mb": memoria_final / 2**20,
+        "errores": len(errores),
+        "detalle_errores": errores[:20],
+    }
+
+
+def version_codigo() -> Optional[str]:
+    try:
+        salida = subprocess.run(
+            ["git", "describe", "--always", "--dirty"],
+            cwd=BASE_DIR,
+            capture_output=True,
+            text=True,
+            timeout=10,
+        )
+    except (OSError, subprocess.SubprocessError):
+        return None
+    return salida.stdout.strip() or None
+
+
+def comparar(actual: Dict, anterior: Dict) -> List[str]:
+    """Líneas con la variación de las métricas principales entre dos corridas."""
+    lineas = []
+    if actual.get("parametros") != anterior.get("parametros"):
+        lineas.append("⚠️  Las corridas usan parámetros distintos")
+    pares = [(f"latencia {p}", ("latencia_ms", p)) for p in ("p50", "p95", "p99")]
+    pares += [("reruns/s", ("reruns_por_segundo",)), ("MB/sesión", ("memoria_por_sesion_mb",))]
+    for etiqueta, camino in pares:
+        a, b = actual["resultados"], anterior["resultados"]
+        for clave in camino:
+            a, b = a.get(clave, {}), b.get(clave, {})
+        if isinstance(a, (int, float)) and isinstance(b, (int, float)) and b:
+            lineas.append(f"  • {etiqueta:<14} {b:>10.2f} -> {a:>10.2f} ({(a - b) / b:+.1%})")
+    return lineas
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Prueba de carga del panel con sesiones simuladas")
+    parser.add_argument("--usuarios", type=int, default=10, help="Sesiones simuladas")
+    parser.add_argument("--concurrencia", type=int,
+                        help="Sesiones activas a la vez (por defecto, todas)")
+    parser.add_argument("--interacciones", type=int, default=10,
+                        help="Interacciones por sesión después de ingresar")
+    parser.add_argument("--admins", type=float, default=0.2,
+                        help="Proporción de administradores (0 a 1)")
+    parser.add_argument("--fondos", type=int, default=1, help="Fondos sintéticos")
+    parser.add_argument("--clientes", type=int, default=500, help="Clientes por fondo")
+    parser.add_argument("--transacciones", type=int, default=20_000,
+                        help="Transacciones por fondo")
+    parser.add_argument("--dias", type=int, default=250, help="Días hábiles de balance")
+    parser.add_argument("--semilla", type=int, default=1, help="Semilla de datos y acciones")
+    parser.add_argument("--timeout", type=float, default=120.0,
+                        help="Tiempo máximo por rerun en segundos")
+    parser.add_argument("--directorio", help="Dónde generar los fondos (por defecto, temporal)")
+    parser.add_argument("--json", action="store_true", help="Salida en formato JSON")
+    parser.add_argument("--comparar", metavar="ARCHIVO",
+                        help="Resultado JSON de una corrida anterior para comparar")
+    args = parser.parse_args()
+
+    if args.usuarios < 1:
+        parser.error("--usuarios debe ser al menos 1")
+    parametros = {
+        "usuarios": args.usuarios,
+        "concurrencia": args.concurrencia or args.usuarios,
+        "interacciones": args.interacciones,
+        "admins": args.admins,
+        "fondos": args.fondos,
+        "clientes": args.clientes,
+        "transacciones": args.transacciones,
+        "dias": args.dias,
+        "semilla": args.semilla,
+    }
+
+    if args.directorio:
+        os.makedirs(args.directorio, exist_ok=True)
+        contexto = contextlib.nullcontext(args.directorio)
+    else:
+        contexto = tempfile.TemporaryDirectory(prefix="fci-carga-")
+    with contexto as directorio:
+        usuarios = generar_escenario(
+            directorio, args.fondos, args.clientes, args.transacciones, args.dias,
+            args.usuarios, args.admins, args.semilla,
+        )
+
+        # Todas las sesiones ingresan desde la misma "dirección": sin esto el
+        # límite de intentos por dirección frenaría la prueba.
+        os.environ["FCI_CATALOGO"] = os.path.join(directorio, "fondos.json")
+        os.environ["FCI_LOGIN_INTENTOS_DIRECCION"] = str(10 * args.usuarios + 20)
+        os.environ.setdefault("FCI_LOGIN_ESPERA_CUPO", str(args.timeout))
+
+        resultados = ejecutar_prueba(
+            usuarios, parametros["concurrencia"], args.interacciones, args.semilla, args.timeout
+        )
+    reporte = {
+        "version": version_codigo(),
+        "fecha": datetime.now().isoformat(timespec="seconds"),
+        "python": platform.python_version(),
+        "cpus": os.cpu_count(),
+        "parametros": parametros,
+        "resultados": resultados,
+    }
+
+    anterior = None
+    if args.comparar:
+        with open(args.comparar, "r", encoding="utf-8") as f:
+            anterior = json.load(f)
+
+    if args.json:
+        if anterior is not None:
+            reporte["comparacion"] = comparar(reporte, anterior)
+        print(json.dumps(reporte, indent=2, ensure_ascii=False))
+        return
+
+    latencia = resultados["latencia_ms"]
+    print(f"🧪 PRUEBA DE CARGA ({reporte['version'] or 'sin versión'})")
+    print(f"  • Sesiones: {resultados['sesiones']} ({parametros['concurrencia']} a la vez), "
+          f"{resultados['reruns']} reruns en {resultados['segundos']:.1f} s")
+    print(f"  • Throughput: {resultados['reruns_por_segundo']:.2f} reruns/s")
+    if latencia:
+        print(f"  • Latencia: p50 {latencia['p50']:.0f} ms · p95 {latencia['p95']:.0f} ms · "
+              f"p99 {latencia['p99']:.0f} ms")
+    for accion, datos in resultados["latencia_por_accion_ms"].items():
+        print(f"      {accion:<10} {datos['cantidad']:>5} · p50 {datos['p50']:>7.0f} ms · "
+              f"p95 {datos['p95']:>7.0f} ms")
+    print(f"  • Memoria: {resultados['memoria_por_sesion_mb']:.2f} MB por sesión "
+          f"({resultados['memoria_final_mb']:.0f} MB en total)")
+    print(f"  • Errores: {resultados['errores']}")
+    for error in resultados["detalle_errores"]:
+        print(f"      {error}")
+    if anterior is not None:
+        print("  • Comparación con la corrida anterior:")
+        for linea in comparar(reporte, anterior):
+            print(linea)
+
+
+if __name__ == "__main__":
+    main()
@@ -3,8 +3,26 @@
 from __future__ import annotations
 
 import hashlib
+import hmac
 import secrets
 
+from metricas import REGISTRO
+
+# Alert on these when PBKDF2 gets slow (CPU contention) or rejections spike.
+_DURACION_PBKDF2 = REGISTRO.histograma(
+    "fci_pbkdf2_segundos", "Duración de cada derivación PBKDF2 de contraseña"
+)
+_VERIFICACIONES = REGISTRO.contador(
+    "fci_verificaciones_password_total",
+    "Verificaciones de contraseña por resultado",
+    ("resultado",),
+)
+
+# Used to spend the same PBKDF2 work when there is nothing to compare against,
+# so unknown users cannot be told apart (or flooded) by response time.
+_DUMMY_SALT = secrets.token_hex(16)
+_DUMMY_HASH = secrets.token_hex(32)
+
 
 def generate_salt() -> str:
     """Return a random salt encoded as hexadecimal string."""
@@ -18,19 +36,29 @@ def hash_password(password: str, salt: str) -> str:
     resulting hash is returned as a hexadecimal string so it can be stored in
     JSON files easily.
     """
-    return hashlib.pbkdf2_hmac(
-        "sha256",
-        password.encode("utf-8"),
-        bytes.fromhex(salt),
-        100_000,
-    ).hex()
+    with _DURACION_PBKDF2.medir():
+        return hashlib.pbkdf2_hmac(
+            "sha256",
+            password.encode("utf-8"),
+            bytes.fromhex(salt),
+            100_000,
+        ).hex()
 
 
 def verify_password(password: str, salt: str, password_hash: str) -> bool:
-    """Check whether ``password`` matches ``password_hash`` using ``salt``."""
+    """Check whether ``password`` matches ``password_hash`` using ``salt``.
+
+    The comparison is constant-time. When ``salt`` or ``password_hash`` is
+    missing (e.g. an unknown user) a dummy hash is still computed and the
+    function returns ``False``, taking as long as a real verification.
+    """
     if not salt or not password_hash:
+        hmac.compare_digest(hash_password(password, _DUMMY_SALT), _DUMMY_HASH)
+        _VERIFICACIONES.incrementar(resultado="sin_credenciales")
         return False
-    return hash_password(password, salt) == password_hash
+    valida = hmac.compare_digest(hash_password(password, salt), password_hash)
+    _VERIFICACIONES.incrementar(resultado="ok" if valida else "rechazada")
+    return valida
 
 
 __all__ = ["generate_salt", "hash_password", "verify_password"]
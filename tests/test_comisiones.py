@@ -0,0 +1,84 @@
+"""Las comisiones devengadas y no pagadas sobreviven a los balances siguientes."""
+
+from __future__ import annotations
+
+import contextlib
+import io
+import os
+import tempfile
+import unittest
+from datetime import date, timedelta
+
+from admin_console import FondoAdminConsole
+from cierre_diario import capturar_balance
+from comisiones import aplicar_devengamiento, calcular_devengamiento, registrar_pago
+
+
+class ComisionesPendientesTest(unittest.TestCase):
+    def setUp(self) -> None:
+        directorio = tempfile.TemporaryDirectory()
+        self.addCleanup(directorio.cleanup)
+        with contextlib.redirect_stdout(io.StringIO()):
+            self.admin = FondoAdminConsole(os.path.join(directorio.name, "fondo.json"))
+        self.hoy = date.today()
+        datos = self.admin.datos
+        datos["clientes"] = {
+            "Ana": {"cuotapartes": 600.0},
+            "Beto": {"cuotapartes": 400.0},
+        }
+        datos["total_cuotapartes"] = 1000.0
+        datos["valor_cuotaparte"] = 1000.0
+        datos["balance_diario"] = [{"fecha": self.hoy.isoformat(), "balance": 1_000_000.0}]
+        datos["comisiones"] = {
+            "administracion_anual": 0.12,
+            "ultimo_devengamiento": (self.hoy - timedelta(days=30)).isoformat(),
+        }
+
+    def devengar(self) -> dict:
+        calculo = calcular_devengamiento(self.admin.datos, self.hoy)
+        aplicar_devengamiento(self.admin.datos, calculo)
+        return calculo
+
+    def actualizar_balance(self, balance: float) -> bool:
+        with contextlib.redirect_stdout(io.StringIO()):
+            return self.admin.actualizar_balance(balance)
+
+    def test_el_devengamiento_baja_el_balance_del_dia(self) -> None:
+        calculo = self.devengar()
+        entrada = self.admin.datos["balance_diario"][-1]
+        self.assertAlmostEqual(entrada["balance"], 1_000_000.0 - calculo["total"])
+        self.assertAlmostEqual(entrada["comisiones_pendientes"], calculo["total"])
+
+    def test_el_balance_siguiente_conserva_el_valor_de_cuotaparte(self) -> None:
+        calculo = self.devengar()
+        valor = self.admin.datos["valor_cuotaparte"]
+        self.assertLess(valor, 1000.0)
+
+        self.assertTrue(self.actualizar_balance(1_000_000.0))
+        self.assertAlmostEqual(self.admin.datos["valor_cuotaparte"], valor)
+        self.assertAlmostEqual(
+            self.admin.datos["balance_diario"][-1]["balance"], 1_000_000.0 - calculo["total"]
+        )
+
+    def test_el_cierre_conserva_el_valor_de_cuotaparte(self) -> None:
+        self.admin.datos["balance_diario"] = []
+        calculo = self.devengar()
+        capturar_balance(self.admin.datos, self.hoy.isoformat())
+        self.assertAlmostEqual(
+            self.admin.datos["balance_diario"][-1]["balance"], 1_000_000.0 - calculo["total"]
+        )
+
+    def test_el_pago_cancela_la_deuda(self) -> None:
+        calculo = self.devengar()
+        valor = self.admin.datos["valor_cuotaparte"]
+        self.assertAlmostEqual(registrar_pago(self.admin.datos, calculo["total"]), 0.0)
+
+        # Pagada la comisión, el custodio informa la cartera sin ese dinero.
+        self.assertTrue(self.actualizar_balance(1_000_000.0 - calculo["total"]))
+        self.assertAlmostEqual(self.admin.datos["valor_cuotaparte"], valor)
+        with self.assertRaises(ValueError):
+            registrar_pago(self.admin.datos, 1.0)
+
+
+if __name__ == "__main__":
+    unittest.main()
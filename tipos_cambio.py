@@ -0,0 +1,228 @@
+"""Tabla fechada de tipos de cambio y revaluación vectorizada de series.
+
+Los datos del fondo guardan, por moneda, la serie de cotizaciones (pesos por
+unidad de moneda) ordenada por fecha::
+
+    "tipos_cambio": {
+        "USD": [{"fecha": "2025-09-11", "valor": 1000.0}, ...],
+        "EUR": [...]
+    }
+
+Las consultas "a tal fecha" toman la última cotización publicada hasta ese
+día (búsqueda binaria). Para fechas anteriores a la primera cotización se usa
+la primera disponible. La clave escalar ``tipo_cambio`` se mantiene como la
+última cotización del dólar para compatibilidad con archivos anteriores.
+"""
+
+from __future__ import annotations
+
+import bisect
+from datetime import date
+from typing import Dict, Iterable, List, Optional, Sequence
+
+import numpy as np
+
+MONEDA_BASE = "ARS"
+
+
+def _dia(fecha: str) -> str:
+    """Recorta una fecha ISO (con o sin hora) a ``YYYY-MM-DD``."""
+    return str(fecha)[:10]
+
+
+class TablaTiposCambio:
+    """Series de cotizaciones por moneda con consultas por fecha."""
+
+    def __init__(self, series: Optional[Dict[str, Iterable[Dict]]] = None) -> None:
+        self._fechas: Dict[str, List[str]] = {}
+        self._valores: Dict[str, List[float]] = {}
+        for moneda, registros in (series or {}).items():
+            for registro in registros:
+                try:
+                    valor = float(registro.get("valor", 0.0))
+                except (TypeError, ValueError):
+                    continue
+                if valor > 0 and registro.get("fecha"):
+                    self.agregar(moneda, registro["fecha"], valor)
+
+    @classmethod
+    def desde_datos(cls, datos: Dict) -> "TablaTiposCambio":
+        """Construye la tabla desde los datos del fondo.
+
+        Archivos anteriores solo tienen el escalar ``tipo_cambio``: se toma como
+        una serie USD de un único valor, fechada al primer balance registrado.
+        """
+        tabla = cls(datos.get("tipos_cambio") or {})
+        if not tabla.fechas("USD"):
+            try:
+                escalar = float(datos.get("tipo_cambio", 0.0) or 0.0)
+            except (TypeError, ValueError):
+                escalar = 0.0
+            if escalar > 0:
+                balances = datos.get("balance_diario") or []
+                fecha = balances[0]["fecha"] if balances else date.today().isoformat()
+                tabla.agregar("USD", fecha, escalar)
+        return tabla
+
+    def monedas(self) -> List[str]:
+        return sorted(self._fechas)
+
+    def fechas(self, moneda: str) -> List[str]:
+        return list(self._fechas.get(moneda.upper(), []))
+
+    def agregar(self, moneda: str, fecha: str, valor: float) -> None:
+        """Agrega o reemplaza la cotización de ``moneda`` en ``fecha``."""
+        moneda = moneda.upper()
+        fecha = _dia(fecha)
+        fechas = self._fechas.setdefault(moneda, [])
+        valores = self._valores.setdefault(moneda, [])
+        posicion = bisect.bisect_left(fechas, fecha)
+        if posicion < len(fechas) and fechas[posicion] == fecha:
+            valores[posicion] = float(valor)
+        else:
+            fechas.insert(posicion, fecha)
+            valores.insert(posicion, float(valor))
+
+    def cotizacion(self, moneda: str, fecha: Optional[str] = None) -> float:
+        """Cotización vigente de ``moneda`` a ``fecha`` (hoy si no se indica).
+
+        Devuelve 1.0 para pesos y 0.0 si la moneda no tiene cotizaciones.
+        """
+        moneda = moneda.upper()
+        if moneda == MONEDA_BASE:
+            return 1.0
+        fechas = self._fechas.get(moneda)
+        if not fechas:
+            return 0.0
+        if fecha is None:
+            return self._valores[moneda][-1]
+        posicion = bisect.bisect_right(fechas, _dia(fecha)) - 1
+        return self._valores[moneda][max(posicion, 0)]
+
+    def cotizaciones(self, moneda: str, fechas: Sequence[str]) -> np.ndarray:
+        """Cotizaciones de ``moneda`` para muchas fechas en una sola búsqueda."""
+        moneda = moneda.upper()
+        dias = np.array([_dia(f) for f in fechas], dtype=str)
+        if moneda == MONEDA_BASE:
+            return np.ones(len(dias))
+        serie_fechas = self._fechas.get(moneda)
+        if not serie_fechas:
+            return np.zeros(len(dias))
+        posiciones = np.searchsorted(np.array(serie_fechas, dtype=str), dias, side="right") - 1
+        return np.asarray(self._valores[moneda])[np.clip(posiciones, 0, None)]
+
+    def vigentes(self, fecha: Optional[str] = None) -> Dict[str, float]:
+        """Cotización de todas las monedas a ``fecha`` (incluye ARS = 1)."""
+        resultado = {MONEDA_BASE: 1.0}
+        for moneda in self._fechas:
+            resultado[moneda] = self.cotizacion(moneda, fecha)
+        return resultado
+
+    def a_datos(self) -> Dict[str, List[Dict]]:
+        return {
+            moneda: [
+                {"fecha": f, "valor": v}
+                for f, v in zip(self._fechas[moneda], self._valores[moneda])
+            ]
+            for moneda in self.monedas()
+        }
+
+
+def serie_fondo(
+    balance_diario: Sequence[Dict],
+    tabla: TablaTiposCambio,
+    moneda: str = MONEDA_BASE,
+) -> Dict[str, np.ndarray]:
+    """Balance diario del fondo expresado en ``moneda``, fecha por fecha."""
+    fechas = np.array([_dia(b.get("fecha", "")) for b in balance_diario], dtype=str)
+    balances = np.array([float(b.get("balance", 0.0) or 0.0) for b in balance_diario])
+    orden = np.argsort(fechas, kind="stable")
+    fechas, balances = fechas[orden], balances[orden]
+    tasas = tabla.cotizaciones(moneda, fechas)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        valores = np.where(tasas > 0, balances / tasas, np.nan)
+    return {"fechas": fechas, "valores": valores}
+
+
+def _columnas_transacciones(transacciones: Sequence[Dict]):
+    """Día, cuotapartes y cliente de cada transacción como arreglos."""
+    dias = np.array([_dia(t.get("fecha", "")) for t in transacciones], dtype=str)
+    cuotapartes = np.array(
+        [float(t.get("cuotapartes", 0.0) or 0.0) for t in transacciones], dtype=float
+    )
+    nombres = np.array([str(t.get("cliente", "")) for t in transacciones], dtype=str)
+    return dias, cuotapartes, nombres
+
+
+def serie_nav(
+    balance_diario: Sequence[Dict],
+    transacciones: Sequence[Dict],
+    iniciales: Optional[Dict[str, float]] = None,
+) -> Dict[str, np.ndarray]:
+    """Valor de la cuotaparte en cada fecha del balance.
+
+    Es el balance del día dividido por las cuotapartes en circulación, que se
+    obtienen acumulando las transacciones hasta esa fecha (inclusive) sobre
+    las cuotapartes ``iniciales`` de cada cliente (las de las transacciones
+    archivadas, ver ``archivo_historico``).
+    """
+    fondo = serie_fondo(balance_diario, TablaTiposCambio(), MONEDA_BASE)
+    fechas = fondo["fechas"]
+    dias_tx, cuot_tx, _ = _columnas_transacciones(transacciones)
+    fila = np.searchsorted(fechas, dias_tx, side="left")
+    en_rango = fila < len(fechas)
+    totales = np.cumsum(
+        np.bincount(fila[en_rango], weights=cuot_tx[en_rango], minlength=len(fechas))
+    ) + sum((iniciales or {}).values())
+    with np.errstate(divide="ignore", invalid="ignore"):
+        nav = np.where(totales > 0, fondo["valores"] / totales, np.nan)
+    return {"fechas": fechas, "nav": nav}
+
+
+def serie_clientes(
+    balance_diario: Sequence[Dict],
+    transacciones: Sequence[Dict],
+    clientes: Sequence[str],
+    tabla: TablaTiposCambio,
+    moneda: str = MONEDA_BASE,
+    iniciales: Optional[Dict[str, float]] = None,
+) -> Dict[str, np.ndarray]:
+    """Valor de cada cliente en cada fecha del balance, en ``moneda``.
+
+    Las cuotapartes de cada cliente en cada fecha salen de acumular sus
+    transacciones (más sus cuotapartes ``iniciales``) y se multiplican por el
+    valor de cuotaparte del día (ver :func:`serie_nav`). Todo se calcula como matrices fechas × clientes, sin
+    recorrer fechas ni clientes en Python.
+
+    Devuelve ``{"fechas", "clientes", "valores"}`` con ``valores`` de forma
+    ``(len(fechas), len(clientes))``.
+    """
+    navs = serie_nav(balance_diario, transacciones, iniciales)
+    fechas = navs["fechas"]
+    clientes = list(clientes)
+
+    dias_tx, cuot_tx, nombres_tx = _columnas_transacciones(transacciones)
+    # Primera fecha de balance alcanzada por cada transacción.
+    fila = np.searchsorted(fechas, dias_tx, side="left")
+    columna_cliente = {nombre: j for j, nombre in enumerate(clientes)}
+    columnas = np.array([columna_cliente.get(n, -1) for n in nombres_tx], dtype=int)
+    seleccion = (fila < len(fechas)) & (columnas >= 0)
+    tenencias = np.zeros((len(fechas), len(clientes)))
+    np.add.at(tenencias, (fila[seleccion], columnas[seleccion]), cuot_tx[seleccion])
+    tenencias = np.cumsum(tenencias, axis=0)
+    if iniciales:
+        tenencias += np.array([iniciales.get(n, 0.0) for n in clientes])
+
+    with np.errstate(divide="ignore", invalid="ignore"):
+        tasas = tabla.cotizaciones(moneda, fechas)
+        valores = tenencias * np.where(tasas > 0, navs["nav"] / tasas, np.nan)[:, None]
+    return {"fechas": fechas, "clientes": np.array(clientes, dtype=object), "valores": valores}
+
+
+__all__ = [
+    "MONEDA_BASE",
+    "TablaTiposCambio",
+    "serie_clientes",
+    "serie_fondo",
+    "serie_nav",
+]
@@ -0,0 +1,261 @@
+"""Caché compartida de vistas y figuras derivadas del fondo.
+
+Las vistas por usuario (patrimonio, clientes filtrados, totales) dependen solo
+de la versión de los datos y del conjunto de clientes permitidos. Muchas
+sesiones comparten ese conjunto (todos los administradores usan ``None``), así
+que el resultado se calcula una vez por cambio de datos y se reutiliza entre
+sesiones.
+
+Las figuras de Plotly siguen el mismo criterio en una caché propia, con clave
+``(archivo, versión de datos, permisos, gráfico, parámetros)``: en un rerun sin
+cambios de datos cada gráfico cuesta solo una consulta a la caché.
+
+Los valores cacheados se comparten: quien los recibe no debe modificarlos.
+"""
+
+from __future__ import annotations
+
+import functools
+import os
+import threading
+from collections import OrderedDict
+from typing import (
+    TYPE_CHECKING,
+    Callable,
+    Dict,
+    FrozenSet,
+    Hashable,
+    Iterable,
+    List,
+    Optional,
+    Tuple,
+    TypeVar,
+)
+
+from indice_nombres import normalizar
+from listados import primeros
+
+if TYPE_CHECKING:
+    import numpy as np
+
+T = TypeVar("T")
+
+
+def clave_permisos(clientes_permitidos: Optional[Iterable[str]]) -> Optional[FrozenSet[str]]:
+    """Normaliza la lista de clientes permitidos para usarla como clave."""
+    if clientes_permitidos is None:
+        return None
+    return frozenset(clientes_permitidos)
+
+
+class CacheVistas:
+    """Caché LRU acotada con contadores de aciertos, fallos y desalojos."""
+
+    def __init__(self, capacidad: int = 256) -> None:
+        if capacidad < 1:
+            raise ValueError("La capacidad de la caché debe ser al menos 1")
+        self.capacidad = capacidad
+        self._valores: "OrderedDict[Hashable, object]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.aciertos = 0
+        self.fallos = 0
+        self.desalojos = 0
+
+    def obtener(self, clave: Hashable, calcular: Callable[[], T]) -> T:
+        """Devuelve el valor de ``clave``, calculándolo si no está en caché."""
+        with self._lock:
+            if clave in self._valores:
+                self._valores.move_to_end(clave)
+                self.aciertos += 1
+                return self._valores[clave]
+            self.fallos += 1
+
+        # El cálculo se hace fuera del lock para no bloquear otras sesiones.
+        valor = calcular()
+
+        with self._lock:
+            self._valores[clave] = valor
+            self._valores.move_to_end(clave)
+            while len(self._valores) > self.capacidad:
+                self._valores.popitem(last=False)
+                self.desalojos += 1
+        return valor
+
+    def limpiar(self) -> None:
+        with self._lock:
+            self._valores.clear()
+
+    def estadisticas(self) -> Dict[str, float]:
+        with self._lock:
+            consultas = self.aciertos + self.fallos
+            return {
+                "capacidad": self.capacidad,
+                "entradas": len(self._valores),
+                "aciertos": self.aciertos,
+                "fallos": self.fallos,
+                "desalojos": self.desalojos,
+                "tasa_aciertos": (self.aciertos / consultas) if consultas else 0.0,
+            }
+
+
+class ModeloVista:
+    """Cifras derivadas del fondo para un conjunto de clientes.
+
+    Se arma recorriendo una sola vez los clientes permitidos y reúne todo lo
+    que muestra el panel: patrimonio por cliente (con participación y
+    equivalente en USD), totales y cantidad de clientes. Es de solo lectura.
+    """
+
+    def __init__(
+        self,
+        datos: Dict,
+        clientes_permitidos: Optional[Iterable[str]],
+        tipo_cambio: float = 0.0,
+    ) -> None:
+        clientes = datos.get("clientes", {})
+        permitidos = None if clientes_permitidos is None else set(clientes_permitidos)
+        self.valor_cuotaparte: float = datos.get("valor_cuotaparte", 0.0)
+        self.tipo_cambio: float = tipo_cambio or 0.0
+        self.filtrado = permitidos is not None
+
+        patrimonio: Dict[str, Dict] = {}
+        total_cuotapartes = 0.0
+        balance_total = 0.0
+        for nombre, info in clientes.items():
+            if permitidos is not None and nombre not in permitidos:
+                continue
+            cuotapartes = info.get("cuotapartes", 0.0)
+            valor_actual = cuotapartes * self.valor_cuotaparte
+            patrimonio[nombre] = {
+                "cuotapartes": cuotapartes,
+                "valor_actual": valor_actual,
+                "valor_usd": (valor_actual / self.tipo_cambio) if self.tipo_cambio else None,
+                "porcentaje": 0.0,
+            }
+            total_cuotapartes += cuotapartes
+            balance_total += valor_actual
+
+        # Sin filtro la participación es sobre el total del fondo; con filtro,
+        # sobre las cuotapartes visibles para el usuario.
+        if permitidos is None:
+            total_cuotapartes = datos.get("total_cuotapartes", 0.0)
+        if total_cuotapartes:
+            for info in patrimonio.values():
+                info["porcentaje"] = info["cuotapartes"] / total_cuotapartes * 100
+
+        self.patrimonio = patrimonio
+        self.numero_clientes = len(patrimonio)
+        self.total_cuotapartes = total_cuotapartes
+        self.balance_total = balance_total
+        self.balance_total_usd: Optional[float] = (
+            balance_total / self.tipo_cambio if self.tipo_cambio else None
+        )
+
+    def principales(self, cantidad: Optional[int] = None) -> List[str]:
+        """Clientes ordenados por valor actual (de mayor a menor)."""
+        nombres = sorted(
+            self.patrimonio,
+            key=lambda nombre: self.patrimonio[nombre]["valor_actual"],
+            reverse=True,
+        )
+        return nombres if cantidad is None else nombres[:cantidad]
+
+    def distribucion(self, cantidad: int) -> List[Tuple[str, float]]:
+        """Los ``cantidad`` clientes de mayor valor y el resto sumado en "Otros"."""
+        principales = primeros(
+            self.patrimonio.items(), cantidad, clave=lambda item: item[1]["valor_actual"]
+        )
+        partes = [(nombre, info["valor_actual"]) for nombre, info in principales]
+        if len(self.patrimonio) > len(partes):
+            resto = self.balance_total - sum(valor for _, valor in partes)
+            partes.append(("Otros", resto))
+        return partes
+
+    def histograma(self, baldes: int) -> Tuple[np.ndarray, np.ndarray]:
+        """Cantidad de clientes por rango de valor actual: ``(conteos, bordes)``.
+
+        Los rangos se calculan acá para que al navegador llegue un punto por
+        rango y no uno por cliente.
+        """
+        # NumPy se importa acá: este módulo se carga antes del login.
+        import numpy as np
+
+        valores = np.fromiter(
+            (info["valor_actual"] for info in self.patrimonio.values()),
+            dtype=float,
+            count=len(self.patrimonio),
+        )
+        return np.histogram(valores, bins=max(int(baldes), 1))
+
+    def buscar(self, texto: str) -> List[str]:
+        """Clientes cuyo nombre contiene ``texto`` (sin mayúsculas ni acentos)."""
+        buscado = normalizar(texto)
+        if not buscado:
+            return list(self.patrimonio)
+        return [nombre for nombre in self.patrimonio if buscado in normalizar(nombre)]
+
+
+CACHE_VISTAS = CacheVistas(capacidad=int(os.environ.get("FCI_CACHE_VISTAS", "256")))
+CACHE_FIGURAS = CacheVistas(capacidad=int(os.environ.get("FCI_CACHE_FIGURAS", "64")))
+
+
+def vista_compartida(metodo: Callable[..., T]) -> Callable[..., T]:
+    """Memoiza un método ``(self, clientes_permitidos)`` de ``FondoInversion``.
+
+    La clave es ``(archivo, versión de datos, permisos, vista)``, de modo que una
+    recarga del archivo invalida naturalmente las entradas anteriores.
+    """
+
+    @functools.wraps(metodo)
+    def envoltura(fondo, clientes_permitidos):
+        clave = (
+            fondo.clave_datos,
+            clave_permisos(clientes_permitidos),
+            metodo.__name__,
+        )
+        return CACHE_VISTAS.obtener(
+            clave, lambda: metodo(fondo, clientes_permitidos)
+        )
+
+    return envoltura
+
+
+def figura_compartida(
+    fondo,
+    clientes_permitidos: Optional[Iterable[str]],
+    grafico: str,
+    construir: Callable[[], T],
+    *parametros: Hashable,
+) -> T:
+    """Figura ``grafico`` del fondo, construida solo si no está en caché.
+
+    Los gráficos que no dependen del usuario se piden con
+    ``clientes_permitidos=None`` para compartirlos entre todas las sesiones.
+
+    Se guarda la ``Figure`` misma, no su especificación serializada: un acierto
+    ahorra la construcción (unos 50 ms con un fondo grande), mientras que la
+    serialización de ``st.plotly_chart`` en cada rerun cuesta alrededor de
+    1,5 ms y reconstruir la figura desde un JSON guardado, unos 14 ms. Como la
+    misma figura se entrega a todas las sesiones, quien la recibe no debe
+    modificarla (``update_layout``, ``add_trace``...): solo pasarla a
+    ``st.plotly_chart``, que trabaja sobre una copia. Si hace falta ajustarla,
+    el ajuste va dentro de ``construir`` y sus parámetros en ``parametros``.
+    """
+    clave = (
+        fondo.clave_datos,
+        clave_permisos(clientes_permitidos),
+        grafico,
+        parametros,
+    )
+    return CACHE_FIGURAS.obtener(clave, construir)
+
+
+__all__ = [
+    "CACHE_FIGURAS",
+    "CACHE_VISTAS",
+    "CacheVistas",
+    "ModeloVista",
+    "clave_permisos",
+    "figura_compartida",
+    "vista_compartida",
+]